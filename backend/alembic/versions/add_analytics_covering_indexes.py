@@ -0,0 +1,27 @@
+"""add covering indexes for project-scoped analytics
+
+Revision ID: b2d4f6a8c0e3
+Revises: a1c3e5f7b9d2
+Create Date: 2025-07-02
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c0e3'
+down_revision = 'a1c3e5f7b9d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_tests_feature_id_tested_priority', 'tests', ['feature_id', 'tested', 'priority'], unique=False
+    )
+    op.create_index('ix_features_project_id_created_at', 'features', ['project_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_features_project_id_created_at', table_name='features')
+    op.drop_index('ix_tests_feature_id_tested_priority', table_name='tests')
@@ -0,0 +1,49 @@
+"""add materialized path to features
+
+Revision ID: 7e1f4a2b9c31
+Revises: 6c3d7d20130
+Create Date: 2025-06-20
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1f4a2b9c31'
+down_revision = '6c3d7d20130'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('features', sa.Column('path', sa.String(), nullable=True))
+    op.add_column('features', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill path and depth for the existing hierarchy, walking down from the roots
+    op.execute("""
+        WITH RECURSIVE tree AS (
+            SELECT id, '/' || id || '/' AS path, 0 AS depth
+            FROM features
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT f.id, tree.path || f.id || '/', tree.depth + 1
+            FROM features f
+            JOIN tree ON f.parent_id = tree.id
+        )
+        UPDATE features
+        SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE features.id = tree.id
+    """)
+
+    op.create_index(
+        'ix_features_path', 'features', ['path'], unique=False,
+        postgresql_ops={'path': 'varchar_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_features_path', table_name='features')
+    op.drop_column('features', 'depth')
+    op.drop_column('features', 'path')
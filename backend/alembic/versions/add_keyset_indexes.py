@@ -0,0 +1,27 @@
+"""add indexes for keyset pagination
+
+Revision ID: a4c7e2f9b164
+Revises: 9b3d6e4f8a53
+Create Date: 2025-06-23
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2f9b164'
+down_revision = '9b3d6e4f8a53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tests_feature_id_id', 'tests', ['feature_id', 'id'], unique=False)
+    op.create_index('ix_node_positions_project_id_id', 'node_positions', ['project_id', 'id'], unique=False)
+    op.create_index('ix_features_project_id_id', 'features', ['project_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_features_project_id_id', table_name='features')
+    op.drop_index('ix_node_positions_project_id_id', table_name='node_positions')
+    op.drop_index('ix_tests_feature_id_id', table_name='tests')
@@ -0,0 +1,26 @@
+"""add node position index for viewport queries
+
+Revision ID: c6e9a4b1d386
+Revises: b5d8f3a0c275
+Create Date: 2025-06-25
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e9a4b1d386'
+down_revision = 'b5d8f3a0c275'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_node_positions_project_id_position', 'node_positions',
+        ['project_id', 'position_x', 'position_y'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_node_positions_project_id_position', table_name='node_positions')
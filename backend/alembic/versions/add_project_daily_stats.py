@@ -0,0 +1,60 @@
+"""add trigger-maintained daily analytics rollups
+
+Revision ID: e8a1c6d3f5a8
+Revises: d7fab5c2e497
+Create Date: 2025-06-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.rollups import CREATE_ROLLUP_TRIGGERS, DROP_ROLLUP_TRIGGERS
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a1c6d3f5a8'
+down_revision = 'd7fab5c2e497'
+branch_labels = None
+depends_on = None
+
+# The rebuild as of this revision; the current one in app.db.rollups reads
+# test_status_events, which does not exist yet here
+REBUILD_DAILY_STATS = """
+INSERT INTO project_daily_stats (project_id, day, tests_added, tests_tested, features_added)
+SELECT project_id, day, sum(tests_added), sum(tests_tested), sum(features_added)
+FROM (
+    SELECT f.project_id, (t.created_at AT TIME ZONE 'UTC')::date AS day,
+           1 AS tests_added, 0 AS tests_tested, 0 AS features_added
+    FROM tests t JOIN features f ON f.id = t.feature_id
+    WHERE (CAST(:project_id AS integer) IS NULL OR f.project_id = :project_id)
+    UNION ALL
+    -- Status history is not kept, so tested tests count on their last update
+    SELECT f.project_id, (coalesce(t.updated_at, t.created_at) AT TIME ZONE 'UTC')::date, 0, 1, 0
+    FROM tests t JOIN features f ON f.id = t.feature_id
+    WHERE t.tested AND (CAST(:project_id AS integer) IS NULL OR f.project_id = :project_id)
+    UNION ALL
+    SELECT project_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 1
+    FROM features
+    WHERE CAST(:project_id AS integer) IS NULL OR project_id = :project_id
+) AS events
+GROUP BY project_id, day
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'project_daily_stats',
+        sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('tests_added', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tests_tested', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('features_added', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('project_id', 'day'),
+    )
+    op.execute(CREATE_ROLLUP_TRIGGERS)
+    op.get_bind().execute(sa.text(REBUILD_DAILY_STATS), {'project_id': None})
+
+
+def downgrade() -> None:
+    op.execute(DROP_ROLLUP_TRIGGERS)
+    op.drop_table('project_daily_stats')
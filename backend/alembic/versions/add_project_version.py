@@ -0,0 +1,24 @@
+"""add version counter to projects
+
+Revision ID: 8a2c5d3e7f42
+Revises: 7e1f4a2b9c31
+Create Date: 2025-06-21
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a2c5d3e7f42'
+down_revision = '7e1f4a2b9c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('projects', 'version')
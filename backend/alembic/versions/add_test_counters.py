@@ -0,0 +1,51 @@
+"""add trigger-maintained test counters to features and projects
+
+Revision ID: a1c3e5f7b9d2
+Revises: f9b2d7e4a6c1
+Create Date: 2025-07-01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.test_counts import (
+    CREATE_TEST_COUNT_TRIGGERS,
+    DROP_TEST_COUNT_TRIGGERS,
+    REBUILD_FEATURE_TEST_COUNTS,
+    REBUILD_PROJECT_TEST_COUNTS,
+)
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b9d2'
+down_revision = 'f9b2d7e4a6c1'
+branch_labels = None
+depends_on = None
+
+FEATURE_COUNTERS = (
+    'test_count', 'tested_count', 'untested_count',
+    'subtree_test_count', 'subtree_tested_count', 'subtree_untested_count',
+)
+PROJECT_COUNTERS = ('test_count', 'tested_count', 'untested_count')
+
+
+def upgrade() -> None:
+    for name in FEATURE_COUNTERS:
+        op.add_column('features', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    for name in PROJECT_COUNTERS:
+        op.add_column('projects', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_features_project_id_test_count', 'features', ['project_id', 'test_count'], unique=False)
+
+    op.execute(CREATE_TEST_COUNT_TRIGGERS)
+    bind = op.get_bind()
+    bind.execute(sa.text(REBUILD_FEATURE_TEST_COUNTS), {'project_id': None})
+    bind.execute(sa.text(REBUILD_PROJECT_TEST_COUNTS), {'project_id': None})
+
+
+def downgrade() -> None:
+    op.execute(DROP_TEST_COUNT_TRIGGERS)
+    op.drop_index('ix_features_project_id_test_count', table_name='features')
+    for name in reversed(PROJECT_COUNTERS):
+        op.drop_column('projects', name)
+    for name in reversed(FEATURE_COUNTERS):
+        op.drop_column('features', name)
@@ -0,0 +1,88 @@
+"""add the partitioned test_status_events log
+
+Revision ID: f9b2d7e4a6c1
+Revises: e8a1c6d3f5a8
+Create Date: 2025-06-30
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.status_events import CREATE_STATUS_EVENT_TRIGGERS, DROP_STATUS_EVENT_TRIGGERS
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9b2d7e4a6c1'
+down_revision = 'e8a1c6d3f5a8'
+branch_labels = None
+depends_on = None
+
+# Frozen copies of the partitioning helpers, so later changes to the app
+# (or the running settings) cannot change what this revision creates.
+# Months beyond this lookahead are added by maintain_status_events.py.
+PARTITIONS_AHEAD = 3
+
+
+def shift_month(year: int, month: int, months: int):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def create_partition_sql(year: int, month: int) -> str:
+    next_year, next_month = shift_month(year, month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS test_status_events_y{year:04d}m{month:02d} PARTITION OF test_status_events "
+        f"FOR VALUES FROM ('{year:04d}-{month:02d}-01 00:00:00+00') TO ('{next_year:04d}-{next_month:02d}-01 00:00:00+00')"
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'test_status_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('occurred_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('test_id', sa.Integer(), nullable=False),
+        sa.Column('feature_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('old_tested', sa.Boolean(), nullable=True),
+        sa.Column('new_tested', sa.Boolean(), nullable=True),
+        sa.Column('old_priority', postgresql.ENUM(name='priorityenum', create_type=False), nullable=True),
+        sa.Column('new_priority', postgresql.ENUM(name='priorityenum', create_type=False), nullable=True),
+        sa.PrimaryKeyConstraint('id', 'occurred_at'),
+        postgresql_partition_by='RANGE (occurred_at)',
+    )
+    op.create_index(
+        'ix_test_status_events_occurred_at', 'test_status_events', ['occurred_at'], postgresql_using='brin'
+    )
+
+    # Monthly partitions from the oldest test up to the lookahead
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM tests")).scalar() or now
+    year, month = oldest.astimezone(timezone.utc).year, oldest.astimezone(timezone.utc).month
+    last = shift_month(now.year, now.month, PARTITIONS_AHEAD)
+    while (year, month) <= last:
+        op.execute(create_partition_sql(year, month))
+        year, month = shift_month(year, month, 1)
+
+    op.execute(CREATE_STATUS_EVENT_TRIGGERS)
+
+    # Baseline event per existing test; tested ones are dated by their last update
+    op.execute("""
+        INSERT INTO test_status_events
+            (occurred_at, test_id, feature_id, project_id, old_tested, new_tested, old_priority, new_priority)
+        SELECT
+            CASE WHEN t.tested THEN coalesce(t.updated_at, t.created_at, now()) ELSE coalesce(t.created_at, now()) END,
+            t.id, t.feature_id, f.project_id, NULL, t.tested, NULL, t.priority
+        FROM tests t JOIN features f ON f.id = t.feature_id
+    """)
+
+
+def downgrade() -> None:
+    op.execute(DROP_STATUS_EVENT_TRIGGERS)
+    op.drop_index('ix_test_status_events_occurred_at', table_name='test_status_events')
+    # Dropping the parent drops every partition with it
+    op.drop_table('test_status_events')
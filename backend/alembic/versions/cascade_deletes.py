@@ -0,0 +1,52 @@
+"""push cascading deletes to the database
+
+Revision ID: 9b3d6e4f8a53
+Revises: 8a2c5d3e7f42
+Create Date: 2025-06-22
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3d6e4f8a53'
+down_revision = '8a2c5d3e7f42'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referenced table) for every parent -> child link of a project
+CASCADE_FOREIGN_KEYS = [
+    ('features', 'project_id', 'projects'),
+    ('features', 'parent_id', 'features'),
+    ('test_cases', 'project_id', 'projects'),
+    ('test_runs', 'test_case_id', 'test_cases'),
+    ('project_members', 'project_id', 'projects'),
+]
+
+
+def _replace_foreign_key(table: str, column: str, referred: str, on_delete: str) -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Some of these tables are created by create_all rather than by a migration
+    if not inspector.has_table(table):
+        return
+    # Drop the existing constraints by their real names, which need not follow the default pattern
+    existing = [
+        foreign_key['name'] for foreign_key in inspector.get_foreign_keys(table)
+        if foreign_key['constrained_columns'] == [column] and foreign_key['referred_table'] == referred
+    ]
+    name = f'{table}_{column}_fkey'
+    actions = [f'DROP CONSTRAINT {existing_name}' for existing_name in existing]
+    actions.append(f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} (id){on_delete}')
+    op.execute(f'ALTER TABLE {table} ' + ', '.join(actions))
+
+
+def upgrade() -> None:
+    for table, column, referred in CASCADE_FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, ' ON DELETE CASCADE')
+
+
+def downgrade() -> None:
+    for table, column, referred in CASCADE_FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, '')
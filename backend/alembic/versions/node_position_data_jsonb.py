@@ -0,0 +1,42 @@
+"""store node position data as jsonb with a gin index
+
+Revision ID: d7fab5c2e497
+Revises: c6e9a4b1d386
+Create Date: 2025-06-26
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7fab5c2e497'
+down_revision = 'c6e9a4b1d386'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'node_positions', 'data',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using='data::jsonb',
+    )
+    op.create_index(
+        'ix_node_positions_data', 'node_positions', ['data'], unique=False,
+        postgresql_using='gin', postgresql_ops={'data': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_node_positions_data', table_name='node_positions')
+    op.alter_column(
+        'node_positions', 'data',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using='data::json',
+    )
@@ -0,0 +1,38 @@
+"""make the daily rollups agree with the raw analytics counts
+
+Revision ID: c3e5a7b9d1f4
+Revises: b2d4f6a8c0e3
+Create Date: 2025-07-03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.rollups import CREATE_ROLLUP_TRIGGERS, DROP_ROLLUP_TRIGGERS, REBUILD_DAILY_STATS
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d1f4'
+down_revision = 'b2d4f6a8c0e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Deletes now take tests and features back out, and tests_tested is
+    # rebuilt from test_status_events instead of tests.updated_at
+    op.execute(DROP_ROLLUP_TRIGGERS)
+    op.execute(CREATE_ROLLUP_TRIGGERS)
+    op.execute('LOCK TABLE project_daily_stats IN EXCLUSIVE MODE')
+    op.execute('DELETE FROM project_daily_stats')
+    op.get_bind().execute(sa.text(REBUILD_DAILY_STATS), {'project_id': None})
+
+
+def downgrade() -> None:
+    # The earlier triggers never subtracted; the rebuilt counters are kept
+    op.execute('DROP TRIGGER IF EXISTS features_rollup_delete ON features')
+    op.execute('DROP TRIGGER IF EXISTS features_rollup_deleting ON features')
+    op.execute('DROP TRIGGER IF EXISTS tests_rollup_delete ON tests')
+    op.execute('DROP FUNCTION IF EXISTS rollup_features_deleted()')
+    op.execute('DROP FUNCTION IF EXISTS rollup_feature_deleting()')
+    op.execute('DROP FUNCTION IF EXISTS rollup_tests_deleted()')
@@ -0,0 +1,35 @@
+"""unique node position per project node
+
+Revision ID: b5d8f3a0c275
+Revises: a4c7e2f9b164
+Create Date: 2025-06-24
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8f3a0c275'
+down_revision = 'a4c7e2f9b164'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep only the newest row for each (project_id, node_id) before adding the constraint
+    op.execute(
+        """
+        DELETE FROM node_positions a
+        USING node_positions b
+        WHERE a.project_id = b.project_id
+          AND a.node_id = b.node_id
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        'uq_node_positions_project_id_node_id', 'node_positions', ['project_id', 'node_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_node_positions_project_id_node_id', 'node_positions', type_='unique')
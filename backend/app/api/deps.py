@@ -1,4 +1,4 @@
-from typing import Generator, Optional
+from typing import Generator, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -8,39 +8,85 @@ from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.core.auth_cache import CurrentUser, user_cache
 from app.core.config import settings
 from app.core.security import ALGORITHM
 from app.db.database import get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> models.User:
-    """
-    Validate token and return current user
-    """
+def _decode_token(token: str) -> Optional[Tuple[schemas.TokenPayload, Optional[float]]]:
+    """Return the verified payload of a token and its expiry, or None if it is invalid or expired"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         token_data = schemas.TokenPayload(**payload)
     except (JWTError, ValidationError):
+        return None
+    return token_data, payload.get("exp")
+
+def get_user_from_token(db: Session, token: str) -> Optional[CurrentUser]:
+    """
+    Return the active user a token belongs to, or None if the token is invalid
+    """
+    user = user_cache.get(token)
+    if user is not None:
+        return user
+    decoded = _decode_token(token)
+    if decoded is None:
+        return None
+    token_data, expires_at = decoded
+    db_user = db.query(models.User).filter(models.User.id == token_data.sub).first()
+    if not db_user or not db_user.is_active:
+        return None
+    user = CurrentUser.from_user(db_user)
+    user_cache.put(token, user, expires_at)
+    return user
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> CurrentUser:
+    """
+    Validate token and return current user.
+    Served from the token cache when possible, so most requests do not touch the database.
+    """
+    user = user_cache.get(token)
+    if user is not None:
+        return user
+    decoded = _decode_token(token)
+    if decoded is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = db.query(models.User).filter(models.User.id == token_data.sub).first()
-    if not user:
+    token_data, expires_at = decoded
+    db_user = db.query(models.User).filter(models.User.id == token_data.sub).first()
+    if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
+    if not db_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    user = CurrentUser.from_user(db_user)
+    user_cache.put(token, user, expires_at)
     return user
 
 def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     """
     Get current active user
     """
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+def get_current_user_record(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+) -> models.User:
+    """
+    Load the current user's row, for endpoints that read or change more than the cached fields
+    """
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if not user:
+        user_cache.invalidate_user(current_user.id)
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
@@ -1,37 +1,64 @@
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session, joinedload
 
 from app import models, schemas
 from app.api import deps
-from app.models.user import User
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
+from app.core.etag import project_etag, etag_matches, not_modified, set_etag
+from app.core.jobs import jobs
+from app.core.pagination import keyset_paginate
+from app.core.streaming import NDJSON_MEDIA_TYPE, accepts, ndjson_response
+from app.db.database import SessionLocal
+from app.schemas.job import JobAccepted
+from app.schemas.pagination import CursorPage
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.project_repository import ProjectRepository
 
 router = APIRouter()
 
 
-@router.get("/project/{project_id}", response_model=List[schemas.Feature])
+@router.get("/project/{project_id}", response_model=Union[List[schemas.Feature], CursorPage[schemas.Feature]])
 def read_features(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     parent_id: Optional[int] = None,
 ) -> Any:
     """
     Retrieve features for a specific project.
     Optional filtering by parent_id (None for root features).
+    Pass `cursor` (empty for the first page) to get keyset pages instead of skip/limit.
+    Send `Accept: application/x-ndjson` to stream every matching feature instead.
     """
     # Check if user has access to this project
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    etag = project_etag(project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    if accepts(request, NDJSON_MEDIA_TYPE):
+        streamed = ndjson_response(FeatureRepository.get_project_features_statement(project_id, parent_id))
+        set_etag(streamed, etag)
+        return streamed
+    
     query = db.query(models.Feature).filter(models.Feature.project_id == project_id)
     
     # Filter by parent_id (None for root features)
@@ -40,6 +67,10 @@ def read_features(
     else:
         query = query.filter(models.Feature.parent_id.is_(None))
     
+    if cursor is not None:
+        items, next_cursor = keyset_paginate(query, cursor, limit, models.Feature.id)
+        return {"items": items, "next_cursor": next_cursor}
+    
     features = query.offset(skip).limit(limit).all()
     return features
 
@@ -49,54 +80,31 @@ def read_features_tree(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+    depth: Optional[int] = Query(None, ge=1),
 ) -> Any:
     """
     Retrieve features for a specific project as a hierarchical tree.
+    With depth, only the first `depth` levels are returned; use
+    children_count and /features/{id}/children to expand further.
     """
     # Check if user has access to this project
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Get root features (those with no parent)
-    root_features = (
-        db.query(models.Feature)
-        .filter(models.Feature.project_id == project_id)
-        .filter(models.Feature.parent_id.is_(None))
-        .all()
-    )
-    
-    # Function to recursively build the feature tree
-    def build_feature_tree(feature):
-        children = (
-            db.query(models.Feature)
-            .filter(models.Feature.parent_id == feature.id)
-            .all()
-        )
-        
-        result = schemas.FeatureWithChildren(
-            id=feature.id,
-            name=feature.name,
-            description=feature.description,
-            project_id=feature.project_id,
-            parent_id=feature.parent_id,
-            created_at=feature.created_at,
-            updated_at=feature.updated_at,
-            children=[]
-        )
-        
-        if children:
-            result.children = [build_feature_tree(child) for child in children]
-        
-        return result
+    etag = project_etag(project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
-    # Build the complete feature tree
-    feature_tree = [build_feature_tree(feature) for feature in root_features]
-    return feature_tree
+    # Load the hierarchy in one query and assemble it in memory
+    return FeatureRepository.get_project_feature_tree(db, project_id, depth=depth)
 
 
 @router.post("/", response_model=schemas.Feature)
@@ -104,7 +112,7 @@ def create_feature(
     *,
     db: Session = Depends(deps.get_db),
     feature_in: schemas.FeatureCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create new feature.
@@ -114,7 +122,7 @@ def create_feature(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # If parent_id is provided, check that it exists and belongs to the same project
@@ -125,11 +133,7 @@ def create_feature(
         if parent_feature.project_id != feature_in.project_id:
             raise HTTPException(status_code=400, detail="Parent feature must belong to the same project")
     
-    feature = models.Feature(**feature_in.dict())
-    db.add(feature)
-    db.commit()
-    db.refresh(feature)
-    return feature
+    return FeatureRepository.create_feature(db, feature_in)
 
 
 @router.get("/{feature_id}", response_model=schemas.Feature)
@@ -137,7 +141,7 @@ def read_feature(
     *,
     db: Session = Depends(deps.get_db),
     feature_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get feature by ID.
@@ -148,19 +152,98 @@ def read_feature(
     
     # Check if user has access to the project
     project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     return feature
 
 
+@router.get("/{feature_id}/children", response_model=CursorPage[schemas.FeatureWithCounts])
+def read_feature_children(
+    *,
+    db: Session = Depends(deps.get_db),
+    feature_id: int,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Any:
+    """
+    Expand a feature: its direct children with their own children and test
+    counts, paginated by cursor.
+    """
+    feature = db.query(models.Feature).filter(models.Feature.id == feature_id).first()
+    if not feature:
+        raise HTTPException(status_code=404, detail="Feature not found")
+    
+    # Check if user has access to the project
+    project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    etag = project_etag(project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    items, next_cursor = FeatureRepository.get_project_features_page(
+        db, project.id, parent_id=feature.id, cursor=cursor, limit=limit
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/{feature_id}/ancestors", response_model=List[schemas.Feature])
+def read_feature_ancestors(
+    *,
+    db: Session = Depends(deps.get_db),
+    feature_id: int,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get the ancestors of a feature, starting at the root (breadcrumbs).
+    """
+    feature = db.query(models.Feature).filter(models.Feature.id == feature_id).first()
+    if not feature:
+        raise HTTPException(status_code=404, detail="Feature not found")
+    
+    # Check if user has access to the project
+    project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return FeatureRepository.get_ancestors(db, feature)
+
+
+@router.get("/{feature_id}/subtree", response_model=List[schemas.Feature])
+def read_feature_subtree(
+    *,
+    db: Session = Depends(deps.get_db),
+    feature_id: int,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get a feature and all of its descendants as a flat list.
+    """
+    feature = db.query(models.Feature).filter(models.Feature.id == feature_id).first()
+    if not feature:
+        raise HTTPException(status_code=404, detail="Feature not found")
+    
+    # Check if user has access to the project
+    project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return FeatureRepository.get_subtree(db, feature)
+
+
 @router.put("/{feature_id}", response_model=schemas.Feature)
 def update_feature(
     *,
     db: Session = Depends(deps.get_db),
     feature_id: int,
     feature_in: schemas.FeatureUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a feature.
@@ -171,11 +254,13 @@ def update_feature(
     
     # Check if user has access to the project
     project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # If parent_id is provided, check that it exists, belongs to the same project,
     # and doesn't create a cycle
+    update_data = feature_in.dict(exclude_unset=True)
+    parent_feature = None
     if feature_in.parent_id is not None and feature_in.parent_id != feature.parent_id:
         if feature_in.parent_id == feature.id:
             raise HTTPException(status_code=400, detail="A feature cannot be its own parent")
@@ -186,32 +271,56 @@ def update_feature(
         if parent_feature.project_id != feature.project_id:
             raise HTTPException(status_code=400, detail="Parent feature must belong to the same project")
         
-        # Check for cycles in the hierarchy
-        current_parent = parent_feature
-        while current_parent is not None:
-            if current_parent.id == feature.id:
-                raise HTTPException(status_code=400, detail="Circular dependency detected")
-            current_parent = db.query(models.Feature).filter(models.Feature.id == current_parent.parent_id).first()
+        # The new parent must not be inside the feature's own subtree
+        if FeatureRepository.is_in_subtree(feature, parent_feature):
+            raise HTTPException(status_code=400, detail="Circular dependency detected")
+    
+    if "parent_id" in update_data and update_data["parent_id"] != feature.parent_id:
+        FeatureRepository.move_feature(db, feature, parent_feature)
     
-    update_data = feature_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(feature, field, value)
     
     db.add(feature)
+    ProjectRepository.bump_version(db, feature.project_id)
     db.commit()
     db.refresh(feature)
     return feature
 
 
-@router.delete("/{feature_id}", response_model=schemas.Feature)
+def _delete_feature_job(job_id: str, feature_id: int) -> None:
+    """Background task: delete a large feature subtree in committed chunks"""
+    db = SessionLocal()
+    try:
+        jobs.update(job_id, status="running")
+        FeatureRepository.delete_feature_subtree_chunked(
+            db, feature_id, settings.BULK_DELETE_CHUNK_SIZE,
+            on_progress=lambda progress: jobs.update(job_id, progress=progress),
+        )
+        jobs.update(job_id, status="completed")
+    except Exception as e:
+        db.rollback()
+        jobs.update(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+
+
+@router.delete(
+    "/{feature_id}",
+    response_model=schemas.Feature,
+    responses={202: {"model": JobAccepted, "description": "Delete continues as a background job"}},
+)
 def delete_feature(
     *,
     db: Session = Depends(deps.get_db),
     feature_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
-    Delete a feature.
+    Delete a feature together with its sub-features and tests.
+    Subtrees larger than BULK_DELETE_THRESHOLD rows are deleted by a
+    chunked background job; the response is then 202 with a status URL.
     """
     feature = db.query(models.Feature).filter(models.Feature.id == feature_id).first()
     if not feature:
@@ -219,9 +328,22 @@ def delete_feature(
     
     # Check if user has access to the project
     project = db.query(models.Project).filter(models.Project.id == feature.project_id).first()
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    db.delete(feature)
-    db.commit()
-    return feature 
\ No newline at end of file
+    if FeatureRepository.count_subtree_rows(db, feature) > settings.BULK_DELETE_THRESHOLD:
+        job, created = jobs.create("delete_feature", feature_id, current_user.id)
+        # Only the request that registered the job schedules it
+        if created:
+            background_tasks.add_task(_delete_feature_job, job["id"], feature_id)
+        status_url = f"{settings.API_V1_STR}/jobs/{job['id']}"
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(JobAccepted(**job, status_url=status_url)),
+            headers={"Location": status_url},
+        )
+    
+    # Serialize before the rows disappear
+    deleted_feature = schemas.Feature.model_validate(feature, from_attributes=True)
+    FeatureRepository.delete_feature_subtree(db, feature)
+    return deleted_feature 
\ No newline at end of file
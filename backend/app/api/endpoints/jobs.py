@@ -0,0 +1,38 @@
+import asyncio
+import time
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api import deps
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
+from app.core.jobs import FINISHED, jobs
+from app.schemas.job import Job
+
+router = APIRouter()
+
+# How often a long-poll re-checks the job
+LONG_POLL_INTERVAL = 0.2
+
+
+@router.get("/{job_id}", response_model=Job)
+async def read_job(
+    job_id: str,
+    wait: float = 0,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get the status of a background job started by the current user.
+    With `wait` (seconds, capped at JOB_LONG_POLL_MAX), the response is held
+    until the job finishes or the wait runs out.
+    """
+    deadline = time.monotonic() + min(max(wait, 0), settings.JOB_LONG_POLL_MAX)
+    job = jobs.get(job_id, current_user.id)
+    # Sleeping on the event loop keeps waiting clients off the worker threads
+    while job and job["status"] not in FINISHED and time.monotonic() < deadline:
+        await asyncio.sleep(LONG_POLL_INTERVAL)
+        job = jobs.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,36 +1,50 @@
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.api import deps
-from app.models.user import User
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
+from app.core.etag import project_etag, etag_matches, not_modified, set_etag
+from app.core.jobs import jobs
+from app.core.pagination import keyset_paginate
+from app.db.database import SessionLocal
+from app.schemas.job import JobAccepted
+from app.schemas.pagination import CursorPage
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.test_repository import TestRepository
+from app.repositories.node_position_repository import NodePositionRepository
+from app.repositories.project_repository import ProjectRepository
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Project])
+@router.get("/", response_model=Union[List[schemas.Project], CursorPage[schemas.Project]])
 def read_projects(
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
 ) -> Any:
     """
     Retrieve projects.
+    Pass `cursor` (empty for the first page) to get keyset pages instead of skip/limit.
     """
     # Get projects where the user is either the owner or a member
-    projects = (
-        db.query(models.Project)
-        .filter(
-            (models.Project.owner_id == current_user.id) |
-            (models.Project.members.any(id=current_user.id))
-        )
-        .offset(skip)
-        .limit(limit)
-        .all()
+    query = db.query(models.Project).filter(
+        (models.Project.owner_id == current_user.id) |
+        (models.Project.members.any(id=current_user.id))
     )
+    if cursor is not None:
+        items, next_cursor = keyset_paginate(query, cursor, limit, models.Project.id)
+        return {"items": items, "next_cursor": next_cursor}
+    
+    projects = query.offset(skip).limit(limit).all()
     return projects
 
 
@@ -39,7 +53,7 @@ def create_project(
     *,
     db: Session = Depends(deps.get_db),
     project_in: schemas.ProjectCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create new project.
@@ -59,7 +73,7 @@ def read_project(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get project by ID.
@@ -69,19 +83,62 @@ def read_project(
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if user has access to this project
-    if project.owner_id != current_user.id and current_user not in project.members:
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     return project
 
 
+@router.get("/{project_id}/flow", response_model=schemas.ProjectFlowSnapshot)
+def read_project_flow(
+    *,
+    db: Session = Depends(deps.get_db),
+    project_id: int,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get everything the flow editor needs in one response: the feature tree,
+    the project's tests grouped by feature and the saved node positions.
+    """
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    # Check if user has access to this project
+    if project.owner_id != current_user.id and not ProjectRepository.is_member(db, project.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    etag = project_etag(project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    # One query per collection, independent of the size of the project
+    feature_tree = FeatureRepository.get_project_feature_tree(db, project_id)
+    
+    tests_by_feature = {}
+    for test in TestRepository.get_project_tests(db, project_id):
+        tests_by_feature.setdefault(test.feature_id, []).append(test)
+    
+    node_positions = NodePositionRepository.get_project_node_positions(db, project_id=project_id, limit=None)
+    
+    return {
+        "project": project,
+        "features": feature_tree,
+        "tests": tests_by_feature,
+        "node_positions": node_positions,
+    }
+
+
 @router.put("/{project_id}", response_model=schemas.Project)
 def update_project(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
     project_in: schemas.ProjectUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a project.
@@ -104,15 +161,39 @@ def update_project(
     return project
 
 
-@router.delete("/{project_id}", response_model=schemas.Project)
+def _delete_project_job(job_id: str, project_id: int) -> None:
+    """Background task: delete a large project in committed chunks"""
+    db = SessionLocal()
+    try:
+        jobs.update(job_id, status="running")
+        ProjectRepository.delete_project_chunked(
+            db, project_id, settings.BULK_DELETE_CHUNK_SIZE,
+            on_progress=lambda progress: jobs.update(job_id, progress=progress),
+        )
+        jobs.update(job_id, status="completed")
+    except Exception as e:
+        db.rollback()
+        jobs.update(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+
+
+@router.delete(
+    "/{project_id}",
+    response_model=schemas.Project,
+    responses={202: {"model": JobAccepted, "description": "Delete continues as a background job"}},
+)
 def delete_project(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete a project.
+    Large projects (more than BULK_DELETE_THRESHOLD rows) are deleted by a
+    chunked background job; the response is then 202 with a status URL.
     """
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
@@ -122,9 +203,22 @@ def delete_project(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    db.delete(project)
-    db.commit()
-    return project
+    if ProjectRepository.count_project_rows(db, project_id) > settings.BULK_DELETE_THRESHOLD:
+        job, created = jobs.create("delete_project", project_id, current_user.id)
+        # Only the request that registered the job schedules it
+        if created:
+            background_tasks.add_task(_delete_project_job, job["id"], project_id)
+        status_url = f"{settings.API_V1_STR}/jobs/{job['id']}"
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(JobAccepted(**job, status_url=status_url)),
+            headers={"Location": status_url},
+        )
+    
+    # Serialize before the row disappears; the database cascades to dependent rows
+    deleted_project = schemas.Project.model_validate(project, from_attributes=True)
+    ProjectRepository.delete_project(db, project_id)
+    return deleted_project
 
 
 @router.post("/{project_id}/members/{user_id}", response_model=schemas.ProjectWithMembers)
@@ -133,7 +227,7 @@ def add_project_member(
     db: Session = Depends(deps.get_db),
     project_id: int,
     user_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Add a member to a project.
@@ -166,7 +260,7 @@ def remove_project_member(
     db: Session = Depends(deps.get_db),
     project_id: int,
     user_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Remove a member from a project.
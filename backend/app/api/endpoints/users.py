@@ -1,17 +1,20 @@
-from typing import Any, List
+from typing import Any, List, Optional, Union
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.api import deps
+from app.core.auth_cache import CurrentUser, user_cache
+from app.core.pagination import keyset_paginate
 from app.core.security import get_password_hash
+from app.schemas.pagination import CursorPage
 
 router = APIRouter()
 
 @router.get("/me", response_model=schemas.User)
 def read_user_me(
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: models.User = Depends(deps.get_current_user_record),
 ) -> Any:
     """
     Get current user.
@@ -23,7 +26,7 @@ def update_user_me(
     *,
     db: Session = Depends(deps.get_db),
     user_in: schemas.UserUpdate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: models.User = Depends(deps.get_current_user_record),
 ) -> Any:
     """
     Update current user.
@@ -63,27 +66,33 @@ def update_user_me(
     
     db.add(current_user)
     db.commit()
+    user_cache.invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
 # User management endpoints
-@router.get("/", response_model=List[schemas.User])
+@router.get("/", response_model=Union[List[schemas.User], CursorPage[schemas.User]])
 def read_users(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve users.
+    Pass `cursor` (empty for the first page) to get keyset pages instead of skip/limit.
     """
+    if cursor is not None:
+        items, next_cursor = keyset_paginate(db.query(models.User), cursor, limit, models.User.id)
+        return {"items": items, "next_cursor": next_cursor}
     users = db.query(models.User).offset(skip).limit(limit).all()
     return users
 
 @router.get("/{user_id}", response_model=schemas.User)
 def read_user(
     user_id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: CurrentUser = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """
@@ -102,7 +111,7 @@ def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: schemas.UserCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: CurrentUser = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Create new user.
@@ -141,7 +150,7 @@ def update_user(
     db: Session = Depends(deps.get_db),
     user_id: int,
     user_in: schemas.UserUpdate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: CurrentUser = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Update a user.
@@ -191,5 +200,6 @@ def update_user(
     
     db.add(user)
     db.commit()
+    user_cache.invalidate_user(user.id)
     db.refresh(user)
     return user 
\ No newline at end of file
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import calendar
+import json
 
-from app.db.database import get_db
+from app.api.deps import get_current_user
+from app.core.analytics_cache import analytics_cache
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
+from app.core.jobs import jobs
+from app.db.database import SessionLocal, get_db
+from app.repositories.analytics_repository import AnalyticsRepository, BUCKETS, METRICS
 from app.repositories.project_repository import ProjectRepository
 from app.repositories.feature_repository import FeatureRepository
 from app.repositories.test_repository import TestRepository
@@ -13,8 +23,14 @@ from app.schemas.analytics import (
     TestPriorityCount,
     FeatureTestCount,
     ProjectActivityData,
-    TestProgressData
+    TestProgressData,
+    AnalyticsSummary,
+    TimeSeriesData,
 )
+from app.schemas.job import JobAccepted
+
+# Longest range a time series request may cover (about ten years)
+MAX_SERIES_DAYS = 3660
 
 router = APIRouter(
     prefix="/analytics",
@@ -22,117 +38,232 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def _scope(db: Session, current_user: CurrentUser, project_id: Optional[int]) -> List[int]:
+    """Project ids an analytics request covers: the requested project, or every project the user can access"""
+    if project_id is None:
+        return ProjectRepository.get_accessible_project_ids(db, current_user.id)
+    if ProjectRepository.get_version(db, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not ProjectRepository.user_can_access(db, project_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return [project_id]
+
+def _cached(endpoint: str, params: Dict[str, Any], project_ids: List[int], compute):
+    # Single-project results are invalidated by writes to that project only
+    project_id = project_ids[0] if len(project_ids) == 1 else None
+    return analytics_cache.get_or_compute(endpoint, {**params, "projects": project_ids}, project_id, compute)
+
+def _start_job(
+    endpoint: str, params: Dict[str, Any], project_id: Optional[int], project_ids: List[int], user_id: int, compute
+):
+    """Run `compute(db)` as a background job and answer 202 with its status URL.
+
+    Identical requests share the running job; the result also lands in the
+    analytics cache.
+    """
+    def run():
+        db = SessionLocal()
+        try:
+            return _cached(endpoint, params, project_ids, lambda: compute(db))
+        finally:
+            db.close()
+
+    key = json.dumps(jsonable_encoder({**params, "projects": project_ids}), sort_keys=True)
+    job = jobs.start(f"analytics_{endpoint}", project_id, user_id, key, run)
+    status_url = f"{settings.API_V1_STR}/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(JobAccepted(**job, status_url=status_url)),
+        headers={"Location": status_url},
+    )
+
+def _status_and_priority_counts(db: Session, project_ids: List[int]):
+    """Status, priority and status x priority counts from one aggregate query"""
+    test_status = {"tested": 0, "untested": 0, "total": 0}
+    test_priority = {"high": 0, "normal": 0, "low": 0, "total": 0}
+    status_by_priority = []
+    for priority, tested, untested in TestRepository.get_status_priority_counts(db, project_ids):
+        name = priority.value if priority is not None else None
+        test_status["tested"] += tested
+        test_status["untested"] += untested
+        if name in test_priority:
+            test_priority[name] += tested + untested
+        status_by_priority.append({"priority": name, "tested": tested, "untested": untested, "total": tested + untested})
+    test_status["total"] = test_priority["total"] = test_status["tested"] + test_status["untested"]
+    return test_status, test_priority, status_by_priority
+
 @router.get("/test-status", response_model=TestStatusCount)
-def get_test_status_counts(db: Session = Depends(get_db)):
-    """Get counts of tested vs untested tests"""
-    tested_count = TestRepository.count_tests_by_status(db, tested=True)
-    untested_count = TestRepository.count_tests_by_status(db, tested=False)
-    
-    return {
-        "tested": tested_count,
-        "untested": untested_count,
-        "total": tested_count + untested_count
-    }
+def get_test_status_counts(
+    project_id: Optional[int] = None, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get counts of tested vs untested tests in a project (default: all of the user's projects)"""
+    project_ids = _scope(db, current_user, project_id)
+    return _cached("test-status", {}, project_ids, lambda: _status_and_priority_counts(db, project_ids)[0])
 
 @router.get("/test-priority", response_model=TestPriorityCount)
-def get_test_priority_counts(db: Session = Depends(get_db)):
-    """Get counts of tests by priority"""
-    high_count = TestRepository.count_tests_by_priority(db, "high")
-    normal_count = TestRepository.count_tests_by_priority(db, "normal")
-    low_count = TestRepository.count_tests_by_priority(db, "low")
-    
-    return {
-        "high": high_count,
-        "normal": normal_count,
-        "low": low_count,
-        "total": high_count + normal_count + low_count
-    }
+def get_test_priority_counts(
+    project_id: Optional[int] = None, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get counts of tests by priority in a project (default: all of the user's projects)"""
+    project_ids = _scope(db, current_user, project_id)
+    return _cached("test-priority", {}, project_ids, lambda: _status_and_priority_counts(db, project_ids)[1])
 
 @router.get("/feature-test-counts", response_model=List[FeatureTestCount])
-def get_feature_test_counts(project_id: int = None, limit: int = 5, db: Session = Depends(get_db)):
-    """Get test counts for top features (optionally filtered by project)"""
-    return FeatureRepository.get_features_with_test_counts(db, project_id, limit)
-
-@router.get("/project-activity", response_model=ProjectActivityData)
-def get_project_activity(days: int = 30, db: Session = Depends(get_db)):
-    """Get project activity over time (features and tests created)"""
-    end_date = datetime.now()
+def get_feature_test_counts(
+    project_id: Optional[int] = None,
+    limit: int = 5,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Get test counts for top features in a project (default: all of the user's projects)"""
+    project_ids = _scope(db, current_user, project_id)
+    return _cached(
+        "feature-test-counts", {"limit": limit}, project_ids,
+        lambda: FeatureRepository.get_features_with_test_counts(db, project_ids, limit),
+    )
+
+@router.get(
+    "/project-activity",
+    response_model=ProjectActivityData,
+    responses={202: {"model": JobAccepted, "description": "Computed by a background job"}},
+)
+def get_project_activity(
+    project_id: Optional[int] = None,
+    days: int = 30,
+    async_job: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Get activity over time (features and tests created) in a project (default: all of the user's projects).
+    With `async_job`, or more than ANALYTICS_ASYNC_DAYS_THRESHOLD days, the response is 202 with a job status URL"""
+    project_ids = _scope(db, current_user, project_id)
+    compute = lambda session: _project_activity(session, days, project_ids)
+    if async_job or days > settings.ANALYTICS_ASYNC_DAYS_THRESHOLD:
+        return _start_job("project-activity", {"days": days}, project_id, project_ids, current_user.id, compute)
+    return _cached("project-activity", {"days": days}, project_ids, lambda: compute(db))
+
+@router.get(
+    "/test-progress",
+    response_model=TestProgressData,
+    responses={202: {"model": JobAccepted, "description": "Computed by a background job"}},
+)
+def get_test_progress(
+    project_id: Optional[int] = None,
+    async_job: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Get test progress over the last 6 months in a project (default: all of the user's projects).
+    With `async_job`, the response is 202 with a job status URL"""
+    project_ids = _scope(db, current_user, project_id)
+    compute = lambda session: _test_progress(session, project_ids)
+    if async_job:
+        return _start_job("test-progress", {}, project_id, project_ids, current_user.id, compute)
+    return _cached("test-progress", {}, project_ids, lambda: compute(db))
+
+@router.get(
+    "/timeseries",
+    response_model=TimeSeriesData,
+    responses={202: {"model": JobAccepted, "description": "Computed by a background job"}},
+)
+def get_time_series(
+    metrics: List[str] = Query(["tests_added", "tests_tested", "features_added"]),
+    bucket: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tz: str = "UTC",
+    project_id: Optional[int] = None,
+    async_job: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Get gap-filled counts per day/week/month for tests_added, tests_tested and features_added.
+    tests_added and features_added count tests and features that still exist, by when they
+    were created; tests_tested counts every change to tested, including for tests deleted since.
+    Defaults to the last 30 days over all of the user's projects; naive start/end are read as UTC.
+    With `async_job`, or a range over ANALYTICS_ASYNC_DAYS_THRESHOLD days, the response is 202 with a job status URL"""
+    # Cache on the parameters as sent, so requests relying on the "now" default can share an entry
+    params = {"metrics": metrics, "bucket": bucket, "start": start, "end": end, "tz": tz}
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}")
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone {tz}")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    start, end = [moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc) for moment in (start, end)]
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days > MAX_SERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_SERIES_DAYS} days")
+    project_ids = _scope(db, current_user, project_id)
+
+    def compute(session: Session):
+        data = _time_series(session, metrics, bucket, start, end, project_ids, tz)
+        return {
+            "bucket": bucket,
+            "timezone": tz,
+            "buckets": data.pop("buckets"),
+            "series": data,
+        }
+
+    if async_job or (end - start).days > settings.ANALYTICS_ASYNC_DAYS_THRESHOLD:
+        return _start_job("timeseries", params, project_id, project_ids, current_user.id, compute)
+    return _cached("timeseries", params, project_ids, lambda: compute(db))
+
+@router.get("/summary", response_model=AnalyticsSummary)
+def get_analytics_summary(
+    project_id: Optional[int] = None,
+    days: int = 30,
+    top_features: int = 5,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Get every dashboard widget in one response, for a project or all of the user's projects"""
+    project_ids = _scope(db, current_user, project_id)
+
+    def compute():
+        test_status, test_priority, status_by_priority = _status_and_priority_counts(db, project_ids)
+        return {
+            "test_status": test_status,
+            "test_priority": test_priority,
+            "status_by_priority": status_by_priority,
+            "top_features": FeatureRepository.get_features_with_test_counts(db, project_ids, top_features),
+            "activity": _project_activity(db, days, project_ids),
+            "progress": _test_progress(db, project_ids),
+        }
+
+    return _cached("summary", {"days": days, "top_features": top_features}, project_ids, compute)
+
+def _time_series(db: Session, metrics: List[str], bucket: str, start: datetime, end: datetime,
+                 project_ids: List[int], tz: str = "UTC"):
+    return AnalyticsRepository.get_time_series(
+        db, metrics, bucket=bucket, start=start, end=end, tz=tz, project_ids=project_ids
+    )
+
+def _project_activity(db: Session, days: int, project_ids: List[int]):
+    end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(days=days)
-    
-    # Get activity data
-    data = TestRepository.get_activity_by_date_range(db, start_date, end_date)
-    
-    # Format into expected structure
-    dates = []
-    test_counts = []
-    feature_counts = []
-    
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime("%Y-%m-%d")
-        dates.append(date_str)
-        
-        test_count = 0
-        feature_count = 0
-        for item in data:
-            if item["date"].strftime("%Y-%m-%d") == date_str:
-                test_count = item["test_count"]
-                feature_count = item["feature_count"]
-                break
-        
-        test_counts.append(test_count)
-        feature_counts.append(feature_count)
-        current_date += timedelta(days=1)
-    
+    data = _time_series(db, ["tests_added", "features_added"], "day", start_date, end_date, project_ids)
     return {
-        "dates": dates,
-        "test_counts": test_counts,
-        "feature_counts": feature_counts
+        "dates": [bucket.strftime("%Y-%m-%d") for bucket in data["buckets"]],
+        "test_counts": data["tests_added"],
+        "feature_counts": data["features_added"]
     }
 
-@router.get("/test-progress", response_model=TestProgressData)
-def get_test_progress(project_id: int = None, db: Session = Depends(get_db)):
-    """Get test progress over the last 6 months"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=180)  # Approximately 6 months
-    
-    # Get monthly data
-    monthly_data = TestRepository.get_monthly_test_progress(db, start_date, end_date, project_id)
-    
-    # Format into expected structure
-    months = []
-    completed = []
-    added = []
-    
-    # Initialize with last 6 months
-    current_date = start_date
-    while current_date <= end_date:
-        month_name = calendar.month_name[current_date.month][:3]  # Abbreviated month name
-        month_key = f"{month_name} {current_date.year}"
-        
-        if month_key not in months:
-            months.append(month_key)
-            
-            # Find data for this month
-            month_data = next((item for item in monthly_data if 
-                              item["month"] == current_date.month and 
-                              item["year"] == current_date.year), None)
-            
-            if month_data:
-                completed.append(month_data["completed"])
-                added.append(month_data["added"])
-            else:
-                completed.append(0)
-                added.append(0)
-                
-        # Move to next month
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-    
+def _test_progress(db: Session, project_ids: List[int]):
+    # The current month and the five before it
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date.replace(day=1)
+    for _ in range(5):
+        start_date = (start_date - timedelta(days=1)).replace(day=1)
+    data = _time_series(db, ["tests_added", "tests_tested"], "month", start_date, end_date, project_ids)
     return {
-        "months": months,
-        "completed": completed,
-        "added": added
-    } 
\ No newline at end of file
+        "months": [f"{calendar.month_name[bucket.month][:3]} {bucket.year}" for bucket in data["buckets"]],
+        "completed": data["tests_tested"],
+        "added": data["tests_added"]
+    }
@@ -1,10 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from app.schemas.node_position import NodePosition, NodePositionCreate, NodePositionUpdate, NodePositionBulkCreate
+from app.schemas.node_position import (
+    NodePosition, NodePositionCreate, NodePositionUpdate, NodePositionBulkCreate, NodePositionBulkResult,
+    NodePositionDeltaBatch, NodePositionDeltaAccepted, LayoutNode, LayoutResult, NodePositionDataPatch,
+)
+from app.schemas.pagination import CursorPage
 from app.repositories.node_position_repository import NodePositionRepository
-from app.db.database import get_db
+from app.repositories.project_repository import ProjectRepository
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.test_repository import TestRepository
+from app.core.config import settings
+from app.core.etag import project_etag, etag_matches, not_modified, set_etag
+from app.core.position_buffer import position_buffer
+from app.core.layout import compute_tree_layout, hierarchy_token, layout_cache
+from app.core.pubsub import hub
+from app.core.streaming import NDJSON_MEDIA_TYPE, POSITIONS_MEDIA_TYPE, accepts, ndjson_response, positions_response
+from app.api.deps import get_user_from_token
+from app.db.database import SessionLocal, get_db
 
 router = APIRouter(
     prefix="/node-positions",
@@ -13,11 +31,187 @@ router = APIRouter(
 )
 
 
-@router.get("/project/{project_id}", response_model=List[NodePosition])
-def get_project_node_positions(project_id: int, skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
-    """Get all node positions for a project"""
-    positions = NodePositionRepository.get_project_node_positions(db, project_id=project_id, skip=skip, limit=limit)
-    return positions
+@router.get("/project/{project_id}", response_model=Union[List[NodePosition], CursorPage[NodePosition]])
+def get_project_node_positions(
+    project_id: int,
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
+    data_contains: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Get all node positions for a project, including buffered updates not yet written.
+    Pass `cursor` (empty for the first page) to get keyset pages. Send
+    `Accept: application/x-ndjson` or `application/vnd.testflow.positions`
+    to stream every position as NDJSON or the compact columnar format.
+    `data_contains` is a JSON object; only positions whose data contains it are returned"""
+    contains = _parse_data_contains(data_contains)
+    pending = position_buffer.pending(project_id)
+    if pending and NodePositionRepository.get_missing_node_ids(db, project_id, list(pending)):
+        # Nodes that only exist in the buffer have no row to overlay; write them now
+        position_buffer.flush(project_id)
+        pending = position_buffer.pending(project_id)
+    version = ProjectRepository.get_version(db, project_id)
+    etag = None
+    if version is not None:
+        etag = project_etag(project_id, version, position_buffer.generation(project_id))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+    if accepts(request, POSITIONS_MEDIA_TYPE) or accepts(request, NDJSON_MEDIA_TYPE):
+        # Streams every position regardless of skip/limit
+        statement = NodePositionRepository.get_project_node_positions_statement(project_id, data_contains=contains)
+        if accepts(request, POSITIONS_MEDIA_TYPE):
+            streamed = positions_response(statement, pending)
+        else:
+            streamed = ndjson_response(statement, lambda row: dict(row, **pending.get(row["node_id"], {})))
+        if etag:
+            set_etag(streamed, etag)
+        return streamed
+    if cursor is not None:
+        items, next_cursor = NodePositionRepository.get_project_node_positions_page(
+            db, project_id=project_id, cursor=cursor, limit=limit, data_contains=contains
+        )
+        return {"items": _overlay_pending(items, pending), "next_cursor": next_cursor}
+    positions = NodePositionRepository.get_project_node_positions(
+        db, project_id=project_id, skip=skip, limit=limit, data_contains=contains
+    )
+    return _overlay_pending(positions, pending)
+
+
+def _parse_data_contains(data_contains: Optional[str]) -> Optional[dict]:
+    if data_contains is None:
+        return None
+    try:
+        value = json.loads(data_contains)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="data_contains must be a JSON object")
+    if not isinstance(value, dict):
+        raise HTTPException(status_code=400, detail="data_contains must be a JSON object")
+    return value
+
+
+@router.get("/project/{project_id}/viewport", response_model=List[NodePosition])
+def get_viewport_node_positions(
+    project_id: int,
+    request: Request,
+    response: Response,
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    zoom: Optional[float] = Query(None, gt=0),
+    limit: int = Query(5000, ge=1, le=50000),
+    db: Session = Depends(get_db),
+):
+    """Get the node positions inside a bounding box. Below a zoom level of
+    VIEWPORT_TEST_NODE_MIN_ZOOM only feature-level nodes are returned.
+    Supports the same streaming Accept types as the project endpoint"""
+    if min_x > max_x or min_y > max_y:
+        raise HTTPException(status_code=400, detail="min_x/min_y must not exceed max_x/max_y")
+    include_tests = zoom is None or zoom >= settings.VIEWPORT_TEST_NODE_MIN_ZOOM
+    bounds = (min_x, min_y, max_x, max_y)
+
+    def inside(row) -> bool:
+        return min_x <= row["position_x"] <= max_x and min_y <= row["position_y"] <= max_y
+
+    pending = position_buffer.pending(project_id)
+    if any(inside(row) for row in pending.values()):
+        # The box is filtered on stored coordinates, so a node buffered into it
+        # would be missed; write the buffer before querying
+        position_buffer.flush(project_id)
+        pending = position_buffer.pending(project_id)
+    version = ProjectRepository.get_version(db, project_id)
+    etag = None
+    if version is not None:
+        etag = project_etag(project_id, version, position_buffer.generation(project_id))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
+    def overlay_inside(row):
+        row = dict(row, **pending.get(row["node_id"], {}))
+        return row if inside(row) else None
+
+    if accepts(request, POSITIONS_MEDIA_TYPE) or accepts(request, NDJSON_MEDIA_TYPE):
+        statement = NodePositionRepository.get_viewport_statement(project_id, *bounds, include_tests=include_tests)
+        if accepts(request, POSITIONS_MEDIA_TYPE):
+            streamed = positions_response(statement, pending, keep=inside)
+        else:
+            streamed = ndjson_response(statement, overlay_inside)
+        if etag:
+            set_etag(streamed, etag)
+        return streamed
+
+    positions = NodePositionRepository.get_node_positions_in_viewport(
+        db, project_id, *bounds, include_tests=include_tests, limit=limit
+    )
+    # Buffered moves can carry a stored node out of the box
+    return [
+        position for position in _overlay_pending(positions, pending)
+        if position.node_id not in pending or inside(pending[position.node_id])
+    ]
+
+
+def _project_version(db: Session, project_id: int) -> int:
+    version = ProjectRepository.get_version(db, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return version
+
+
+def _project_layout(db: Session, project_id: int, version: int):
+    """Return (layout rows, served from cache) for a project at `version`"""
+    rows = layout_cache.get(project_id, version)
+    if rows is not None:
+        return rows, True
+    features = FeatureRepository.get_project_hierarchy(db, project_id)
+    test_priorities = TestRepository.get_project_test_priorities(db, project_id)
+    token = hierarchy_token(features, test_priorities)
+    rows = layout_cache.get(project_id, version, token)
+    if rows is not None:
+        return rows, True
+    rows = compute_tree_layout(project_id, features, test_priorities)
+    layout_cache.put(project_id, version, token, rows)
+    return rows, False
+
+
+@router.get("/project/{project_id}/layout", response_model=List[LayoutNode])
+def get_project_layout(project_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Compute the default layered layout for every flow node without saving it.
+    Results are cached until the feature hierarchy or test priorities change"""
+    version = _project_version(db, project_id)
+    etag = project_etag(project_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    rows, _ = _project_layout(db, project_id, version)
+    return rows
+
+
+@router.post("/project/{project_id}/layout", response_model=LayoutResult)
+def apply_project_layout(project_id: int, overwrite: bool = False, db: Session = Depends(get_db)):
+    """Save the default layout for nodes without a saved position, or for every node with `overwrite`"""
+    rows, cached = _project_layout(db, project_id, _project_version(db, project_id))
+    inserted, updated = NodePositionRepository.store_layout(db, project_id, rows, overwrite=overwrite)
+    return {"inserted": inserted, "updated": updated, "cached": cached}
+
+
+def _overlay_pending(positions, pending):
+    """Replace stored values with buffered ones for nodes that have pending updates"""
+    if not pending:
+        return positions
+    overlaid = []
+    for position in positions:
+        row = pending.get(position.node_id)
+        if row is None:
+            overlaid.append(position)
+            continue
+        update = {key: value for key, value in row.items() if key not in ("node_id", "project_id")}
+        overlaid.append(NodePosition.model_validate(position, from_attributes=True).model_copy(update=update))
+    return overlaid
 
 
 @router.post("/", response_model=NodePosition, status_code=status.HTTP_201_CREATED)
@@ -26,6 +220,60 @@ def create_node_position(node_position: NodePositionCreate, db: Session = Depend
     return NodePositionRepository.create_node_position(db=db, node_position=node_position)
 
 
+@router.post(
+    "/project/{project_id}/deltas",
+    response_model=NodePositionDeltaAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def buffer_node_position_deltas(project_id: int, batch: NodePositionDeltaBatch):
+    """Queue position updates (e.g. while dragging) to be written in batches.
+    Only the latest value per node is kept; omit `data` to leave stored data untouched"""
+    rows = [delta.dict(exclude_unset=True) for delta in batch.positions]
+    generation = position_buffer.add(project_id, rows)
+    return {"buffered": len(rows), "generation": generation}
+
+
+def _can_sync(project_id: int, token: str) -> bool:
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+        return user is not None and ProjectRepository.user_can_access(db, project_id, user.id)
+    finally:
+        db.close()
+
+
+@router.websocket("/project/{project_id}/ws")
+async def sync_node_positions(websocket: WebSocket, project_id: int, token: str = ""):
+    """Live position sync between a project's editors.
+
+    Clients send `{"positions": [...]}` batches shaped like the deltas endpoint;
+    they are buffered for writing and broadcast to everyone in the project as
+    `{"type": "positions", "positions": [...]}`, coalesced per node and rate-limited.
+    Authenticate with `?token=<access token>`.
+    """
+    if not await run_in_threadpool(_can_sync, project_id, token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    channel = f"project:{project_id}:node-positions"
+    await hub.join(channel, websocket)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                batch = NodePositionDeltaBatch.model_validate_json(text)
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": e.errors(include_url=False, include_context=False)})
+                continue
+            rows = [delta.dict(exclude_unset=True) for delta in batch.positions]
+            position_buffer.add(project_id, rows)
+            await hub.publish(channel, rows)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await hub.leave(channel, websocket)
+
+
 @router.put("/{node_id}/project/{project_id}", response_model=NodePosition)
 def update_node_position(node_id: str, project_id: int, node_position: NodePositionUpdate, db: Session = Depends(get_db)):
     """Update a node position"""
@@ -37,6 +285,19 @@ def update_node_position(node_id: str, project_id: int, node_position: NodePosit
     return db_node_position
 
 
+@router.patch("/{node_id}/project/{project_id}/data", response_model=NodePosition)
+def patch_node_position_data(
+    node_id: str, project_id: int, patch: NodePositionDataPatch, db: Session = Depends(get_db)
+):
+    """Merge keys into a node position's data and drop `remove_keys`; other keys are kept"""
+    db_node_position = NodePositionRepository.patch_node_position_data(
+        db=db, node_id=node_id, project_id=project_id, data=patch.data, remove_keys=patch.remove_keys
+    )
+    if db_node_position is None:
+        raise HTTPException(status_code=404, detail="Node position not found")
+    return db_node_position
+
+
 @router.delete("/{node_id}/project/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_node_position(node_id: str, project_id: int, db: Session = Depends(get_db)):
     """Delete a node position"""
@@ -53,10 +314,9 @@ def delete_project_node_positions(project_id: int, db: Session = Depends(get_db)
     return None
 
 
-@router.post("/bulk", response_model=List[NodePosition], status_code=status.HTTP_201_CREATED)
+@router.post("/bulk", response_model=NodePositionBulkResult)
 def bulk_create_or_update_node_positions(bulk_data: NodePositionBulkCreate, db: Session = Depends(get_db)):
-    """Create or update multiple node positions at once"""
-    positions = NodePositionRepository.bulk_create_or_update_node_positions(
+    """Save a project's full set of node positions; only changed nodes are written, missing ones are removed"""
+    return NodePositionRepository.bulk_create_or_update_node_positions(
         db=db, project_id=bulk_data.project_id, node_positions=bulk_data.positions
-    )
-    return positions 
\ No newline at end of file
+    ) 
\ No newline at end of file
@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-
-from app.schemas.test import Test, TestCreate, TestUpdate
+from typing import List, Optional, Union
+
+from app.schemas.test import (
+    Test,
+    TestCreate,
+    TestUpdate,
+    TestBulkRequest,
+    TestBulkResult,
+    TestBulkStatusUpdate,
+    TestBulkStatusResult,
+)
+from app.schemas.pagination import CursorPage
 from app.repositories.test_repository import TestRepository
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.project_repository import ProjectRepository
+from app.core.etag import project_etag, etag_matches, not_modified, set_etag
 from app.db.database import get_db
 
 router = APIRouter(
@@ -13,8 +25,17 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[Test])
-def get_tests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=Union[List[Test], CursorPage[Test]])
+def get_tests(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """List tests. Pass `cursor` (empty for the first page) to get keyset pages instead of skip/limit"""
+    if cursor is not None:
+        items, next_cursor = TestRepository.get_tests_page(db, cursor=cursor, limit=limit)
+        return {"items": items, "next_cursor": next_cursor}
     tests = TestRepository.get_tests(db, skip=skip, limit=limit)
     return tests
 
@@ -27,8 +48,36 @@ def get_test(test_id: int, db: Session = Depends(get_db)):
     return db_test
 
 
-@router.get("/feature/{feature_id}", response_model=List[Test])
-def get_feature_tests(feature_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/feature/{feature_id}", response_model=Union[List[Test], CursorPage[Test]])
+def get_feature_tests(
+    feature_id: int,
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_descendants: bool = False,
+    db: Session = Depends(get_db),
+):
+    """List a feature's tests. Pass `cursor` (empty for the first page) to get keyset pages"""
+    project_version = ProjectRepository.get_version_for_feature(db, feature_id)
+    if project_version is not None:
+        etag = project_etag(*project_version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+    
+    if include_descendants:
+        feature = FeatureRepository.get_feature(db, feature_id)
+        if feature is None:
+            raise HTTPException(status_code=404, detail="Feature not found")
+        if cursor is not None:
+            items, next_cursor = TestRepository.get_subtree_tests_page(db, feature, cursor=cursor, limit=limit)
+            return {"items": items, "next_cursor": next_cursor}
+        return TestRepository.get_subtree_tests(db, feature, skip=skip, limit=limit)
+    if cursor is not None:
+        items, next_cursor = TestRepository.get_feature_tests_page(db, feature_id=feature_id, cursor=cursor, limit=limit)
+        return {"items": items, "next_cursor": next_cursor}
     tests = TestRepository.get_feature_tests(db, feature_id=feature_id, skip=skip, limit=limit)
     return tests
 
@@ -38,6 +87,12 @@ def create_test(test: TestCreate, db: Session = Depends(get_db)):
     return TestRepository.create_test(db=db, test=test)
 
 
+@router.post("/bulk", response_model=TestBulkResult)
+def bulk_tests(bulk: TestBulkRequest, db: Session = Depends(get_db)):
+    """Create, update and delete many tests in one transaction, reporting errors per item"""
+    return TestRepository.bulk_apply(db=db, bulk=bulk)
+
+
 @router.put("/{test_id}", response_model=Test)
 def update_test(test_id: int, test: TestUpdate, db: Session = Depends(get_db)):
     db_test = TestRepository.update_test(db=db, test_id=test_id, test=test)
@@ -46,14 +101,25 @@ def update_test(test_id: int, test: TestUpdate, db: Session = Depends(get_db)):
     return db_test
 
 
+@router.patch("/bulk-status", response_model=TestBulkStatusResult)
+def bulk_set_test_status(change: TestBulkStatusUpdate, db: Session = Depends(get_db)):
+    """Set tested and/or priority on every test under a feature (and its descendants) or matching a filter"""
+    if change.tested is None and change.priority is None:
+        raise HTTPException(status_code=400, detail="Nothing to update: set tested and/or priority")
+    if change.filter.feature_id is None and change.filter.project_id is None:
+        raise HTTPException(status_code=400, detail="Filter must include feature_id or project_id")
+    updated = TestRepository.bulk_set_status(db=db, change=change)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Feature not found")
+    return {"updated": updated}
+
+
 @router.patch("/{test_id}/toggle", response_model=Test)
 def toggle_test_status(test_id: int, db: Session = Depends(get_db)):
-    db_test = TestRepository.get_test(db, test_id=test_id)
+    db_test = TestRepository.toggle_test(db, test_id=test_id)
     if db_test is None:
         raise HTTPException(status_code=404, detail="Test not found")
-    
-    update_data = TestUpdate(tested=not db_test.tested)
-    return TestRepository.update_test(db=db, test_id=test_id, test=update_data)
+    return db_test
 
 
 @router.delete("/{test_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+MISSING = object()
+# Session.info key collecting the projects a transaction changed analytics inputs for
+DIRTY_KEY = "analytics_dirty_projects"
+# Generation names: "all" covers every entry, "any" every cross-project entry
+ALL_SCOPE = "all"
+ANY_SCOPE = "any"
+
+
+class CacheBackend:
+    """Storage for cached analytics results and their invalidation generations.
+
+    Entries are immutable; invalidation bumps a generation counter that is
+    part of every dependent key, and stale entries simply age out.
+    """
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def generations(self, names: List[str]) -> List[int]:
+        raise NotImplementedError
+
+    def bump(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBackend(CacheBackend):
+    """In-process LRU bounded by entry count, with a TTL per entry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, names: List[str]) -> List[int]:
+        with self._lock:
+            return [self._generations.get(name, 0) for name in names]
+
+    def bump(self, name: str) -> None:
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """Backend shared by all workers through any server speaking the Redis protocol.
+
+    Values are stored as JSON with a PX expiry; size bounds are left to the
+    server's maxmemory policy. `client` may be any object with the redis-py
+    get/set/mget/incr methods.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "testflow:analytics:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("ANALYTICS_CACHE_REDIS_URL is set but the redis package is not installed") from exc
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(self._prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._client.set(self._prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def generations(self, names: List[str]) -> List[int]:
+        values = self._client.mget([f"{self._prefix}gen:{name}" for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, name: str) -> None:
+        self._client.incr(f"{self._prefix}gen:{name}")
+
+
+class AnalyticsCache:
+    """Cache of analytics results keyed by endpoint and parameters.
+
+    Entries for one project are invalidated by writes to that project's
+    tests and features; entries spanning all projects by any such write.
+    Concurrent misses for the same key in this process wait for a single
+    computation instead of each running the query.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, endpoint: str, params: Dict[str, Any], project_id: Optional[int]) -> str:
+        scope = f"project:{project_id}" if project_id else ANY_SCOPE
+        generations = self.backend.generations([ALL_SCOPE, scope])
+        encoded = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+        return f"{endpoint}:{encoded}:{scope}:{generations[0]}.{generations[1]}"
+
+    def get_or_compute(
+        self, endpoint: str, params: Dict[str, Any], project_id: Optional[int], compute: Callable[[], Any]
+    ) -> Any:
+        """Return the cached result for these parameters, computing it at most once per miss"""
+        key = self._key(endpoint, params, project_id)
+        value = self.backend.get(key)
+        if value is not MISSING:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            # Another leader may have stored it between our miss and taking the lock
+            value = self.backend.get(key)
+            if value is MISSING:
+                value = jsonable_encoder(compute())
+                self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, project_ids: Iterable[Optional[int]] = (None,)) -> None:
+        """Drop entries for the given projects; None drops every entry"""
+        project_ids = set(project_ids)
+        if None in project_ids:
+            self.backend.bump(ALL_SCOPE)
+            return
+        for project_id in project_ids:
+            self.backend.bump(f"project:{project_id}")
+        if project_ids:
+            self.backend.bump(ANY_SCOPE)
+
+
+def mark_dirty(db: Session, project_ids: Iterable[Optional[int]]) -> None:
+    """Invalidate analytics for these projects once the session's transaction commits"""
+    db.info.setdefault(DIRTY_KEY, set()).update(project_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    project_ids = session.info.pop(DIRTY_KEY, None)
+    if project_ids:
+        analytics_cache.invalidate(project_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop(DIRTY_KEY, None)
+
+
+def _create_backend() -> CacheBackend:
+    if settings.ANALYTICS_CACHE_REDIS_URL:
+        return RedisBackend(settings.ANALYTICS_CACHE_REDIS_URL)
+    return LocalBackend(settings.ANALYTICS_CACHE_MAX_ENTRIES)
+
+
+analytics_cache = AnalyticsCache(_create_backend(), settings.ANALYTICS_CACHE_TTL)
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user as request handlers see it, without loading the row"""
+    id: int
+    username: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, is_active=bool(user.is_active))
+
+
+class UserCache:
+    """Bounded LRU of access token -> CurrentUser, each entry kept for at most `ttl` seconds.
+
+    Entries never outlive the token's own expiry. Invalidation is per
+    process; other workers pick up user changes once their entries expire.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, CurrentUser]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def put(self, token: str, user: CurrentUser, token_expires_at: Optional[float] = None) -> None:
+        """Cache a user for a token; `token_expires_at` is the token's exp claim (epoch seconds)"""
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, user)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Forget every cached token of a user, e.g. after an update or deactivation"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_MAX_ENTRIES, settings.AUTH_USER_CACHE_TTL)
@@ -10,6 +10,9 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Authenticated users are cached per token for this many seconds, so requests skip the user lookup
+    AUTH_USER_CACHE_TTL: float = 60.0
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000
     # BACKEND_CORS_ORIGINS is a comma-separated list of origins
     # e.g: "http://localhost,http://localhost:8080"
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -24,6 +27,33 @@ class Settings(BaseSettings):
         raise ValueError(v)
 
     PROJECT_NAME: str = "TestFlow"
+
+    # Deletes touching more rows than this run as a chunked background job
+    BULK_DELETE_THRESHOLD: int = 10000
+    BULK_DELETE_CHUNK_SIZE: int = 1000
+    # Background jobs: worker threads, how long finished jobs and results are kept (seconds),
+    # and the longest a status request may wait for a job to finish
+    JOB_WORKERS: int = 4
+    JOB_RESULT_TTL: float = 600.0
+    JOB_LONG_POLL_MAX: float = 30.0
+
+    # Buffered node position updates are written every interval (seconds) or once this many nodes wait
+    POSITION_BUFFER_FLUSH_INTERVAL: float = 1.0
+    POSITION_BUFFER_MAX_PENDING: int = 500
+    # Minimum seconds between position broadcasts to a project's live editors
+    NODE_SYNC_BROADCAST_INTERVAL: float = 0.05
+    # Viewport queries below this zoom level leave out test nodes
+    VIEWPORT_TEST_NODE_MIN_ZOOM: float = 0.5
+    # Monthly test_status_events partitions kept behind and created ahead of the current month
+    TEST_STATUS_EVENT_RETENTION_MONTHS: int = 24
+    TEST_STATUS_EVENT_PARTITIONS_AHEAD: int = 3
+    # Analytics results are cached for this many seconds (or until a write invalidates them)
+    ANALYTICS_CACHE_TTL: float = 60.0
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 1024
+    # Share the cache between workers through a Redis-protocol server (requires the redis package)
+    ANALYTICS_CACHE_REDIS_URL: Optional[str] = os.getenv("ANALYTICS_CACHE_REDIS_URL")
+    # Analytics requests covering more days than this run as background jobs
+    ANALYTICS_ASYNC_DAYS_THRESHOLD: int = 366
     
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
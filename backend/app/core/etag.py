@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def project_etag(project_id: int, version: int, buffered: Optional[int] = None) -> str:
+    """Build a strong ETag from a project's version and, if any, its write-behind buffer generation"""
+    if buffered is not None:
+        return f'"p{project_id}-v{version}-b{buffered}"'
+    return f'"p{project_id}-v{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header covers the given ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Attach the ETag to a response and ask clients to revalidate before reuse"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
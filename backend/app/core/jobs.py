@@ -0,0 +1,137 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+FINISHED = ("completed", "failed")
+
+
+class JobRegistry:
+    """In-process registry of background jobs and their progress.
+
+    Jobs are tracked per worker process, so status URLs must be served by
+    the process that accepted the job. Finished jobs, and their results,
+    are kept for `result_ttl` seconds. A job is only visible to the users
+    who requested it, since its result may hold data others cannot access.
+    """
+
+    def __init__(self, result_ttl: float, max_workers: int):
+        self.result_ttl = result_ttl
+        self.max_workers = max_workers
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def create(
+        self, kind: str, target_id: Optional[int], user_id: int, key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Register a pending job for a user, or return the active one for the same target and key.
+        Returns (job, created); only the caller that created the job should run it"""
+        with self._lock:
+            job, created = self._create(kind, target_id, user_id, key)
+            return self._copy(job), created
+
+    def start(
+        self, kind: str, target_id: Optional[int], user_id: int, key: Optional[str], compute: Callable[[], Any]
+    ) -> Dict[str, Any]:
+        """Create a job and run `compute` for it on the worker pool.
+
+        An identical pending or running job is returned instead, without
+        running anything again.
+        """
+        with self._lock:
+            job, created = self._create(kind, target_id, user_id, key)
+            job = self._copy(job)
+        if created:
+            self.submit(job["id"], compute)
+        return job
+
+    def _create(
+        self, kind: str, target_id: Optional[int], user_id: int, key: Optional[str]
+    ) -> Tuple[Dict[str, Any], bool]:
+        self._purge_expired()
+        for job in self._jobs.values():
+            if (
+                job["kind"] == kind and job["target_id"] == target_id and job["key"] == key
+                and job["status"] in ("pending", "running")
+            ):
+                # Callers have passed the same access checks, so they may share the job
+                job["user_ids"].add(user_id)
+                return job, False
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "target_id": target_id,
+            "key": key,
+            "user_ids": {user_id},
+            "status": "pending",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": datetime.now(timezone.utc),
+            "finished_at": None,
+            "expires_at": None,
+        }
+        self._jobs[job["id"]] = job
+        return job, True
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if fields.get("status") in FINISHED:
+                job["finished_at"] = datetime.now(timezone.utc)
+                job["expires_at"] = job["finished_at"] + timedelta(seconds=self.result_ttl)
+
+    def get(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """A job, or None when it does not exist (any more) or `user_id` did not request it"""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            if job is None or user_id not in job["user_ids"]:
+                return None
+            return self._copy(job)
+
+    def submit(self, job_id: str, compute: Callable[[], Any]) -> None:
+        """Run `compute` on the worker pool and store its JSON-encoded result on the job"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            pool = self._pool
+        pool.submit(self._run, job_id, compute)
+
+    def _run(self, job_id: str, compute: Callable[[], Any]) -> None:
+        self.update(job_id, status="running")
+        try:
+            result = jsonable_encoder(compute())
+        except Exception as e:
+            self.update(job_id, status="failed", error=str(e))
+        else:
+            self.update(job_id, status="completed", result=result)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool after the queued jobs finish"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _purge_expired(self) -> None:
+        now = datetime.now(timezone.utc)
+        expired = [job_id for job_id, job in self._jobs.items() if job["expires_at"] and job["expires_at"] <= now]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _copy(job: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(job, progress=dict(job["progress"]), user_ids=set(job["user_ids"]))
+
+
+jobs = JobRegistry(settings.JOB_RESULT_TTL, settings.JOB_WORKERS)
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Geometry matching the flow editor's default placement
+ROOT_X = 400.0
+ROOT_Y = 50.0
+FIRST_LEVEL_Y = 150.0
+LEVEL_HEIGHT = 250.0
+FEATURE_WIDTH = 400.0
+TEST_OFFSET_X = 500.0
+PRIORITY_OFFSET_X = 250.0
+PRIORITY_OFFSET_Y = 80.0
+
+
+def compute_tree_layout(
+    project_id: int,
+    features: Sequence[Tuple[int, Optional[int], str, int]],
+    test_priorities: Dict[int, Set[str]],
+) -> List[dict]:
+    """Compute a layered tree layout for a project's flow nodes.
+
+    `features` holds (id, parent_id, materialized path, depth) for every
+    feature and `test_priorities` maps feature ids to the test priorities
+    they contain. Features sit on one row per depth, centred over the leaves
+    of their subtree; leaves get a slot wide enough for their test group
+    nodes. Returns node position rows keyed by the editor's node ids.
+    """
+    rows = []
+    if features:
+        # Sorting by path puts every subtree in one contiguous run, in depth-first order
+        features = sorted(features, key=lambda feature: feature[2])
+        ids = np.array([feature[0] for feature in features])
+        parents = np.array([feature[1] or 0 for feature in features])
+        depths = np.array([feature[3] for feature in features])
+        count = len(ids)
+
+        # Subtree sizes, accumulated one level at a time from the deepest up
+        by_id = np.argsort(ids)
+        parent_index = by_id[np.searchsorted(ids, parents, sorter=by_id).clip(max=count - 1)]
+        sizes = np.ones(count, dtype=np.int64)
+        for depth in range(int(depths.max()), 0, -1):
+            level = depths == depth
+            np.add.at(sizes, parent_index[level], sizes[level])
+        subtree_end = np.arange(count) + sizes
+        is_leaf = sizes == 1
+        has_tests = np.isin(ids, np.array(list(test_priorities), dtype=ids.dtype))
+
+        widths = np.where(is_leaf, FEATURE_WIDTH + np.where(has_tests, TEST_OFFSET_X + PRIORITY_OFFSET_X, 0.0), 0.0)
+        right = np.cumsum(widths)
+        left = right - widths
+        # Internal nodes have no width, so left[i] is where their first leaf starts
+        xs = (left + right[subtree_end - 1]) / 2 + ROOT_X - right[-1] / 2
+        ys = FIRST_LEVEL_Y + depths * LEVEL_HEIGHT
+
+        for feature_id, x, y, depth in zip(ids.tolist(), xs.tolist(), ys.tolist(), depths.tolist()):
+            rows.append(_row(str(feature_id), "featureNode" if depth == 0 else "subFeatureNode", x, y))
+            priorities = test_priorities.get(feature_id)
+            if not priorities:
+                continue
+            rows.append(_row(f"tests-{feature_id}", "testNode", x + TEST_OFFSET_X, y))
+            if "high" in priorities:
+                rows.append(_row(
+                    f"high-priority-tests-{feature_id}", "highPriorityTestNode",
+                    x + TEST_OFFSET_X + PRIORITY_OFFSET_X, y - PRIORITY_OFFSET_Y,
+                ))
+            if "low" in priorities:
+                rows.append(_row(
+                    f"low-priority-tests-{feature_id}", "lowPriorityTestNode",
+                    x + TEST_OFFSET_X + PRIORITY_OFFSET_X, y + PRIORITY_OFFSET_Y,
+                ))
+    rows.insert(0, _row(f"project-{project_id}", "rootNode", ROOT_X, ROOT_Y))
+    return rows
+
+
+def _row(node_id: str, node_type: str, x: float, y: float) -> dict:
+    return {"node_id": node_id, "node_type": node_type, "position_x": x, "position_y": y}
+
+
+def hierarchy_token(
+    features: Sequence[Tuple[int, Optional[int], str, int]],
+    test_priorities: Dict[int, Set[str]],
+) -> str:
+    """Digest of everything compute_tree_layout reads, so layouts survive unrelated version bumps"""
+    digest = hashlib.sha1()
+    for feature in sorted(features):
+        digest.update(repr(feature).encode())
+    digest.update(b"|")
+    for feature_id, priorities in sorted(test_priorities.items()):
+        digest.update(repr((feature_id, sorted(priorities))).encode())
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """Computed layouts per project; least recently used are evicted.
+
+    An entry is found by project version without touching the database, or,
+    once the version has moved on, by its hierarchy token: saving positions
+    bumps the version but leaves the layout's inputs unchanged.
+    """
+
+    def __init__(self, max_projects: int = 128):
+        self.max_projects = max_projects
+        self._layouts: "OrderedDict[int, Tuple[int, str, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project_id: int, version: int, token: Optional[str] = None) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._layouts.get(project_id)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                if token is None or entry[1] != token:
+                    return None
+                entry = self._layouts[project_id] = (version, token, entry[2])
+            self._layouts.move_to_end(project_id)
+            return entry[2]
+
+    def put(self, project_id: int, version: int, token: str, rows: List[dict]) -> None:
+        with self._lock:
+            self._layouts[project_id] = (version, token, rows)
+            self._layouts.move_to_end(project_id)
+            while len(self._layouts) > self.max_projects:
+                self._layouts.popitem(last=False)
+
+
+layout_cache = LayoutCache()
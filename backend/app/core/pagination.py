@@ -0,0 +1,69 @@
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Upper bound for the `limit` of cursor-paginated endpoints
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, checking it has `size` values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _matches_type(value: Any, column) -> bool:
+    """Whether a decoded cursor value can be compared with `column`"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value is not None
+    if python_type is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if python_type is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, python_type)
+
+
+def keyset_paginate(query: Query, cursor: Optional[str], limit: int, *columns) -> Tuple[list, Optional[str]]:
+    """Fetch one page of `query` ordered by `columns`, resuming after `cursor`.
+
+    The last column must be unique (normally the primary key) so the order is
+    total. An empty cursor starts from the first row; `limit` may not exceed
+    MAX_PAGE_SIZE (skip/limit listings are not bound by it). Returns the rows and the
+    cursor for the next page, or None when there are no more rows.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        if not all(_matches_type(value, column) for value, column in zip(values, columns)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(*(getattr(last, column.key) for column in columns))
@@ -0,0 +1,146 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PositionBuffer:
+    """Write-behind buffer for high-frequency node position updates.
+
+    Keeps only the latest value per (project_id, node_id) and writes them in
+    batches from a background thread, either every `flush_interval` seconds or
+    as soon as `max_pending` nodes are waiting. Pending values live in this
+    process only; reads served by it overlay them on top of the database.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Dict[str, dict]] = {}
+        self._in_flight: Dict[int, Dict[str, dict]] = {}
+        self._generations: Dict[int, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, project_id: int, rows: List[dict]) -> int:
+        """Buffer position updates for a project and return its new buffer generation"""
+        with self._lock:
+            project = self._pending.setdefault(project_id, {})
+            for row in rows:
+                if row["node_id"] not in project:
+                    self._size += 1
+                    project[row["node_id"]] = dict(row)
+                else:
+                    # Later deltas win, but keep fields (e.g. data) they did not send
+                    project[row["node_id"]].update(row)
+            generation = self._generations.get(project_id, 0) + 1
+            self._generations[project_id] = generation
+            full = self._size >= self.max_pending
+        if full:
+            self._wake.set()
+        return generation
+
+    def pending(self, project_id: int) -> Dict[str, dict]:
+        """Values not yet committed for a project, keyed by node_id"""
+        with self._lock:
+            rows = {node_id: dict(row) for node_id, row in self._in_flight.get(project_id, {}).items()}
+            for node_id, row in self._pending.get(project_id, {}).items():
+                rows.setdefault(node_id, {}).update(row)
+            return rows
+
+    def generation(self, project_id: int) -> Optional[int]:
+        """Buffer generation for a project, or None when nothing is pending for it"""
+        with self._lock:
+            if project_id in self._pending or project_id in self._in_flight:
+                return self._generations.get(project_id)
+            return None
+
+    def flush(self, project_id: Optional[int] = None) -> None:
+        """Write pending values for one project, or all of them, to the database"""
+        with self._flush_lock:
+            with self._lock:
+                if project_id is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {project_id: self._pending.pop(project_id)} if project_id in self._pending else {}
+                self._size -= sum(len(rows) for rows in batch.values())
+                self._in_flight = batch
+            for batch_project_id, rows in batch.items():
+                try:
+                    self._write(batch_project_id, list(rows.values()))
+                except IntegrityError:
+                    # One bad row fails the whole batch; find it by writing the rows one at a time
+                    self._write_each(batch_project_id, rows)
+                except Exception:
+                    logger.exception("Error flushing buffered node positions for project %s", batch_project_id)
+                    self._requeue(batch_project_id, rows)
+            with self._lock:
+                self._in_flight = {}
+
+    def _write_each(self, project_id: int, rows: Dict[str, dict]) -> None:
+        """Write rows one by one, dropping only those the database rejects"""
+        for node_id, row in rows.items():
+            try:
+                self._write(project_id, [row])
+            except IntegrityError as e:
+                # Retrying would never succeed (e.g. the project is gone)
+                logger.warning("Dropping buffered position of node %s in project %s: %s", node_id, project_id, e)
+            except Exception:
+                logger.exception("Error flushing buffered position of node %s in project %s", node_id, project_id)
+                self._requeue(project_id, {node_id: row})
+
+    def _requeue(self, project_id: int, rows: Dict[str, dict]) -> None:
+        with self._lock:
+            project = self._pending.setdefault(project_id, {})
+            for node_id, row in rows.items():
+                if node_id in project:
+                    project[node_id] = dict(row, **project[node_id])
+                else:
+                    project[node_id] = row
+                    self._size += 1
+
+    def _write(self, project_id: int, rows: List[dict]) -> None:
+        from app.db.database import SessionLocal
+        from app.repositories.node_position_repository import NodePositionRepository
+
+        db = SessionLocal()
+        try:
+            NodePositionRepository.apply_position_updates(db, project_id, rows)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher"""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="position-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background flusher and write everything still pending"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+position_buffer = PositionBuffer(
+    flush_interval=settings.POSITION_BUFFER_FLUSH_INTERVAL,
+    max_pending=settings.POSITION_BUFFER_MAX_PENDING,
+)
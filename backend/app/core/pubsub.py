@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PubSubBackend:
+    """Transport that carries hub messages between workers.
+
+    Implementations deliver every message published on a channel to all
+    handlers subscribed to it, in this process or any other worker sharing
+    the backend (e.g. Redis or Postgres LISTEN/NOTIFY).
+    """
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        raise NotImplementedError
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        raise NotImplementedError
+
+
+class LocalBackend(PubSubBackend):
+    """Single-process backend; messages only reach subscribers in this worker"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        for handler in list(self._handlers.get(channel, ())):
+            await handler(message)
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.get(channel, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(channel, None)
+
+
+class Room:
+    """Connections editing one project, with rate-limited, coalesced fan-out.
+
+    Incoming position deltas are merged per node and broadcast at most once
+    every `min_interval` seconds, so many editors dragging at once still
+    produce a bounded number of messages per connection.
+    """
+
+    def __init__(self, channel: str, min_interval: float):
+        self.channel = channel
+        self.min_interval = min_interval
+        self.connections: Set[Any] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._last_sent = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def receive(self, message: Dict[str, Any]) -> None:
+        for position in message["positions"]:
+            self._pending.setdefault(position["node_id"], {}).update(position)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            delay = self._last_sent + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._flush_task = None
+        batch, self._pending = self._pending, {}
+        self._last_sent = time.monotonic()
+        if batch:
+            await self.broadcast({"type": "positions", "positions": list(batch.values())})
+
+    async def broadcast(self, message: Dict[str, Any]) -> None:
+        for connection in list(self.connections):
+            try:
+                await connection.send_json(message)
+            except Exception:
+                # The socket's own receive loop notices the disconnect and leaves the room
+                pass
+
+
+class Hub:
+    """Per-project rooms of WebSocket connections fed through a pub/sub backend"""
+
+    def __init__(self, backend: PubSubBackend, min_interval: float):
+        self.backend = backend
+        self.min_interval = min_interval
+        self._rooms: Dict[str, Room] = {}
+
+    async def join(self, channel: str, connection: Any) -> Room:
+        room = self._rooms.get(channel)
+        if room is None:
+            room = Room(channel, self.min_interval)
+            self._rooms[channel] = room
+            await self.backend.subscribe(channel, room.receive)
+        room.connections.add(connection)
+        return room
+
+    async def leave(self, channel: str, connection: Any) -> None:
+        room = self._rooms.get(channel)
+        if room is None:
+            return
+        room.connections.discard(connection)
+        if not room.connections:
+            await self.backend.unsubscribe(channel, room.receive)
+            del self._rooms[channel]
+
+    async def publish(self, channel: str, positions: List[Dict[str, Any]]) -> None:
+        await self.backend.publish(channel, {"positions": positions})
+
+
+# Swap the backend for a shared one to sync editors connected to different workers
+hub = Hub(LocalBackend(), min_interval=settings.NODE_SYNC_BROADCAST_INTERVAL)
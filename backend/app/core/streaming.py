@@ -0,0 +1,107 @@
+import json
+import struct
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.db.database import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+POSITIONS_MEDIA_TYPE = "application/vnd.testflow.positions"
+# Rows fetched per server-side cursor round trip, and per emitted chunk
+STREAM_BATCH_SIZE = 1000
+
+
+def accepts(request: Request, media_type: str) -> bool:
+    """Whether the Accept header explicitly lists the media type"""
+    accept = request.headers.get("accept", "")
+    return any(part.split(";")[0].strip() == media_type for part in accept.split(","))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _stream_partitions(statement: Select) -> Iterator[list]:
+    # The request's session is closed before the body is sent, so the stream opens its own
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+        for rows in result.mappings().partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def ndjson_response(
+    statement: Select,
+    transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> StreamingResponse:
+    """Stream the statement's rows as newline-delimited JSON, one object per row.
+    Rows for which `transform` returns None are left out"""
+    def generate() -> Iterator[bytes]:
+        for rows in _stream_partitions(statement):
+            objects = (transform(dict(row)) if transform else dict(row) for row in rows)
+            yield "".join(json.dumps(obj, default=_json_default) + "\n" for obj in objects if obj is not None).encode()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _encode_string(value: str) -> bytes:
+    encoded = value.encode()
+    return struct.pack("<H", len(encoded)) + encoded
+
+
+def positions_response(
+    statement: Select,
+    overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> StreamingResponse:
+    """Stream node positions in a compact little-endian columnar format.
+
+    The statement must select node_id, node_type, position_x and position_y;
+    `overrides` maps node ids to values replacing the stored ones, and rows
+    failing `keep` (checked after overriding) are left out. Layout:
+
+        b"TFNP", u8 format version (1)
+        frames, each:
+            u32 n                               rows in the frame, 0 ends the stream
+            u16 k, k x (u16 len, utf-8)         node types added to the type dictionary
+            n x f32 position_x, n x f32 position_y
+            n x u16 index into the type dictionary
+            n x (u16 len, utf-8 node_id)
+    """
+    overrides = overrides or {}
+
+    def generate() -> Iterator[bytes]:
+        yield b"TFNP" + struct.pack("<B", 1)
+        node_types: Dict[str, int] = {}
+        for rows in _stream_partitions(statement):
+            rows = [dict(row, **overrides[row["node_id"]]) if row["node_id"] in overrides else row for row in rows]
+            if keep:
+                rows = [row for row in rows if keep(row)]
+            # An empty frame would read as the end-of-stream marker
+            if not rows:
+                continue
+            new_types = []
+            for row in rows:
+                if row["node_type"] not in node_types:
+                    node_types[row["node_type"]] = len(node_types)
+                    new_types.append(row["node_type"])
+            n = len(rows)
+            yield b"".join([
+                struct.pack("<IH", n, len(new_types)),
+                *(_encode_string(node_type) for node_type in new_types),
+                struct.pack(f"<{n}f", *(row["position_x"] for row in rows)),
+                struct.pack(f"<{n}f", *(row["position_y"] for row in rows)),
+                struct.pack(f"<{n}H", *(node_types[row["node_type"]] for row in rows)),
+                *(_encode_string(row["node_id"]) for row in rows),
+            ])
+        yield struct.pack("<I", 0)
+
+    return StreamingResponse(generate(), media_type=POSITIONS_MEDIA_TYPE)
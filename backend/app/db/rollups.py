@@ -0,0 +1,163 @@
+"""Triggers keeping project_daily_stats in step with the tests and features tables.
+
+Statement-level triggers with transition tables, so a bulk insert or
+update adds one upsert per statement rather than one per row. Days are
+UTC dates. The counters mean the same as the raw counts served for other
+timezones (see AnalyticsRepository.get_time_series):
+
+- tests_added and features_added count the tests and features that still
+  exist, on the day they were created; deleting one takes it back out.
+- tests_tested counts transitions to tested, on the day they happened,
+  like test_status_events; they stay counted when the test is deleted.
+
+Cascaded deletes: by the time the tests' delete trigger runs for a
+deleted feature, the feature is gone and the trigger finds no project.
+A row-level trigger on features subtracts the feature's tests before the
+feature is deleted instead.
+"""
+
+CREATE_ROLLUP_TRIGGERS = """
+CREATE OR REPLACE FUNCTION rollup_tests_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_daily_stats AS s (project_id, day, tests_added, tests_tested, features_added)
+    SELECT project_id, day, sum(added), sum(tested), 0
+    FROM (
+        SELECT f.project_id, (coalesce(n.created_at, now()) AT TIME ZONE 'UTC')::date AS day, 1 AS added, 0 AS tested
+        FROM new_rows n JOIN features f ON f.id = n.feature_id
+        UNION ALL
+        -- Dated like the status event the insert logs
+        SELECT f.project_id, (now() AT TIME ZONE 'UTC')::date, 0, 1
+        FROM new_rows n JOIN features f ON f.id = n.feature_id
+        WHERE n.tested
+    ) AS events
+    GROUP BY project_id, day
+    ON CONFLICT (project_id, day) DO UPDATE
+    SET tests_added = s.tests_added + EXCLUDED.tests_added,
+        tests_tested = s.tests_tested + EXCLUDED.tests_tested;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_tests_updated() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_daily_stats AS s (project_id, day, tests_added, tests_tested, features_added)
+    SELECT f.project_id, (now() AT TIME ZONE 'UTC')::date, 0, count(*), 0
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN features f ON f.id = n.feature_id
+    WHERE n.tested AND NOT coalesce(o.tested, false)
+    GROUP BY 1, 2
+    ON CONFLICT (project_id, day) DO UPDATE
+    SET tests_tested = s.tests_tested + EXCLUDED.tests_tested;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_tests_deleted() RETURNS trigger AS $$
+BEGIN
+    UPDATE project_daily_stats s SET tests_added = s.tests_added - d.tests
+    FROM (
+        SELECT f.project_id, (o.created_at AT TIME ZONE 'UTC')::date AS day, count(*) AS tests
+        FROM old_rows o JOIN features f ON f.id = o.feature_id
+        GROUP BY 1, 2
+    ) AS d
+    WHERE s.project_id = d.project_id AND s.day = d.day;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_features_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_daily_stats AS s (project_id, day, tests_added, tests_tested, features_added)
+    SELECT n.project_id, (coalesce(n.created_at, now()) AT TIME ZONE 'UTC')::date, 0, 0, count(*)
+    FROM new_rows n
+    GROUP BY 1, 2
+    ON CONFLICT (project_id, day) DO UPDATE
+    SET features_added = s.features_added + EXCLUDED.features_added;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_feature_deleting() RETURNS trigger AS $$
+BEGIN
+    UPDATE project_daily_stats s SET tests_added = s.tests_added - d.tests
+    FROM (
+        SELECT (t.created_at AT TIME ZONE 'UTC')::date AS day, count(*) AS tests
+        FROM tests t
+        WHERE t.feature_id = OLD.id
+        GROUP BY 1
+    ) AS d
+    WHERE s.project_id = OLD.project_id AND s.day = d.day;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_features_deleted() RETURNS trigger AS $$
+BEGIN
+    UPDATE project_daily_stats s SET features_added = s.features_added - d.features
+    FROM (
+        SELECT project_id, (created_at AT TIME ZONE 'UTC')::date AS day, count(*) AS features
+        FROM old_rows
+        GROUP BY 1, 2
+    ) AS d
+    WHERE s.project_id = d.project_id AND s.day = d.day;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tests_rollup_insert AFTER INSERT ON tests
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tests_inserted();
+CREATE TRIGGER tests_rollup_update AFTER UPDATE ON tests
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tests_updated();
+CREATE TRIGGER tests_rollup_delete AFTER DELETE ON tests
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tests_deleted();
+CREATE TRIGGER features_rollup_insert AFTER INSERT ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_features_inserted();
+CREATE TRIGGER features_rollup_deleting BEFORE DELETE ON features
+    FOR EACH ROW EXECUTE FUNCTION rollup_feature_deleting();
+CREATE TRIGGER features_rollup_delete AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_features_deleted();
+"""
+
+DROP_ROLLUP_TRIGGERS = """
+DROP TRIGGER IF EXISTS features_rollup_delete ON features;
+DROP TRIGGER IF EXISTS features_rollup_deleting ON features;
+DROP TRIGGER IF EXISTS features_rollup_insert ON features;
+DROP TRIGGER IF EXISTS tests_rollup_delete ON tests;
+DROP TRIGGER IF EXISTS tests_rollup_update ON tests;
+DROP TRIGGER IF EXISTS tests_rollup_insert ON tests;
+DROP FUNCTION IF EXISTS rollup_features_deleted();
+DROP FUNCTION IF EXISTS rollup_feature_deleting();
+DROP FUNCTION IF EXISTS rollup_features_inserted();
+DROP FUNCTION IF EXISTS rollup_tests_deleted();
+DROP FUNCTION IF EXISTS rollup_tests_updated();
+DROP FUNCTION IF EXISTS rollup_tests_inserted();
+"""
+
+# Transitions to tested come from the status event log, so they only reach
+# back as far as its retention (TEST_STATUS_EVENT_RETENTION_MONTHS)
+REBUILD_DAILY_STATS = """
+INSERT INTO project_daily_stats (project_id, day, tests_added, tests_tested, features_added)
+SELECT project_id, day, sum(tests_added), sum(tests_tested), sum(features_added)
+FROM (
+    SELECT f.project_id, (t.created_at AT TIME ZONE 'UTC')::date AS day,
+           1 AS tests_added, 0 AS tests_tested, 0 AS features_added
+    FROM tests t JOIN features f ON f.id = t.feature_id
+    WHERE (CAST(:project_id AS integer) IS NULL OR f.project_id = :project_id)
+    UNION ALL
+    SELECT e.project_id, (e.occurred_at AT TIME ZONE 'UTC')::date, 0, 1, 0
+    FROM test_status_events e JOIN projects p ON p.id = e.project_id
+    WHERE e.new_tested IS TRUE AND e.old_tested IS NOT TRUE
+      AND (CAST(:project_id AS integer) IS NULL OR e.project_id = :project_id)
+    UNION ALL
+    SELECT project_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 1
+    FROM features
+    WHERE CAST(:project_id AS integer) IS NULL OR project_id = :project_id
+) AS events
+GROUP BY project_id, day
+"""
@@ -0,0 +1,86 @@
+"""DDL for the partitioned test_status_events log.
+
+test_status_events is range-partitioned by month on occurred_at. Rows are
+appended by statement-level triggers on tests whenever a test is created
+or its tested/priority values change. Monthly partitions are created
+ahead of time (see TestStatusEventRepository.ensure_partitions); a
+default partition catches anything outside them until the maintenance
+job moves those rows into their own month's partition.
+"""
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+PARTITION_PREFIX = "test_status_events_y"
+DEFAULT_PARTITION = "test_status_events_default"
+
+CREATE_STATUS_EVENT_TRIGGERS = f"""
+CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF test_status_events DEFAULT;
+
+CREATE OR REPLACE FUNCTION log_test_status_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO test_status_events
+        (test_id, feature_id, project_id, old_tested, new_tested, old_priority, new_priority)
+    SELECT n.id, n.feature_id, f.project_id, NULL, n.tested, NULL, n.priority
+    FROM new_rows n JOIN features f ON f.id = n.feature_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_test_status_updated() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO test_status_events
+        (test_id, feature_id, project_id, old_tested, new_tested, old_priority, new_priority)
+    SELECT n.id, n.feature_id, f.project_id, o.tested, n.tested, o.priority, n.priority
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN features f ON f.id = n.feature_id
+    WHERE n.tested IS DISTINCT FROM o.tested OR n.priority IS DISTINCT FROM o.priority;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tests_status_log_insert AFTER INSERT ON tests
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_test_status_inserted();
+CREATE TRIGGER tests_status_log_update AFTER UPDATE ON tests
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_test_status_updated();
+"""
+
+DROP_STATUS_EVENT_TRIGGERS = """
+DROP TRIGGER IF EXISTS tests_status_log_update ON tests;
+DROP TRIGGER IF EXISTS tests_status_log_insert ON tests;
+DROP FUNCTION IF EXISTS log_test_status_updated();
+DROP FUNCTION IF EXISTS log_test_status_inserted();
+"""
+
+
+def shift_month(year: int, month: int, months: int) -> Tuple[int, int]:
+    """(year, month) moved by a number of months, which may be negative"""
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"{PARTITION_PREFIX}{year:04d}m{month:02d}"
+
+
+def month_bounds(year: int, month: int) -> Tuple[str, str]:
+    """Inclusive start and exclusive end of one UTC calendar month, as timestamptz literals"""
+    next_year, next_month = shift_month(year, month, 1)
+    return f"{year:04d}-{month:02d}-01 00:00:00+00", f"{next_year:04d}-{next_month:02d}-01 00:00:00+00"
+
+
+def create_partition_sql(year: int, month: int) -> str:
+    """CREATE statement for the partition holding one UTC calendar month"""
+    start, end = month_bounds(year, month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} PARTITION OF test_status_events "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def initial_partitions_sql(today: Optional[date] = None) -> List[str]:
+    """CREATE statements for the current and next month, so a fresh schema does not log into the default"""
+    today = today or datetime.now(timezone.utc).date()
+    return [create_partition_sql(*shift_month(today.year, today.month, offset)) for offset in range(2)]
@@ -0,0 +1,226 @@
+"""Triggers keeping the denormalized test counters on features and projects current.
+
+Every feature stores the tests attached to it directly (test_count,
+tested_count, untested_count) and the totals over its whole subtree
+(subtree_*). Projects store the totals over all their features. The
+triggers are statement-level with transition tables. Each one reduces
+its statement to per-feature deltas and then adds them to the feature,
+to every ancestor named in its materialized path, and to the project.
+
+Cascaded deletes: by the time the tests' delete trigger runs, the
+deleted feature is gone, so it finds nothing to update. The features'
+delete trigger subtracts the counts the feature still held instead.
+"""
+
+
+def _apply_deltas(deltas: str) -> str:
+    """Statement adding (feature_id, project_id, path, tests, tested) deltas to features and projects"""
+    return f"""
+    WITH deltas AS ({deltas}),
+    ancestors AS (
+        SELECT a.id, a.id = d.feature_id AS own, d.tests, d.tested
+        FROM deltas d
+        CROSS JOIN LATERAL unnest(string_to_array(trim(BOTH '/' FROM d.path), '/')::integer[]) AS a(id)
+    ),
+    per_feature AS (
+        SELECT id, sum(tests) AS tests, sum(tested) AS tested,
+               coalesce(sum(tests) FILTER (WHERE own), 0) AS own_tests,
+               coalesce(sum(tested) FILTER (WHERE own), 0) AS own_tested
+        FROM ancestors
+        GROUP BY id
+        HAVING sum(tests) <> 0 OR sum(tested) <> 0
+    ),
+    updated_features AS (
+        UPDATE features f SET
+            test_count = f.test_count + p.own_tests,
+            tested_count = f.tested_count + p.own_tested,
+            untested_count = f.untested_count + p.own_tests - p.own_tested,
+            subtree_test_count = f.subtree_test_count + p.tests,
+            subtree_tested_count = f.subtree_tested_count + p.tested,
+            subtree_untested_count = f.subtree_untested_count + p.tests - p.tested
+        FROM per_feature p
+        WHERE f.id = p.id
+    )
+    UPDATE projects pr SET
+        test_count = pr.test_count + d.tests,
+        tested_count = pr.tested_count + d.tested,
+        untested_count = pr.untested_count + d.tests - d.tested
+    FROM (SELECT project_id, sum(tests) AS tests, sum(tested) AS tested FROM deltas GROUP BY project_id) d
+    WHERE pr.id = d.project_id AND (d.tests <> 0 OR d.tested <> 0);
+    """
+
+
+_FEATURE_PATH = "coalesce({alias}.path, '/' || {alias}.id || '/')"
+
+_TESTS_INSERTED = f"""
+    SELECT f.id AS feature_id, f.project_id, {_FEATURE_PATH.format(alias='f')} AS path,
+           count(*) AS tests, count(*) FILTER (WHERE n.tested) AS tested
+    FROM new_rows n JOIN features f ON f.id = n.feature_id
+    GROUP BY f.id
+"""
+
+_TESTS_DELETED = f"""
+    SELECT f.id AS feature_id, f.project_id, {_FEATURE_PATH.format(alias='f')} AS path,
+           -count(*) AS tests, -count(*) FILTER (WHERE o.tested) AS tested
+    FROM old_rows o JOIN features f ON f.id = o.feature_id
+    GROUP BY f.id
+"""
+
+# A test moved between features or flipped tested leaves its old feature and joins its new one
+_TESTS_UPDATED = f"""
+    SELECT f.id AS feature_id, f.project_id, {_FEATURE_PATH.format(alias='f')} AS path,
+           sum(c.tests) AS tests, sum(c.tested) AS tested
+    FROM (
+        SELECT n.feature_id, 1 AS tests, CASE WHEN n.tested THEN 1 ELSE 0 END AS tested
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.feature_id IS DISTINCT FROM o.feature_id OR n.tested IS DISTINCT FROM o.tested
+        UNION ALL
+        SELECT o.feature_id, -1, CASE WHEN o.tested THEN -1 ELSE 0 END
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.feature_id IS DISTINCT FROM o.feature_id OR n.tested IS DISTINCT FROM o.tested
+    ) c
+    JOIN features f ON f.id = c.feature_id
+    GROUP BY f.id
+"""
+
+# A re-parented feature takes its own tests off the old ancestors and onto
+# the new ones; moving a subtree updates every descendant's path as well,
+# so each feature only needs to move its direct counts
+_FEATURES_MOVED = f"""
+    SELECT o.id AS feature_id, o.project_id, {_FEATURE_PATH.format(alias='o')} AS path,
+           -o.test_count AS tests, -o.tested_count AS tested
+    FROM old_rows o JOIN new_rows n ON n.id = o.id
+    WHERE n.path IS DISTINCT FROM o.path AND o.test_count <> 0
+    UNION ALL
+    SELECT n.id, n.project_id, {_FEATURE_PATH.format(alias='n')}, n.test_count, n.tested_count
+    FROM old_rows o JOIN new_rows n ON n.id = o.id
+    WHERE n.path IS DISTINCT FROM o.path AND o.test_count <> 0
+"""
+
+_FEATURES_DELETED = f"""
+    SELECT o.id AS feature_id, o.project_id, {_FEATURE_PATH.format(alias='o')} AS path,
+           -o.test_count AS tests, -o.tested_count AS tested
+    FROM old_rows o
+    WHERE o.test_count <> 0
+"""
+
+
+def _trigger_function(name: str, deltas: str) -> str:
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    {_apply_deltas(deltas)}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+CREATE_TEST_COUNT_TRIGGERS = (
+    _trigger_function("count_tests_inserted", _TESTS_INSERTED)
+    + _trigger_function("count_tests_updated", _TESTS_UPDATED)
+    + _trigger_function("count_tests_deleted", _TESTS_DELETED)
+    + _trigger_function("count_features_moved", _FEATURES_MOVED)
+    + _trigger_function("count_features_deleted", _FEATURES_DELETED)
+    + """
+CREATE TRIGGER tests_count_insert AFTER INSERT ON tests
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_tests_inserted();
+CREATE TRIGGER tests_count_update AFTER UPDATE ON tests
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_tests_updated();
+CREATE TRIGGER tests_count_delete AFTER DELETE ON tests
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_tests_deleted();
+CREATE TRIGGER features_count_update AFTER UPDATE ON features
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_features_moved();
+CREATE TRIGGER features_count_delete AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_features_deleted();
+"""
+)
+
+DROP_TEST_COUNT_TRIGGERS = """
+DROP TRIGGER IF EXISTS features_count_delete ON features;
+DROP TRIGGER IF EXISTS features_count_update ON features;
+DROP TRIGGER IF EXISTS tests_count_delete ON tests;
+DROP TRIGGER IF EXISTS tests_count_update ON tests;
+DROP TRIGGER IF EXISTS tests_count_insert ON tests;
+DROP FUNCTION IF EXISTS count_features_deleted();
+DROP FUNCTION IF EXISTS count_features_moved();
+DROP FUNCTION IF EXISTS count_tests_deleted();
+DROP FUNCTION IF EXISTS count_tests_updated();
+DROP FUNCTION IF EXISTS count_tests_inserted();
+"""
+
+# Counters recomputed from the tests table, for features of :project_id (all when NULL)
+_EXPECTED_FEATURE_COUNTS = f"""
+WITH direct AS (
+    SELECT f.id, {_FEATURE_PATH.format(alias='f')} AS path,
+           count(t.id) AS tests, count(t.id) FILTER (WHERE t.tested) AS tested
+    FROM features f LEFT JOIN tests t ON t.feature_id = f.id
+    WHERE (CAST(:project_id AS integer) IS NULL OR f.project_id = :project_id)
+    GROUP BY f.id
+),
+subtree AS (
+    SELECT a.id, sum(d.tests) AS tests, sum(d.tested) AS tested
+    FROM direct d
+    CROSS JOIN LATERAL unnest(string_to_array(trim(BOTH '/' FROM d.path), '/')::integer[]) AS a(id)
+    GROUP BY a.id
+),
+expected AS (
+    SELECT d.id, d.tests, d.tested, d.tests - d.tested AS untested,
+           coalesce(s.tests, 0) AS subtree_tests, coalesce(s.tested, 0) AS subtree_tested,
+           coalesce(s.tests, 0) - coalesce(s.tested, 0) AS subtree_untested
+    FROM direct d LEFT JOIN subtree s ON s.id = d.id
+)
+"""
+
+_FEATURE_DRIFT = """
+(f.test_count, f.tested_count, f.untested_count,
+ f.subtree_test_count, f.subtree_tested_count, f.subtree_untested_count)
+IS DISTINCT FROM
+(e.tests, e.tested, e.untested, e.subtree_tests, e.subtree_tested, e.subtree_untested)
+"""
+
+_EXPECTED_PROJECT_COUNTS = """
+WITH expected AS (
+    SELECT p.id, count(t.id) AS tests, count(t.id) FILTER (WHERE t.tested) AS tested,
+           count(t.id) - count(t.id) FILTER (WHERE t.tested) AS untested
+    FROM projects p
+    LEFT JOIN features f ON f.project_id = p.id
+    LEFT JOIN tests t ON t.feature_id = f.id
+    WHERE (CAST(:project_id AS integer) IS NULL OR p.id = :project_id)
+    GROUP BY p.id
+)
+"""
+
+_PROJECT_DRIFT = """
+(p.test_count, p.tested_count, p.untested_count) IS DISTINCT FROM (e.tests, e.tested, e.untested)
+"""
+
+VERIFY_FEATURE_TEST_COUNTS = _EXPECTED_FEATURE_COUNTS + f"""
+SELECT f.id FROM features f JOIN expected e ON e.id = f.id WHERE {_FEATURE_DRIFT} ORDER BY f.id
+"""
+
+VERIFY_PROJECT_TEST_COUNTS = _EXPECTED_PROJECT_COUNTS + f"""
+SELECT p.id FROM projects p JOIN expected e ON e.id = p.id WHERE {_PROJECT_DRIFT} ORDER BY p.id
+"""
+
+REBUILD_FEATURE_TEST_COUNTS = _EXPECTED_FEATURE_COUNTS + f"""
+UPDATE features f SET
+    test_count = e.tests, tested_count = e.tested, untested_count = e.untested,
+    subtree_test_count = e.subtree_tests, subtree_tested_count = e.subtree_tested,
+    subtree_untested_count = e.subtree_untested
+FROM expected e
+WHERE f.id = e.id AND {_FEATURE_DRIFT}
+RETURNING f.id
+"""
+
+REBUILD_PROJECT_TEST_COUNTS = _EXPECTED_PROJECT_COUNTS + f"""
+UPDATE projects p SET test_count = e.tests, tested_count = e.tested, untested_count = e.untested
+FROM expected e
+WHERE p.id = e.id AND {_PROJECT_DRIFT}
+RETURNING p.id
+"""
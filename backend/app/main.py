@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.core.jobs import jobs
+from app.core.position_buffer import position_buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    position_buffer.start()
+    yield
+    # Write buffered node positions before the process exits
+    position_buffer.stop()
+    jobs.shutdown()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -10,6 +24,7 @@ app = FastAPI(
     description="API for TestFlow application",
     version="0.1.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -19,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Include API router
@@ -3,4 +3,6 @@ from .project import Project, project_members
 from .test_case import TestCase, PriorityLevel, TestStatus
 from .test_run import TestRun, TestRunStatus
 from .feature import Feature
-from .node_position import NodePosition 
\ No newline at end of file
+from .node_position import NodePosition
+from .project_daily_stats import ProjectDailyStats
+from .test_status_event import TestStatusEvent
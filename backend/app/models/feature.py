@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, DDL, event
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from app.db.database import Base
+from app.db.test_counts import CREATE_TEST_COUNT_TRIGGERS
 
 class Feature(Base):
     __tablename__ = "features"
@@ -9,17 +10,49 @@ class Feature(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
-    parent_id = Column(Integer, ForeignKey("features.id"), nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    parent_id = Column(Integer, ForeignKey("features.id", ondelete="CASCADE"), nullable=True)
+    # Materialized path of ancestor ids including this feature, e.g. "/1/5/9/"
+    path = Column(String, nullable=True)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")  # 0 for root features
+    # Test counters maintained by triggers (app/db/test_counts.py): tests attached
+    # directly to this feature, and totals over the feature and all its descendants
+    test_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tested_count = Column(Integer, nullable=False, default=0, server_default="0")
+    untested_count = Column(Integer, nullable=False, default=0, server_default="0")
+    subtree_test_count = Column(Integer, nullable=False, default=0, server_default="0")
+    subtree_tested_count = Column(Integer, nullable=False, default=0, server_default="0")
+    subtree_untested_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # varchar_pattern_ops lets "path LIKE 'prefix%'" use the index under any collation
+        Index("ix_features_path", "path", postgresql_ops={"path": "varchar_pattern_ops"}),
+        # Serves keyset pagination of a project's features
+        Index("ix_features_project_id_id", "project_id", "id"),
+        # Top features by test count are read straight off this index
+        Index("ix_features_project_id_test_count", "project_id", "test_count"),
+        # Covers features_added counts for one project's date range
+        Index("ix_features_project_id_created_at", "project_id", "created_at"),
+    )
+
     # Relationships
+    # Deletes are cascaded by the database (ON DELETE CASCADE), so the ORM
+    # never loads dependent rows just to delete them
     project = relationship("Project", back_populates="features")
-    tests = relationship("Test", back_populates="feature", cascade="all, delete-orphan")
+    tests = relationship("Test", back_populates="feature", cascade="all, delete-orphan", passive_deletes=True)
     
     # Self-referential relationship
     children = relationship("Feature", 
-                           backref="parent",
-                           remote_side=[id],
-                           cascade="all") 
\ No newline at end of file
+                           backref=backref("parent", remote_side=[id]),
+                           cascade="all, delete-orphan",
+                           passive_deletes=True)
+
+
+# Registered on the metadata so the tests table already exists when the triggers are created
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(CREATE_TEST_COUNT_TRIGGERS).execute_if(dialect="postgresql"),
+)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
 
 from app.db.database import Base
 
@@ -15,9 +15,20 @@ class NodePosition(Base):
     node_type = Column(String, nullable=False)  # Type of the node (e.g., featureNode, testNode)
     position_x = Column(Float, nullable=False)  # X coordinate
     position_y = Column(Float, nullable=False)  # Y coordinate
-    data = Column(JSON, nullable=True)  # Additional data (optional)
+    data = Column(JSONB, nullable=True)  # Additional data (optional)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # One saved position per flow node; target of the bulk upsert
+        UniqueConstraint("project_id", "node_id", name="uq_node_positions_project_id_node_id"),
+        # Serves keyset pagination of a project's positions
+        Index("ix_node_positions_project_id_id", "project_id", "id"),
+        # Serves viewport (bounding box) queries
+        Index("ix_node_positions_project_id_position", "project_id", "position_x", "position_y"),
+        # Serves data containment (@>) filters
+        Index("ix_node_positions_data", "data", postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}),
+    )
+
     # Relationship
     project = relationship("Project", back_populates="node_positions") 
\ No newline at end of file
@@ -8,7 +8,7 @@ project_members = Table(
     "project_members",
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id")),
-    Column("project_id", Integer, ForeignKey("projects.id")),
+    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
 )
 
 class Project(Base):
@@ -18,12 +18,19 @@ class Project(Base):
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Bumped by every write to the project's features, tests and node positions
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Test counters over all the project's features, maintained by triggers (app/db/test_counts.py)
+    test_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tested_count = Column(Integer, nullable=False, default=0, server_default="0")
+    untested_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
+    # Child rows are removed by ON DELETE CASCADE foreign keys (passive_deletes)
     owner = relationship("User", foreign_keys=[owner_id], back_populates="owned_projects")
-    members = relationship("User", secondary=project_members, backref="member_projects")
-    test_cases = relationship("TestCase", back_populates="project", cascade="all, delete-orphan")
-    features = relationship("Feature", back_populates="project", cascade="all, delete-orphan")
-    node_positions = relationship("NodePosition", back_populates="project", cascade="all, delete-orphan") 
\ No newline at end of file
+    members = relationship("User", secondary=project_members, backref="member_projects", passive_deletes=True)
+    test_cases = relationship("TestCase", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    features = relationship("Feature", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    node_positions = relationship("NodePosition", back_populates="project", cascade="all, delete-orphan", passive_deletes=True) 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, DDL, event
+
+from app.db.database import Base
+from app.db.rollups import CREATE_ROLLUP_TRIGGERS
+
+
+class ProjectDailyStats(Base):
+    """Per-project daily counters maintained by triggers on tests and features"""
+    __tablename__ = "project_daily_stats"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC date
+    tests_added = Column(Integer, nullable=False, default=0, server_default="0")
+    tests_tested = Column(Integer, nullable=False, default=0, server_default="0")
+    features_added = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+# Tables created with metadata.create_all (init_db.py) get the triggers too
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(CREATE_ROLLUP_TRIGGERS).execute_if(dialect="postgresql"),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import TIMESTAMP
@@ -23,5 +23,12 @@ class Test(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Serves keyset pagination of a feature's tests
+        Index("ix_tests_feature_id_id", "feature_id", "id"),
+        # Covers the status/priority counts, so a project's tests are counted index-only
+        Index("ix_tests_feature_id_tested_priority", "feature_id", "tested", "priority"),
+    )
+
     # Relationship
     feature = relationship("Feature", back_populates="tests") 
\ No newline at end of file
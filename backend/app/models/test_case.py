@@ -26,7 +26,7 @@ class TestCase(Base):
     expected_result = Column(Text, nullable=True)
     priority = Column(Enum(PriorityLevel), default=PriorityLevel.MEDIUM)
     status = Column(Enum(TestStatus), default=TestStatus.NOT_STARTED)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -34,4 +34,4 @@ class TestCase(Base):
     # Relationships
     project = relationship("Project", back_populates="test_cases")
     creator = relationship("User", foreign_keys=[created_by])
-    test_runs = relationship("TestRun", back_populates="test_case", cascade="all, delete-orphan") 
\ No newline at end of file
+    test_runs = relationship("TestRun", back_populates="test_case", cascade="all, delete-orphan", passive_deletes=True) 
\ No newline at end of file
@@ -14,7 +14,7 @@ class TestRun(Base):
     __tablename__ = "test_runs"
 
     id = Column(Integer, primary_key=True, index=True)
-    test_case_id = Column(Integer, ForeignKey("test_cases.id"))
+    test_case_id = Column(Integer, ForeignKey("test_cases.id", ondelete="CASCADE"))
     status = Column(Enum(TestRunStatus), default=TestRunStatus.PENDING)
     notes = Column(Text, nullable=True)
     executed_by = Column(Integer, ForeignKey("users.id"))
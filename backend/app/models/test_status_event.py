@@ -0,0 +1,47 @@
+from sqlalchemy import BigInteger, Boolean, Column, DDL, Enum, Index, Integer, event, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+from app.db.status_events import CREATE_STATUS_EVENT_TRIGGERS, initial_partitions_sql
+from app.models.test import PriorityEnum
+
+
+class TestStatusEvent(Base):
+    """Append-only log of test creation and tested/priority changes, partitioned by month"""
+    __tablename__ = "test_status_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    occurred_at = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    # No foreign keys: history outlives deleted tests, features and projects
+    test_id = Column(Integer, nullable=False)
+    feature_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=False)
+    old_tested = Column(Boolean, nullable=True)  # NULL for a newly created test
+    new_tested = Column(Boolean, nullable=True)
+    old_priority = Column(Enum(PriorityEnum, create_type=False), nullable=True)
+    new_priority = Column(Enum(PriorityEnum, create_type=False), nullable=True)
+
+    __table_args__ = (
+        # Rows arrive in time order, so a BRIN index stays tiny and still prunes ranges
+        Index("ix_test_status_events_occurred_at", "occurred_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+
+# Registered on the metadata so the tests table already exists when the triggers are created
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(CREATE_STATUS_EVENT_TRIGGERS).execute_if(dialect="postgresql"),
+)
+
+
+def _create_initial_partitions(target, connection, **kw):
+    # Computed when the schema is created, not at import time
+    if connection.dialect.name == "postgresql":
+        for statement in initial_partitions_sql():
+            connection.execute(text(statement))
+
+
+event.listen(Base.metadata, "after_create", _create_initial_partitions)
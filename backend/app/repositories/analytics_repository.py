@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import cast, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import INTERVAL, TIMESTAMP
+from sqlalchemy.orm import Session
+
+from app.db.rollups import REBUILD_DAILY_STATS
+from app.models.feature import Feature
+from app.models.project_daily_stats import ProjectDailyStats
+from app.models.test import Test
+from app.models.test_status_event import TestStatusEvent
+
+BUCKETS = ("day", "week", "month")
+# project_daily_stats days are UTC dates, so they only serve UTC buckets
+ROLLUP_TIMEZONES = ("UTC", "Etc/UTC")
+METRICS = ("tests_added", "tests_tested", "features_added")
+
+
+def _metric_source(metric: str, project_ids: Optional[List[int]]):
+    """Return (timestamp column, base select) for a metric, limited to the given projects"""
+    if metric == "features_added":
+        query = select(Feature.created_at.label("at"))
+        if project_ids is not None:
+            query = query.where(Feature.project_id.in_(project_ids))
+        return Feature.created_at, query
+    if metric == "tests_added":
+        column = Test.created_at
+        query = select(column.label("at"))
+    elif metric == "tests_tested":
+        # Every transition to tested, from the event log; the occurred_at
+        # range filter lets Postgres prune partitions outside the window
+        column = TestStatusEvent.occurred_at
+        query = select(column.label("at")).where(
+            TestStatusEvent.new_tested.is_(True), TestStatusEvent.old_tested.isnot(True)
+        )
+        if project_ids is not None:
+            query = query.where(TestStatusEvent.project_id.in_(project_ids))
+        return column, query
+    else:
+        raise ValueError(f"Unknown metric {metric}")
+    if project_ids is not None:
+        query = query.join(Feature, Test.feature_id == Feature.id).where(Feature.project_id.in_(project_ids))
+    return column, query
+
+
+def truncate(moment: datetime, bucket: str) -> datetime:
+    """Start of the bucket containing a naive local datetime (weeks start on Monday, like date_trunc)"""
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return moment - timedelta(days=moment.weekday())
+    if bucket == "month":
+        return moment.replace(day=1)
+    return moment
+
+
+def next_bucket(moment: datetime, bucket: str) -> datetime:
+    """Start of the bucket after the one starting at `moment`"""
+    if bucket == "week":
+        return moment + timedelta(days=7)
+    if bucket == "month":
+        return moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+    return moment + timedelta(days=1)
+
+
+def bucket_range(start: datetime, end: datetime, bucket: str, tz: str) -> Tuple[datetime, datetime]:
+    """First and last bucket starts, as naive local times, covering [start, end]"""
+    zone = ZoneInfo(tz)
+    return (
+        truncate(start.astimezone(zone).replace(tzinfo=None), bucket),
+        truncate(end.astimezone(zone).replace(tzinfo=None), bucket),
+    )
+
+
+class AnalyticsRepository:
+    @staticmethod
+    def get_time_series(
+        db: Session,
+        metrics: List[str],
+        bucket: str = "day",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        tz: str = "UTC",
+        project_ids: Optional[List[int]] = None,
+    ) -> Dict[str, list]:
+        """Count metric events per bucket in one query, gap-filled with generate_series.
+
+        UTC series are summed from the project_daily_stats rollups; other
+        timezones count the raw rows. Both count the same things: tests and
+        features that still exist, by creation time, and every transition to
+        tested from test_status_events, including for tests deleted since.
+        Naive start/end are taken as UTC.
+        With `project_ids`, only those projects are counted.
+        Returns {"buckets": [bucket starts], <metric>: [counts aligned with buckets]}.
+        """
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(days=30)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        zone = ZoneInfo(tz)
+        first, last = bucket_range(start, end, bucket, tz)
+        upper = next_bucket(last, bucket)
+
+        series = select(
+            func.generate_series(
+                cast(literal(first), TIMESTAMP),
+                cast(literal(last), TIMESTAMP),
+                cast(literal(f"1 {bucket}"), INTERVAL),
+            ).label("bucket")
+        ).subquery("series")
+
+        statement = select(series.c.bucket)
+        joined = series
+        if tz in ROLLUP_TIMEZONES:
+            counts = AnalyticsRepository._rollup_counts(metrics, bucket, first.date(), upper.date(), project_ids)
+            joined = joined.outerjoin(counts, counts.c.bucket == series.c.bucket)
+            for metric in metrics:
+                statement = statement.add_columns(func.coalesce(counts.c[metric], 0).label(metric))
+        else:
+            for metric in metrics:
+                counts = AnalyticsRepository._raw_counts(
+                    metric, bucket, tz, first.replace(tzinfo=zone), upper.replace(tzinfo=zone), project_ids
+                )
+                joined = joined.outerjoin(counts, counts.c.bucket == series.c.bucket)
+                statement = statement.add_columns(func.coalesce(counts.c.value, 0).label(metric))
+        rows = db.execute(statement.select_from(joined).order_by(series.c.bucket)).all()
+
+        result: Dict[str, list] = {"buckets": [row[0] for row in rows]}
+        for index, metric in enumerate(metrics, start=1):
+            result[metric] = [int(row[index]) for row in rows]
+        return result
+
+    @staticmethod
+    def _rollup_counts(metrics: List[str], bucket: str, first_day, end_day, project_ids: Optional[List[int]]):
+        """Per-bucket sums of the daily rollups for days in [first_day, end_day)"""
+        days = select(
+            func.date_trunc(bucket, cast(ProjectDailyStats.day, TIMESTAMP)).label("bucket"),
+            *[getattr(ProjectDailyStats, metric).label(metric) for metric in metrics],
+        ).where(ProjectDailyStats.day >= first_day, ProjectDailyStats.day < end_day)
+        if project_ids is not None:
+            days = days.where(ProjectDailyStats.project_id.in_(project_ids))
+        days = days.subquery()
+        # Group on the inner select's column; repeating the expression in
+        # GROUP BY would bind different parameters
+        return (
+            select(days.c.bucket, *[func.sum(days.c[metric]).label(metric) for metric in metrics])
+            .group_by(days.c.bucket)
+            .subquery("rollups")
+        )
+
+    @staticmethod
+    def _raw_counts(
+        metric: str, bucket: str, tz: str, lower: datetime, upper: datetime, project_ids: Optional[List[int]]
+    ):
+        """Per-bucket counts of a metric's raw rows with timestamps in [lower, upper)"""
+        column, query = _metric_source(metric, project_ids)
+        # Filter on the raw timestamps so the created_at/updated_at indexes stay usable
+        events = query.where(column >= lower, column < upper).subquery()
+        bucketed = select(func.date_trunc(bucket, func.timezone(tz, events.c.at)).label("bucket")).subquery()
+        return (
+            select(bucketed.c.bucket, func.count().label("value"))
+            .group_by(bucketed.c.bucket)
+            .subquery(metric)
+        )
+
+    @staticmethod
+    def rebuild_daily_stats(db: Session, project_id: Optional[int] = None) -> None:
+        """Recompute project_daily_stats from the tests, features and test_status_events tables.
+
+        Holds an EXCLUSIVE lock meanwhile, so trigger writes wait instead of
+        being lost; readers are not blocked.
+        """
+        db.execute(text("LOCK TABLE project_daily_stats IN EXCLUSIVE MODE"))
+        stale = delete(ProjectDailyStats)
+        if project_id:
+            stale = stale.where(ProjectDailyStats.project_id == project_id)
+        db.execute(stale)
+        db.execute(text(REBUILD_DAILY_STATS), {"project_id": project_id})
+        db.commit()
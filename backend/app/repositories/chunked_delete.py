@@ -0,0 +1,20 @@
+from sqlalchemy.orm import Session, Query
+
+
+def delete_in_chunks(db: Session, model, id_query: Query, chunk_size: int, on_chunk=None) -> int:
+    """Delete the rows selected by `id_query` in committed batches of `chunk_size`.
+
+    `id_query` must select the primary key of `model`. Each batch is its own
+    transaction, so locks and WAL stay bounded however many rows there are.
+    `on_chunk(deleted_so_far)` is called after every batch.
+    """
+    deleted = 0
+    while True:
+        ids = [row[0] for row in id_query.limit(chunk_size).all()]
+        if not ids:
+            return deleted
+        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if on_chunk is not None:
+            on_chunk(deleted)
@@ -1,32 +1,175 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, case
-from typing import List, Optional
+from sqlalchemy import func, and_, literal, select, text, true
+from typing import Dict, List, Optional, Tuple
 from app.models.feature import Feature
+from app.models.project import Project
 from app.models.test import Test
-from app.schemas.feature import FeatureCreate, FeatureUpdate
+from app.core.pagination import keyset_paginate
+from app.db.test_counts import (
+    REBUILD_FEATURE_TEST_COUNTS,
+    REBUILD_PROJECT_TEST_COUNTS,
+    VERIFY_FEATURE_TEST_COUNTS,
+    VERIFY_PROJECT_TEST_COUNTS,
+)
+from app.repositories.chunked_delete import delete_in_chunks
+from app.repositories.project_repository import ProjectRepository
+from app.schemas.feature import FeatureCreate, FeatureUpdate, FeatureWithCounts, FeatureWithChildren
 
 class FeatureRepository:
     @staticmethod
     def get_features(db: Session, skip: int = 0, limit: int = 100):
         return db.query(Feature).offset(skip).limit(limit).all()
-        
+
     @staticmethod
     def get_feature(db: Session, feature_id: int):
         return db.query(Feature).filter(Feature.id == feature_id).first()
         
     @staticmethod
-    def get_project_features(db: Session, project_id: int, parent_id: Optional[int] = None, skip: int = 0, limit: int = 100):
+    def _project_features_query(db: Session, project_id: int, parent_id: Optional[int] = None):
         query = db.query(Feature).filter(Feature.project_id == project_id)
         if parent_id is not None:
             query = query.filter(Feature.parent_id == parent_id)
         else:
             query = query.filter(Feature.parent_id.is_(None))
+        return query
+
+    @staticmethod
+    def get_project_features_statement(project_id: int, parent_id: Optional[int] = None):
+        """Column-only select matching _project_features_query, for streaming without ORM objects"""
+        statement = select(
+            Feature.id,
+            Feature.name,
+            Feature.description,
+            Feature.project_id,
+            Feature.parent_id,
+            Feature.created_at,
+            Feature.updated_at,
+        ).where(Feature.project_id == project_id)
+        if parent_id is not None:
+            statement = statement.where(Feature.parent_id == parent_id)
+        else:
+            statement = statement.where(Feature.parent_id.is_(None))
+        return statement.order_by(Feature.id)
+
+    @staticmethod
+    def get_project_hierarchy(db: Session, project_id: int) -> List[Tuple[int, Optional[int], str, int]]:
+        """(id, parent_id, path, depth) for every feature in a project, without loading ORM objects"""
+        return [
+            tuple(row) for row in db.execute(
+                select(Feature.id, Feature.parent_id, Feature.path, Feature.depth).where(
+                    Feature.project_id == project_id, Feature.path.isnot(None)
+                )
+            )
+        ]
+
+    @staticmethod
+    def get_project_features(db: Session, project_id: int, parent_id: Optional[int] = None, skip: int = 0, limit: int = 100):
+        query = FeatureRepository._project_features_query(db, project_id, parent_id)
         return query.offset(skip).limit(limit).all()
+
+    @staticmethod
+    def get_project_features_page(
+        db: Session, project_id: int, parent_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[FeatureWithCounts], Optional[str]]:
+        """Get one keyset page of a parent's direct children, with their counts"""
+        query = FeatureRepository._project_features_query(db, project_id, parent_id)
+        features, next_cursor = keyset_paginate(query, cursor, limit, Feature.id)
+
+        feature_ids = [feature.id for feature in features]
+        children_counts = FeatureRepository.get_children_counts(db, project_id, feature_ids)
+        test_counts = FeatureRepository.get_test_counts(db, project_id, feature_ids)
+        items = [
+            FeatureRepository._to_node(FeatureWithCounts, feature, children_counts, test_counts)
+            for feature in features
+        ]
+        return items, next_cursor
+
+    @staticmethod
+    def get_children_counts(db: Session, project_id: int, feature_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """Count direct children per feature in one GROUP BY"""
+        query = db.query(Feature.parent_id, func.count(Feature.id)).filter(
+            Feature.project_id == project_id, Feature.parent_id.isnot(None)
+        )
+        if feature_ids is not None:
+            query = query.filter(Feature.parent_id.in_(feature_ids))
+        return dict(query.group_by(Feature.parent_id).all())
+
+    @staticmethod
+    def get_test_counts(db: Session, project_id: int, feature_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """Direct test count per feature, read from the stored counters"""
+        query = db.query(Feature.id, Feature.test_count).filter(
+            Feature.project_id == project_id, Feature.test_count > 0
+        )
+        if feature_ids is not None:
+            query = query.filter(Feature.id.in_(feature_ids))
+        return dict(query.all())
+
+    @staticmethod
+    def get_project_feature_tree(db: Session, project_id: int, depth: Optional[int] = None) -> List[FeatureWithChildren]:
+        """Get all features for a project as a nested tree.
+
+        Loads the project in one flat scan and links parents to children in
+        memory, so the number of queries does not grow with the size of the
+        hierarchy. With `depth`, only that many levels are returned; nodes on
+        the last level keep their children_count so the client can expand them.
+        """
+        query = db.query(Feature).filter(Feature.project_id == project_id)
+        if depth is not None:
+            query = query.filter(Feature.depth < depth)
+        features = query.order_by(Feature.id).all()
+
+        children_counts = FeatureRepository.get_children_counts(db, project_id)
+        test_counts = FeatureRepository.get_test_counts(db, project_id)
+        return FeatureRepository.build_feature_tree(features, children_counts, test_counts)
+
+    @staticmethod
+    def _to_node(schema, feature: Feature, children_counts: Dict[int, int], test_counts: Dict[int, int], **extra):
+        return schema(
+            id=feature.id,
+            name=feature.name,
+            description=feature.description,
+            project_id=feature.project_id,
+            parent_id=feature.parent_id,
+            created_at=feature.created_at,
+            updated_at=feature.updated_at,
+            children_count=children_counts.get(feature.id, 0),
+            test_count=test_counts.get(feature.id, 0),
+            **extra,
+        )
+
+    @staticmethod
+    def build_feature_tree(
+        features: List[Feature],
+        children_counts: Optional[Dict[int, int]] = None,
+        test_counts: Optional[Dict[int, int]] = None,
+    ) -> List[FeatureWithChildren]:
+        """Link a flat list of features into trees using an id -> node map"""
+        nodes = {
+            feature.id: FeatureRepository._to_node(
+                FeatureWithChildren, feature, children_counts or {}, test_counts or {}, children=[]
+            )
+            for feature in features
+        }
+
+        roots = []
+        for node in nodes.values():
+            parent = nodes.get(node.parent_id) if node.parent_id is not None else None
+            if parent is not None:
+                parent.children.append(node)
+            else:
+                # Features whose parent is missing from the set are treated as roots
+                roots.append(node)
+        return roots
         
     @staticmethod
     def create_feature(db: Session, feature: FeatureCreate):
         db_feature = Feature(**feature.dict())
         db.add(db_feature)
+        # The path includes the feature's own id, so it is set once the INSERT has assigned one
+        db.flush()
+        parent = db.get(Feature, db_feature.parent_id) if db_feature.parent_id is not None else None
+        FeatureRepository._set_path(db_feature, parent)
+        ProjectRepository.bump_version(db, db_feature.project_id)
         db.commit()
         db.refresh(db_feature)
         return db_feature
@@ -36,40 +179,191 @@ class FeatureRepository:
         db_feature = FeatureRepository.get_feature(db, feature_id)
         if db_feature:
             update_data = feature.dict(exclude_unset=True)
+            if "parent_id" in update_data and update_data["parent_id"] != db_feature.parent_id:
+                new_parent_id = update_data["parent_id"]
+                new_parent = db.get(Feature, new_parent_id) if new_parent_id is not None else None
+                FeatureRepository.move_feature(db, db_feature, new_parent)
             for key, value in update_data.items():
                 setattr(db_feature, key, value)
+            ProjectRepository.bump_version(db, db_feature.project_id)
             db.commit()
             db.refresh(db_feature)
         return db_feature
+
+    # Hierarchy methods (backed by the materialized path)
+    @staticmethod
+    def _set_path(db_feature: Feature, parent: Optional[Feature]):
+        """Derive path and depth for a feature from its parent"""
+        if parent is not None:
+            db_feature.path = f"{parent.path}{db_feature.id}/"
+            db_feature.depth = parent.depth + 1
+        else:
+            db_feature.path = f"/{db_feature.id}/"
+            db_feature.depth = 0
+
+    @staticmethod
+    def is_in_subtree(ancestor: Feature, feature: Feature) -> bool:
+        """Check whether a feature is the ancestor itself or one of its descendants"""
+        return feature.path.startswith(ancestor.path)
+
+    @staticmethod
+    def get_subtree(db: Session, feature: Feature, include_self: bool = True) -> List[Feature]:
+        """Get every feature below a feature with a single prefix scan"""
+        query = db.query(Feature).filter(Feature.path.like(f"{feature.path}%"))
+        if not include_self:
+            query = query.filter(Feature.id != feature.id)
+        return query.order_by(Feature.depth, Feature.id).all()
+
+    @staticmethod
+    def get_ancestors(db: Session, feature: Feature) -> List[Feature]:
+        """Get the ancestors of a feature, root first (breadcrumbs)"""
+        ancestor_ids = [int(part) for part in feature.path.strip("/").split("/")[:-1]]
+        if not ancestor_ids:
+            return []
+        return (
+            db.query(Feature)
+            .filter(Feature.id.in_(ancestor_ids))
+            .order_by(Feature.depth)
+            .all()
+        )
+
+    @staticmethod
+    def move_feature(db: Session, db_feature: Feature, new_parent: Optional[Feature]):
+        """Re-root the path of a feature and all of its descendants in one UPDATE.
+
+        The caller is responsible for validating the new parent and committing.
+        """
+        old_prefix = db_feature.path
+        if new_parent is not None:
+            new_prefix = f"{new_parent.path}{db_feature.id}/"
+            depth_delta = new_parent.depth + 1 - db_feature.depth
+        else:
+            new_prefix = f"/{db_feature.id}/"
+            depth_delta = -db_feature.depth
+
+        db.query(Feature).filter(Feature.path.like(f"{old_prefix}%")).update(
+            {
+                Feature.path: literal(new_prefix) + func.substr(Feature.path, len(old_prefix) + 1),
+                Feature.depth: Feature.depth + depth_delta,
+            },
+            synchronize_session=False,
+        )
+        # Reload the rewritten columns instead of flushing stale values back
+        db.expire(db_feature, ["path", "depth"])
+        db_feature.parent_id = new_parent.id if new_parent is not None else None
         
     @staticmethod
     def delete_feature(db: Session, feature_id: int):
         db_feature = FeatureRepository.get_feature(db, feature_id)
         if db_feature:
-            db.delete(db_feature)
-            db.commit()
+            FeatureRepository.delete_feature_subtree(db, db_feature)
             return True
         return False
+
+    @staticmethod
+    def delete_feature_subtree(db: Session, db_feature: Feature):
+        """Delete a feature and its descendants in one statement; tests go via ON DELETE CASCADE"""
+        db.query(Feature).filter(Feature.path.like(f"{db_feature.path}%")).delete(synchronize_session=False)
+        ProjectRepository.bump_version(db, db_feature.project_id)
+        db.commit()
+
+    @staticmethod
+    def count_subtree_rows(db: Session, db_feature: Feature) -> int:
+        """Count the features and tests a subtree delete would remove, in one round trip"""
+        subtree_ids = select(Feature.id).where(Feature.path.like(f"{db_feature.path}%"))
+        feature_count = select(func.count()).select_from(subtree_ids.subquery()).scalar_subquery()
+        test_count = select(func.count(Test.id)).where(Test.feature_id.in_(subtree_ids)).scalar_subquery()
+        return db.execute(select(feature_count + test_count)).scalar() or 0
+
+    @staticmethod
+    def delete_feature_subtree_chunked(db: Session, feature_id: int, chunk_size: int, on_progress=None) -> Dict[str, int]:
+        """Delete a feature subtree bottom-up in committed batches (for very large subtrees)"""
+        db_feature = FeatureRepository.get_feature(db, feature_id)
+        if db_feature is None:
+            return {}
+        prefix = f"{db_feature.path}%"
+        project_id = db_feature.project_id
+        progress: Dict[str, int] = {}
+
+        def track(name):
+            def on_chunk(deleted):
+                progress[name] = deleted
+                if on_progress is not None:
+                    on_progress(dict(progress))
+            return on_chunk
+
+        subtree_ids = select(Feature.id).where(Feature.path.like(prefix))
+        delete_in_chunks(db, Test, db.query(Test.id).filter(Test.feature_id.in_(subtree_ids)), chunk_size, track("tests"))
+        delete_in_chunks(
+            db, Feature, db.query(Feature.id).filter(Feature.path.like(prefix)).order_by(Feature.depth.desc()),
+            chunk_size, track("features"),
+        )
+        ProjectRepository.bump_version(db, project_id)
+        db.commit()
+        return progress
         
     # Analytics methods
     @staticmethod
-    def get_features_with_test_counts(db: Session, project_id: Optional[int] = None, limit: int = 5):
-        """Get features with test counts, optionally filtered by project"""
-        query = db.query(
+    def get_features_with_test_counts(db: Session, project_ids: Optional[List[int]] = None, limit: int = 5):
+        """Get the features with the most direct tests, from the trigger-maintained counters.
+
+        With project_ids, each project's top `limit` features are read off
+        ix_features_project_id_test_count and only those are merged, instead of
+        sorting every feature of every project. Without project_ids the whole
+        table is sorted; that path is only used for administrative overviews.
+        """
+        columns = (
             Feature.id.label('feature_id'),
             Feature.name.label('feature_name'),
-            func.count(Test.id).label('test_count'),
-            func.sum(case((Test.tested == True, 1), else_=0)).label('tested_count'),
-            func.sum(case((Test.tested == False, 1), else_=0)).label('untested_count')
-        ).outerjoin(
-            Test, Feature.id == Test.feature_id
-        ).group_by(
-            Feature.id, Feature.name
-        ).order_by(
-            func.count(Test.id).desc()
+            Feature.test_count,
+            Feature.tested_count,
+            Feature.untested_count,
+            Feature.subtree_test_count,
+            Feature.subtree_tested_count,
+            Feature.subtree_untested_count,
         )
-        
-        if project_id:
-            query = query.filter(Feature.project_id == project_id)
-            
-        return query.limit(limit).all() 
\ No newline at end of file
+        if project_ids is None:
+            query = db.query(*columns).order_by(Feature.test_count.desc())
+            return [row._asdict() for row in query.limit(limit).all()]
+
+        projects = select(Project.id.label('project_id')).where(Project.id.in_(project_ids)).subquery()
+        top = (
+            select(*columns)
+            .where(Feature.project_id == projects.c.project_id)
+            .order_by(Feature.test_count.desc())
+            .limit(limit)
+            .lateral('top_features')
+        )
+        query = select(top).select_from(projects.join(top, true())).order_by(top.c.test_count.desc()).limit(limit)
+        return [row._asdict() for row in db.execute(query)]
+
+    # Counter maintenance
+    @staticmethod
+    def _lock_for_counts(db: Session):
+        """Block test and feature writes so no trigger runs while counters are compared"""
+        db.execute(text("LOCK TABLE tests IN SHARE MODE"))
+        db.execute(text("LOCK TABLE features IN SHARE ROW EXCLUSIVE MODE"))
+
+    @staticmethod
+    def verify_test_counts(db: Session, project_id: Optional[int] = None) -> Dict[str, List[int]]:
+        """Ids of features and projects whose stored test counters differ from the tests table"""
+        FeatureRepository._lock_for_counts(db)
+        params = {"project_id": project_id}
+        drift = {
+            "features": list(db.execute(text(VERIFY_FEATURE_TEST_COUNTS), params).scalars()),
+            "projects": list(db.execute(text(VERIFY_PROJECT_TEST_COUNTS), params).scalars()),
+        }
+        db.rollback()
+        return drift
+
+    @staticmethod
+    def rebuild_test_counts(db: Session, project_id: Optional[int] = None) -> Dict[str, List[int]]:
+        """Recompute the test counters from the tests table; returns the ids that were corrected"""
+        FeatureRepository._lock_for_counts(db)
+        params = {"project_id": project_id}
+        fixed = {
+            "features": sorted(db.execute(text(REBUILD_FEATURE_TEST_COUNTS), params).scalars()),
+            "projects": sorted(db.execute(text(REBUILD_PROJECT_TEST_COUNTS), params).scalars()),
+        }
+        db.commit()
+        return fixed
@@ -1,16 +1,89 @@
+from sqlalchemy import Text, and_, delete, func, literal, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert as pg_insert
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from app.models.node_position import NodePosition
-from app.schemas.node_position import NodePositionCreate, NodePositionUpdate
+from app.core.pagination import keyset_paginate
+from app.repositories.project_repository import ProjectRepository
+from app.schemas.node_position import NodePositionBulkResult, NodePositionCreate, NodePositionUpdate
+
+# First key of the two-key advisory lock taken while saving a project's positions
+NODE_POSITION_LOCK_NAMESPACE = 7301
+UPSERT_CHUNK_SIZE = 1000
 
 
 class NodePositionRepository:
     @staticmethod
-    def get_project_node_positions(db: Session, project_id: int, skip: int = 0, limit: int = 1000):
-        """Get all node positions for a project"""
+    def get_project_node_positions(
+        db: Session, project_id: int, skip: int = 0, limit: Optional[int] = 1000, data_contains: Optional[dict] = None
+    ):
+        """Get all node positions for a project (pass limit=None for no cap),
+        optionally only those whose data contains the given object"""
+        query = db.query(NodePosition).filter(NodePosition.project_id == project_id)
+        if data_contains is not None:
+            query = query.filter(NodePosition.data.contains(data_contains))
+        return query.offset(skip).limit(limit).all()
+
+    @staticmethod
+    def get_project_node_positions_statement(project_id: int, data_contains: Optional[dict] = None):
+        """Column-only select of all a project's positions, for streaming without ORM objects"""
+        statement = select(
+            NodePosition.id,
+            NodePosition.node_id,
+            NodePosition.project_id,
+            NodePosition.node_type,
+            NodePosition.position_x,
+            NodePosition.position_y,
+            NodePosition.data,
+            NodePosition.created_at,
+            NodePosition.updated_at,
+        ).where(NodePosition.project_id == project_id).order_by(NodePosition.id)
+        if data_contains is not None:
+            statement = statement.where(NodePosition.data.contains(data_contains))
+        return statement
+
+    @staticmethod
+    def _viewport_filter(
+        project_id: int, min_x: float, min_y: float, max_x: float, max_y: float, include_tests: bool = True
+    ):
+        conditions = [
+            NodePosition.project_id == project_id,
+            NodePosition.position_x.between(min_x, max_x),
+            NodePosition.position_y.between(min_y, max_y),
+        ]
+        if not include_tests:
+            # testNode, highPriorityTestNode, lowPriorityTestNode
+            conditions.append(~NodePosition.node_type.ilike("%testnode"))
+        return and_(*conditions)
+
+    @staticmethod
+    def get_node_positions_in_viewport(
+        db: Session, project_id: int, min_x: float, min_y: float, max_x: float, max_y: float,
+        include_tests: bool = True, limit: int = 5000,
+    ) -> List[NodePosition]:
+        """Get the positions inside a bounding box, using the (project_id, position_x, position_y) index"""
         return db.query(NodePosition).filter(
-            NodePosition.project_id == project_id
-        ).offset(skip).limit(limit).all()
+            NodePositionRepository._viewport_filter(project_id, min_x, min_y, max_x, max_y, include_tests)
+        ).order_by(NodePosition.id).limit(limit).all()
+
+    @staticmethod
+    def get_viewport_statement(
+        project_id: int, min_x: float, min_y: float, max_x: float, max_y: float, include_tests: bool = True
+    ):
+        """Column-only select of the positions inside a bounding box, for streaming"""
+        return NodePositionRepository.get_project_node_positions_statement(project_id).where(
+            NodePositionRepository._viewport_filter(project_id, min_x, min_y, max_x, max_y, include_tests)
+        )
+
+    @staticmethod
+    def get_project_node_positions_page(
+        db: Session, project_id: int, cursor: Optional[str] = None, limit: int = 1000, data_contains: Optional[dict] = None
+    ) -> Tuple[List[NodePosition], Optional[str]]:
+        """Get one keyset page of a project's node positions ordered by id"""
+        query = db.query(NodePosition).filter(NodePosition.project_id == project_id)
+        if data_contains is not None:
+            query = query.filter(NodePosition.data.contains(data_contains))
+        return keyset_paginate(query, cursor, limit, NodePosition.id)
     
     @staticmethod
     def get_node_position(db: Session, node_id: str, project_id: int) -> Optional[NodePosition]:
@@ -25,6 +98,7 @@ class NodePositionRepository:
         """Create a new node position"""
         db_node_position = NodePosition(**node_position.dict())
         db.add(db_node_position)
+        ProjectRepository.bump_version(db, db_node_position.project_id, affects_analytics=False)
         db.commit()
         db.refresh(db_node_position)
         return db_node_position
@@ -37,16 +111,42 @@ class NodePositionRepository:
             update_data = node_position.dict(exclude_unset=True)
             for key, value in update_data.items():
                 setattr(db_node_position, key, value)
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
             db.commit()
             db.refresh(db_node_position)
         return db_node_position
     
+    @staticmethod
+    def patch_node_position_data(
+        db: Session, node_id: str, project_id: int, data: dict, remove_keys: List[str]
+    ) -> Optional[NodePosition]:
+        """Merge keys into a position's data (and drop others) in one UPDATE, without reading the row first"""
+        merged = func.coalesce(NodePosition.data, literal({}, JSONB)).op("||")(literal(data, JSONB))
+        if remove_keys:
+            merged = merged.op("-")(literal(remove_keys, ARRAY(Text)))
+        db_node_position = db.scalars(
+            update(NodePosition)
+            .where(NodePosition.node_id == node_id, NodePosition.project_id == project_id)
+            .values(data=merged, updated_at=func.now())
+            .returning(NodePosition),
+            execution_options={"synchronize_session": False},
+        ).first()
+        if db_node_position is None:
+            db.rollback()
+            return None
+        ProjectRepository.bump_version(db, project_id, affects_analytics=False)
+        # RETURNING already loaded every column; detach so commit does not expire them
+        db.expunge(db_node_position)
+        db.commit()
+        return db_node_position
+
     @staticmethod
     def delete_node_position(db: Session, node_id: str, project_id: int) -> bool:
         """Delete a node position"""
         db_node_position = NodePositionRepository.get_node_position(db, node_id, project_id)
         if db_node_position:
             db.delete(db_node_position)
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
             db.commit()
             return True
         return False
@@ -56,6 +156,7 @@ class NodePositionRepository:
         """Delete all node positions for a project"""
         try:
             db.query(NodePosition).filter(NodePosition.project_id == project_id).delete()
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
             db.commit()
             return True
         except Exception as e:
@@ -65,27 +166,120 @@ class NodePositionRepository:
             return True
     
     @staticmethod
-    def bulk_create_or_update_node_positions(db: Session, project_id: int, node_positions: List[NodePositionCreate]) -> List[NodePosition]:
-        """Create or update multiple node positions at once"""
-        try:
-            # First, delete all existing node positions for this project
-            NodePositionRepository.delete_project_node_positions(db, project_id)
-            
-            # Then create all the new positions
-            db_node_positions = []
-            for position in node_positions:
-                db_node_position = NodePosition(**position.dict())
-                db.add(db_node_position)
-                db_node_positions.append(db_node_position)
-            
-            db.commit()
-            
-            # Refresh all the objects
-            for position in db_node_positions:
-                db.refresh(position)
-            
-            return db_node_positions
-        except Exception as e:
-            print(f"Error in bulk create/update node positions: {e}")
-            db.rollback()
-            return [] 
\ No newline at end of file
+    def lock_project_positions(db: Session, project_id: int) -> None:
+        """Serialize position saves for a project until the transaction ends"""
+        db.execute(select(func.pg_advisory_xact_lock(NODE_POSITION_LOCK_NAMESPACE, project_id)))
+
+    @staticmethod
+    def upsert_node_positions(db: Session, project_id: int, rows: List[dict], update_data: bool = True) -> Tuple[int, int]:
+        """Insert new positions and update changed ones; rows whose values are unchanged are skipped.
+
+        With update_data=False the data column of existing rows is left alone.
+        Returns (inserted, updated). Does not commit.
+        """
+        inserted = updated = 0
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(NodePosition).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            excluded = stmt.excluded
+            set_ = {
+                "node_type": excluded.node_type,
+                "position_x": excluded.position_x,
+                "position_y": excluded.position_y,
+                "updated_at": func.now(),
+            }
+            changed = [
+                NodePosition.node_type.is_distinct_from(excluded.node_type),
+                NodePosition.position_x.is_distinct_from(excluded.position_x),
+                NodePosition.position_y.is_distinct_from(excluded.position_y),
+            ]
+            if update_data:
+                set_["data"] = excluded.data
+                changed.append(NodePosition.data.is_distinct_from(excluded.data))
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_node_positions_project_id_node_id",
+                set_=set_,
+                where=or_(*changed),
+            ).returning(literal_column("xmax = 0"))
+            # xmax is 0 for freshly inserted rows and set for rows updated on conflict
+            for (was_inserted,) in db.execute(stmt):
+                if was_inserted:
+                    inserted += 1
+                else:
+                    updated += 1
+        return inserted, updated
+
+    @staticmethod
+    def apply_position_updates(db: Session, project_id: int, rows: List[dict]) -> int:
+        """Upsert a batch of buffered position updates; rows without a data key keep their stored data"""
+        for row in rows:
+            row["project_id"] = project_id
+        with_data = [row for row in rows if "data" in row]
+        without_data = [row for row in rows if "data" not in row]
+
+        NodePositionRepository.lock_project_positions(db, project_id)
+        written = sum(NodePositionRepository.upsert_node_positions(db, project_id, with_data))
+        written += sum(NodePositionRepository.upsert_node_positions(db, project_id, without_data, update_data=False))
+        if written:
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
+        db.commit()
+        return written
+
+    @staticmethod
+    def store_layout(db: Session, project_id: int, rows: List[dict], overwrite: bool = False) -> Tuple[int, int]:
+        """Save computed layout positions. Existing positions are kept unless overwrite is set,
+        and stored data is never replaced. Returns (inserted, updated)"""
+        rows = [dict(row, project_id=project_id) for row in rows]
+        NodePositionRepository.lock_project_positions(db, project_id)
+        if overwrite:
+            inserted, updated = NodePositionRepository.upsert_node_positions(db, project_id, rows, update_data=False)
+        else:
+            inserted, updated = 0, 0
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                stmt = pg_insert(NodePosition).values(rows[start:start + UPSERT_CHUNK_SIZE]).on_conflict_do_nothing(
+                    constraint="uq_node_positions_project_id_node_id"
+                )
+                inserted += db.execute(stmt).rowcount
+        if inserted or updated:
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
+        db.commit()
+        return inserted, updated
+
+    @staticmethod
+    def get_missing_node_ids(db: Session, project_id: int, node_ids: List[str]) -> List[str]:
+        """Return the node ids that have no saved position in the project"""
+        saved = db.scalars(
+            select(NodePosition.node_id).where(
+                NodePosition.project_id == project_id,
+                NodePosition.node_id.in_(node_ids),
+            )
+        ).all()
+        return list(set(node_ids) - set(saved))
+
+    @staticmethod
+    def bulk_create_or_update_node_positions(
+        db: Session, project_id: int, node_positions: List[NodePositionCreate]
+    ) -> NodePositionBulkResult:
+        """Replace a project's saved positions with the given set, writing only what changed"""
+        # Last write wins for duplicate node ids; ON CONFLICT cannot touch a row twice
+        rows = {}
+        for position in node_positions:
+            row = position.dict()
+            row["project_id"] = project_id
+            rows[row["node_id"]] = row
+
+        NodePositionRepository.lock_project_positions(db, project_id)
+        inserted, updated = NodePositionRepository.upsert_node_positions(db, project_id, list(rows.values()))
+        stale = delete(NodePosition).where(NodePosition.project_id == project_id)
+        if rows:
+            stale = stale.where(NodePosition.node_id.not_in(list(rows)))
+        deleted = db.execute(stale).rowcount
+
+        if inserted or updated or deleted:
+            ProjectRepository.bump_version(db, project_id, affects_analytics=False)
+        db.commit()
+        return NodePositionBulkResult(
+            inserted=inserted,
+            updated=updated,
+            unchanged=len(rows) - inserted - updated,
+            deleted=deleted,
+        )
@@ -1,15 +1,51 @@
+from typing import Dict, List, Optional
+from sqlalchemy import select, func, update
 from sqlalchemy.orm import Session
-from app.models.project import Project
+from app.models.project import Project, project_members
+from app.models.feature import Feature
+from app.models.test import Test
+from app.models.test_case import TestCase
+from app.models.test_run import TestRun
+from app.models.node_position import NodePosition
+from app.core.analytics_cache import mark_dirty
+from app.repositories.chunked_delete import delete_in_chunks
 from app.schemas.project import ProjectCreate, ProjectUpdate
 
 class ProjectRepository:
     @staticmethod
     def get_projects(db: Session, skip: int = 0, limit: int = 100):
         return db.query(Project).offset(skip).limit(limit).all()
-        
+
     @staticmethod
     def get_project(db: Session, project_id: int):
         return db.query(Project).filter(Project.id == project_id).first()
+
+    @staticmethod
+    def get_accessible_project_ids(db: Session, user_id: int) -> List[int]:
+        """Ids of the projects the user owns or is a member of"""
+        query = db.query(Project.id).filter(
+            (Project.owner_id == user_id) | Project.members.any(id=user_id)
+        )
+        return [project_id for project_id, in query.order_by(Project.id).all()]
+
+    @staticmethod
+    def is_member(db: Session, project_id: int, user_id: int) -> bool:
+        """Whether the user is one of the project's members (compared by id, without loading them)"""
+        return db.query(
+            select(project_members.c.user_id).where(
+                project_members.c.project_id == project_id, project_members.c.user_id == user_id
+            ).exists()
+        ).scalar()
+
+    @staticmethod
+    def user_can_access(db: Session, project_id: int, user_id: int) -> bool:
+        """Whether the user owns the project or is one of its members"""
+        return db.query(
+            db.query(Project).filter(
+                Project.id == project_id,
+                (Project.owner_id == user_id) | Project.members.any(id=user_id),
+            ).exists()
+        ).scalar()
         
     @staticmethod
     def create_project(db: Session, project: ProjectCreate, owner_id: int):
@@ -36,9 +72,112 @@ class ProjectRepository:
         
     @staticmethod
     def delete_project(db: Session, project_id: int):
-        db_project = ProjectRepository.get_project(db, project_id)
-        if db_project:
-            db.delete(db_project)
-            db.commit()
-            return True
-        return False 
\ No newline at end of file
+        """Delete a project with one statement; dependent rows go via ON DELETE CASCADE"""
+        deleted = db.query(Project).filter(Project.id == project_id).delete(synchronize_session=False)
+        mark_dirty(db, [project_id])
+        db.commit()
+        return deleted > 0
+
+    @staticmethod
+    def count_project_rows(db: Session, project_id: int) -> int:
+        """Count the rows a project delete would remove, in one round trip"""
+        feature_ids = select(Feature.id).where(Feature.project_id == project_id)
+        test_case_ids = select(TestCase.id).where(TestCase.project_id == project_id)
+        counts = [
+            select(func.count(Feature.id)).where(Feature.project_id == project_id),
+            select(func.count(Test.id)).where(Test.feature_id.in_(feature_ids)),
+            select(func.count(NodePosition.id)).where(NodePosition.project_id == project_id),
+            select(func.count(TestCase.id)).where(TestCase.project_id == project_id),
+            select(func.count(TestRun.id)).where(TestRun.test_case_id.in_(test_case_ids)),
+        ]
+        return db.execute(select(sum(count.scalar_subquery() for count in counts))).scalar() or 0
+
+    @staticmethod
+    def delete_project_chunked(db: Session, project_id: int, chunk_size: int, on_progress=None) -> Dict[str, int]:
+        """Delete a project bottom-up in committed batches (for very large projects)"""
+        progress: Dict[str, int] = {}
+
+        def track(name):
+            def on_chunk(deleted):
+                progress[name] = deleted
+                if on_progress is not None:
+                    on_progress(dict(progress))
+            return on_chunk
+
+        feature_ids = select(Feature.id).where(Feature.project_id == project_id)
+        test_case_ids = select(TestCase.id).where(TestCase.project_id == project_id)
+
+        delete_in_chunks(db, Test, db.query(Test.id).filter(Test.feature_id.in_(feature_ids)), chunk_size, track("tests"))
+        delete_in_chunks(
+            db, NodePosition, db.query(NodePosition.id).filter(NodePosition.project_id == project_id),
+            chunk_size, track("node_positions"),
+        )
+        delete_in_chunks(
+            db, TestRun, db.query(TestRun.id).filter(TestRun.test_case_id.in_(test_case_ids)),
+            chunk_size, track("test_runs"),
+        )
+        delete_in_chunks(
+            db, TestCase, db.query(TestCase.id).filter(TestCase.project_id == project_id),
+            chunk_size, track("test_cases"),
+        )
+        # Deepest features first, so no batch cascades into a large subtree
+        delete_in_chunks(
+            db, Feature,
+            db.query(Feature.id).filter(Feature.project_id == project_id).order_by(Feature.depth.desc()),
+            chunk_size, track("features"),
+        )
+
+        db.execute(project_members.delete().where(project_members.c.project_id == project_id))
+        ProjectRepository.delete_project(db, project_id)
+        return progress
+
+    # Version methods (used for ETags on project-scoped reads)
+    @staticmethod
+    def get_version(db: Session, project_id: int) -> Optional[int]:
+        """Get the current version of a project, or None if it doesn't exist"""
+        return db.query(Project.version).filter(Project.id == project_id).scalar()
+
+    @staticmethod
+    def get_version_for_feature(db: Session, feature_id: int):
+        """Get (project_id, version) for the project a feature belongs to"""
+        return (
+            db.query(Project.id, Project.version)
+            .join(Feature, Feature.project_id == Project.id)
+            .filter(Feature.id == feature_id)
+            .first()
+        )
+
+    @staticmethod
+    def bump_version(db: Session, project_id: int, affects_analytics: bool = True):
+        """Increment a project's version as part of the caller's transaction.
+
+        Unless `affects_analytics` is False (e.g. layout-only writes), the
+        project's cached analytics are invalidated when the transaction commits.
+        """
+        db.query(Project).filter(Project.id == project_id).update(
+            {Project.version: Project.version + 1}, synchronize_session=False
+        )
+        if affects_analytics:
+            mark_dirty(db, [project_id])
+
+    @staticmethod
+    def bump_versions_for_features(db: Session, feature_ids):
+        """Increment the version of every project owning one of the given features, in one UPDATE"""
+        project_ids = select(Feature.project_id).where(Feature.id.in_(list(feature_ids)))
+        bumped = db.execute(
+            update(Project).where(Project.id.in_(project_ids))
+            .values(version=Project.version + 1).returning(Project.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        mark_dirty(db, bumped)
+
+    @staticmethod
+    def bump_version_for_feature(db: Session, feature_id: int):
+        """Increment the version of the project a feature belongs to"""
+        project_id = select(Feature.project_id).where(Feature.id == feature_id).scalar_subquery()
+        bumped = db.execute(
+            update(Project).where(Project.id == project_id)
+            .values(version=Project.version + 1).returning(Project.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        mark_dirty(db, bumped)
@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
-from datetime import datetime
-from typing import List, Dict, Any
+from sqlalchemy import func, or_, not_, insert, update, select
+from typing import List, Dict, Any, Optional, Tuple
 from app.models.test import Test
 from app.models.feature import Feature
-from app.schemas.test import TestCreate, TestUpdate
+from app.core.pagination import keyset_paginate
+from app.repositories.project_repository import ProjectRepository
+from app.schemas.test import TestCreate, TestUpdate, TestBulkRequest, TestBulkStatusUpdate
 
 
 class TestRepository:
@@ -12,6 +13,11 @@ class TestRepository:
     def get_tests(db: Session, skip: int = 0, limit: int = 100):
         return db.query(Test).offset(skip).limit(limit).all()
 
+    @staticmethod
+    def get_tests_page(db: Session, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Test], Optional[str]]:
+        """Get one keyset page of tests ordered by id"""
+        return keyset_paginate(db.query(Test), cursor, limit, Test.id)
+
     @staticmethod
     def get_test(db: Session, test_id: int):
         return db.query(Test).filter(Test.id == test_id).first()
@@ -20,10 +26,64 @@ class TestRepository:
     def get_feature_tests(db: Session, feature_id: int, skip: int = 0, limit: int = 100):
         return db.query(Test).filter(Test.feature_id == feature_id).offset(skip).limit(limit).all()
 
+    @staticmethod
+    def get_feature_tests_page(
+        db: Session, feature_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Test], Optional[str]]:
+        """Get one keyset page of a feature's tests, served by the (feature_id, id) index"""
+        return keyset_paginate(db.query(Test).filter(Test.feature_id == feature_id), cursor, limit, Test.id)
+
+    @staticmethod
+    def get_project_tests(db: Session, project_id: int):
+        """Get every test in a project with one join, ordered by feature"""
+        return (
+            db.query(Test)
+            .join(Feature, Test.feature_id == Feature.id)
+            .filter(Feature.project_id == project_id)
+            .order_by(Test.feature_id, Test.id)
+            .all()
+        )
+
+    @staticmethod
+    def get_project_test_priorities(db: Session, project_id: int) -> Dict[int, set]:
+        """Map each feature in a project to the set of test priorities it has"""
+        rows = (
+            db.query(Test.feature_id, Test.priority)
+            .join(Feature, Test.feature_id == Feature.id)
+            .filter(Feature.project_id == project_id)
+            .distinct()
+            .all()
+        )
+        priorities: Dict[int, set] = {}
+        for feature_id, priority in rows:
+            priorities.setdefault(feature_id, set()).add(priority.value if priority else "normal")
+        return priorities
+
+    @staticmethod
+    def _subtree_tests_query(db: Session, feature: Feature):
+        return (
+            db.query(Test)
+            .join(Feature, Test.feature_id == Feature.id)
+            .filter(Feature.path.like(f"{feature.path}%"))
+        )
+
+    @staticmethod
+    def get_subtree_tests(db: Session, feature: Feature, skip: int = 0, limit: int = 100):
+        """Get tests attached to a feature or any of its descendants"""
+        return TestRepository._subtree_tests_query(db, feature).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def get_subtree_tests_page(
+        db: Session, feature: Feature, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Test], Optional[str]]:
+        """Get one keyset page of the tests under a feature's subtree"""
+        return keyset_paginate(TestRepository._subtree_tests_query(db, feature), cursor, limit, Test.id)
+
     @staticmethod
     def create_test(db: Session, test: TestCreate):
         db_test = Test(**test.dict())
         db.add(db_test)
+        ProjectRepository.bump_version_for_feature(db, db_test.feature_id)
         db.commit()
         db.refresh(db_test)
         return db_test
@@ -35,128 +95,167 @@ class TestRepository:
             update_data = test.dict(exclude_unset=True)
             for key, value in update_data.items():
                 setattr(db_test, key, value)
+            ProjectRepository.bump_version_for_feature(db, db_test.feature_id)
             db.commit()
             db.refresh(db_test)
         return db_test
 
+    @staticmethod
+    def toggle_test(db: Session, test_id: int) -> Optional[Test]:
+        """Flip `tested` atomically with a single UPDATE ... RETURNING"""
+        stmt = (
+            update(Test)
+            .where(Test.id == test_id)
+            .values(tested=not_(func.coalesce(Test.tested, False)))
+            .returning(Test)
+        )
+        db_test = db.scalars(stmt, execution_options={"synchronize_session": False}).one_or_none()
+        if db_test is None:
+            db.rollback()
+            return None
+        ProjectRepository.bump_version_for_feature(db, db_test.feature_id)
+        # RETURNING already loaded every column; detach so commit does not expire them
+        db.expunge(db_test)
+        db.commit()
+        return db_test
+
+    @staticmethod
+    def bulk_set_status(db: Session, change: TestBulkStatusUpdate) -> Optional[int]:
+        """Set `tested` and/or `priority` on every test matching a filter in one UPDATE.
+
+        Tests that already have the target values are left untouched. Returns
+        the number of tests changed, or None when the filter's feature does not exist.
+        """
+        values = change.dict(include={"tested", "priority"}, exclude_none=True)
+        criteria = change.filter
+        stmt = update(Test).values(**values)
+
+        feature_scope = None
+        if criteria.feature_id is not None:
+            if criteria.include_descendants:
+                feature = db.get(Feature, criteria.feature_id)
+                if feature is None:
+                    db.rollback()
+                    return None
+                feature_scope = select(Feature.id).where(Feature.path.like(f"{feature.path}%"))
+                stmt = stmt.where(Test.feature_id.in_(feature_scope))
+            else:
+                stmt = stmt.where(Test.feature_id == criteria.feature_id)
+        if criteria.project_id is not None:
+            stmt = stmt.where(Test.feature_id.in_(select(Feature.id).where(Feature.project_id == criteria.project_id)))
+        if criteria.tested is not None:
+            stmt = stmt.where(Test.tested == criteria.tested)
+        if criteria.priority is not None:
+            stmt = stmt.where(Test.priority == criteria.priority)
+
+        # Skip rows that would not change
+        stmt = stmt.where(or_(*(getattr(Test, key).is_distinct_from(value) for key, value in values.items())))
+
+        result = db.execute(stmt, execution_options={"synchronize_session": False})
+        if result.rowcount:
+            if criteria.project_id is not None:
+                ProjectRepository.bump_version(db, criteria.project_id)
+            if criteria.feature_id is not None:
+                ProjectRepository.bump_version_for_feature(db, criteria.feature_id)
+        db.commit()
+        return result.rowcount
+
     @staticmethod
     def delete_test(db: Session, test_id: int):
         db_test = TestRepository.get_test(db, test_id)
         if db_test:
             db.delete(db_test)
+            ProjectRepository.bump_version_for_feature(db, db_test.feature_id)
             db.commit()
             return True
         return False
         
-    # Analytics methods
-    @staticmethod
-    def count_tests_by_status(db: Session, tested: bool = None):
-        """Count tests by tested status"""
-        query = db.query(func.count(Test.id))
-        if tested is not None:
-            query = query.filter(Test.tested == tested)
-        return query.scalar() or 0
-        
-    @staticmethod
-    def count_tests_by_priority(db: Session, priority: str = None):
-        """Count tests by priority"""
-        query = db.query(func.count(Test.id))
-        if priority:
-            query = query.filter(Test.priority == priority)
-        return query.scalar() or 0
-        
     @staticmethod
-    def get_activity_by_date_range(db: Session, start_date: datetime, end_date: datetime):
-        """Get test and feature creation activity by date range"""
-        # Query for test creation by date
-        test_counts = db.query(
-            func.date(Test.created_at).label('date'),
-            func.count(Test.id).label('count')
-        ).filter(
-            Test.created_at.between(start_date, end_date)
-        ).group_by(
-            func.date(Test.created_at)
-        ).all()
-        
-        # Query for feature creation by date
-        feature_counts = db.query(
-            func.date(Feature.created_at).label('date'),
-            func.count(Feature.id).label('count')
-        ).filter(
-            Feature.created_at.between(start_date, end_date)
-        ).group_by(
-            func.date(Feature.created_at)
-        ).all()
-        
-        # Combine the results
-        result = {}
-        for date, count in test_counts:
-            if date not in result:
-                result[date] = {"date": date, "test_count": 0, "feature_count": 0}
-            result[date]["test_count"] = count
-            
-        for date, count in feature_counts:
-            if date not in result:
-                result[date] = {"date": date, "test_count": 0, "feature_count": 0}
-            result[date]["feature_count"] = count
-            
-        return list(result.values())
+    def bulk_apply(db: Session, bulk: TestBulkRequest) -> Dict[str, Any]:
+        """Create, update and delete many tests in a single transaction.
+
+        Referenced features and tests are validated with one query each,
+        creates use a multi-row INSERT ... RETURNING and updates an
+        executemany by primary key. Invalid items are skipped and reported
+        in `errors`; the rest are applied.
+        """
+        errors = []
+
+        # One query validates every feature_id referenced by the creates
+        wanted_features = {item.feature_id for item in bulk.create}
+        known_features = set()
+        if wanted_features:
+            known_features = {
+                feature_id for (feature_id,) in db.query(Feature.id).filter(Feature.id.in_(wanted_features))
+            }
+
+        # One query validates every test id referenced by the updates and deletes
+        wanted_tests = {item.id for item in bulk.update} | set(bulk.delete)
+        known_tests = {}
+        if wanted_tests:
+            known_tests = dict(db.query(Test.id, Test.feature_id).filter(Test.id.in_(wanted_tests)))
+
+        create_rows = []
+        for index, item in enumerate(bulk.create):
+            if item.feature_id not in known_features:
+                errors.append({"operation": "create", "index": index, "detail": "Feature not found"})
+            else:
+                create_rows.append(item.dict())
+
+        update_rows = []
+        for index, item in enumerate(bulk.update):
+            if item.id not in known_tests:
+                errors.append({"operation": "update", "index": index, "detail": "Test not found"})
+            else:
+                update_rows.append(item.dict(exclude_unset=True) | {"id": item.id})
+
+        delete_ids = []
+        for index, test_id in enumerate(bulk.delete):
+            if test_id not in known_tests:
+                errors.append({"operation": "delete", "index": index, "detail": "Test not found"})
+            else:
+                delete_ids.append(test_id)
+
+        created = []
+        if create_rows:
+            created = db.scalars(insert(Test).returning(Test), create_rows).all()
+
+        updated = []
+        if update_rows:
+            # Rows with nothing to change are still reported as updated
+            changed_rows = [row for row in update_rows if len(row) > 1]
+            if changed_rows:
+                db.execute(update(Test), changed_rows)
+            updated_ids = [row["id"] for row in update_rows]
+            updated = db.query(Test).filter(Test.id.in_(updated_ids)).order_by(Test.id).populate_existing().all()
+
+        if delete_ids:
+            db.query(Test).filter(Test.id.in_(delete_ids)).delete(synchronize_session=False)
+
+        touched_features = (
+            {row["feature_id"] for row in create_rows}
+            | {known_tests[row["id"]] for row in update_rows}
+            | {known_tests[test_id] for test_id in delete_ids}
+        )
+        if touched_features:
+            ProjectRepository.bump_versions_for_features(db, touched_features)
+        db.commit()
+
+        return {"created": created, "updated": updated, "deleted": delete_ids, "errors": errors}
         
+    # Analytics methods
     @staticmethod
-    def get_monthly_test_progress(db: Session, start_date: datetime, end_date: datetime, project_id: int = None):
-        """Get monthly test progress (tests added and completed)"""
-        # Base query filters
-        filters = [Test.created_at.between(start_date, end_date)]
-        if project_id:
-            filters.append(Feature.project_id == project_id)
-        
-        # Query for added tests by month
-        added_query = db.query(
-            extract('month', Test.created_at).label('month'),
-            extract('year', Test.created_at).label('year'),
-            func.count(Test.id).label('count')
-        ).join(Feature, Test.feature_id == Feature.id)
-        
-        if filters:
-            added_query = added_query.filter(and_(*filters))
-            
-        added_counts = added_query.group_by(
-            extract('year', Test.created_at),
-            extract('month', Test.created_at)
-        ).all()
-        
-        # Query for completed tests by month (when tested status changed to True)
-        # Note: This is an approximation since we don't track status changes
-        # In a real app, you'd have a history table or events to track this accurately
-        completed_filters = filters.copy()
-        completed_filters.append(Test.tested == True)
-        
-        completed_query = db.query(
-            extract('month', Test.updated_at).label('month'),
-            extract('year', Test.updated_at).label('year'),
-            func.count(Test.id).label('count')
-        ).join(Feature, Test.feature_id == Feature.id)
-        
-        if completed_filters:
-            completed_query = completed_query.filter(and_(*completed_filters))
-            
-        completed_counts = completed_query.group_by(
-            extract('year', Test.updated_at),
-            extract('month', Test.updated_at)
-        ).all()
-        
-        # Combine results
-        result = {}
-        for month, year, count in added_counts:
-            key = (int(year), int(month))
-            if key not in result:
-                result[key] = {"month": int(month), "year": int(year), "added": 0, "completed": 0}
-            result[key]["added"] = count
-            
-        for month, year, count in completed_counts:
-            key = (int(year), int(month))
-            if key not in result:
-                result[key] = {"month": int(month), "year": int(year), "added": 0, "completed": 0}
-            result[key]["completed"] = count
-            
-        return list(result.values()) 
\ No newline at end of file
+    def get_status_priority_counts(db: Session, project_ids: Optional[List[int]] = None):
+        """Tested/untested counts per priority in one aggregate query: (priority, tested, untested) rows.
+
+        Only reads feature_id, tested and priority, so a project's slice is
+        counted from ix_tests_feature_id_tested_priority without heap access.
+        """
+        query = db.query(
+            Test.priority,
+            func.count().filter(Test.tested.is_(True)).label("tested"),
+            func.count().filter(or_(Test.tested.is_(False), Test.tested.is_(None))).label("untested"),
+        )
+        if project_ids is not None:
+            query = query.join(Feature, Test.feature_id == Feature.id).filter(Feature.project_id.in_(project_ids))
+        return query.group_by(Test.priority).all()
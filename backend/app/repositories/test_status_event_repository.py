@@ -0,0 +1,104 @@
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.status_events import (
+    DEFAULT_PARTITION,
+    PARTITION_PREFIX,
+    create_partition_sql,
+    month_bounds,
+    partition_name,
+    shift_month,
+)
+
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})m(\d{{2}})$")
+
+
+class TestStatusEventRepository:
+    @staticmethod
+    def list_partitions(db: Session) -> List[Tuple[str, int, int]]:
+        """(name, year, month) of every monthly partition, oldest first"""
+        names = db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'test_status_events'"
+        )).scalars()
+        partitions = []
+        for name in names:
+            match = _PARTITION_NAME.match(name)
+            if match:
+                partitions.append((name, int(match.group(1)), int(match.group(2))))
+        return sorted(partitions, key=lambda partition: (partition[1], partition[2]))
+
+    @staticmethod
+    def default_partition_months(db: Session) -> List[Tuple[int, int]]:
+        """(year, month) of every UTC month with rows in the default partition"""
+        rows = db.execute(text(
+            "SELECT DISTINCT EXTRACT(YEAR FROM occurred_at AT TIME ZONE 'UTC')::int, "
+            f"EXTRACT(MONTH FROM occurred_at AT TIME ZONE 'UTC')::int FROM {DEFAULT_PARTITION}"
+        )).all()
+        return [(year, month) for year, month in rows]
+
+    @staticmethod
+    def create_partition(db: Session, year: int, month: int) -> int:
+        """Create one month's partition, moving its rows out of the default partition; returns rows moved.
+
+        Postgres refuses to create a partition while the default holds rows in
+        its range, so in that case the default is detached, the rows moved and
+        the default reattached. The detach locks test_status_events until
+        commit, which holds back the triggers' inserts rather than losing them.
+        """
+        start, end = month_bounds(year, month)
+        in_month = f"occurred_at >= '{start}' AND occurred_at < '{end}'"
+        if not db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})")).scalar():
+            db.execute(text(create_partition_sql(year, month)))
+            return 0
+        db.execute(text(f"ALTER TABLE test_status_events DETACH PARTITION {DEFAULT_PARTITION}"))
+        db.execute(text(create_partition_sql(year, month)))
+        moved = db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING *) "
+            f"INSERT INTO {partition_name(year, month)} SELECT * FROM moved"
+        )).rowcount
+        db.execute(text(f"ALTER TABLE test_status_events ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        return moved
+
+    @staticmethod
+    def ensure_partitions(db: Session, months_ahead: int, today: Optional[date] = None) -> List[Tuple[str, int]]:
+        """Create the current month's partition, the next `months_ahead`, and one for every month
+        the default partition has caught rows for. Returns (name, rows moved from the default)
+        for each partition created.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        existing = {(year, month) for _, year, month in TestStatusEventRepository.list_partitions(db)}
+        months = {shift_month(today.year, today.month, offset) for offset in range(months_ahead + 1)}
+        months.update(TestStatusEventRepository.default_partition_months(db))
+        created = []
+        for year, month in sorted(months - existing):
+            moved = TestStatusEventRepository.create_partition(db, year, month)
+            # Release the lock create_partition may hold before the next month
+            db.commit()
+            created.append((partition_name(year, month), moved))
+        return created
+
+    @staticmethod
+    def drop_expired_partitions(db: Session, retention_months: int, today: Optional[date] = None) -> List[str]:
+        """Drop whole partitions older than the retention window; returns the names dropped.
+
+        Dropping a partition is a catalog change, so retention never runs a
+        large DELETE or leaves dead tuples to vacuum. Expired rows left in the
+        default partition, which ensure_partitions keeps near empty, are deleted.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        cutoff = shift_month(today.year, today.month, -retention_months)
+        dropped = []
+        for name, year, month in TestStatusEventRepository.list_partitions(db):
+            if (year, month) < cutoff:
+                db.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE occurred_at < '{month_bounds(*cutoff)[0]}'"))
+        db.commit()
+        return dropped
@@ -1,4 +1,4 @@
 from .user import User, UserCreate, UserInDB, UserUpdate, Token, TokenPayload
-from .project import Project, ProjectCreate, ProjectUpdate, ProjectWithMembers
-from .feature import Feature, FeatureCreate, FeatureUpdate, FeatureWithChildren
+from .project import Project, ProjectCreate, ProjectUpdate, ProjectWithMembers, ProjectFlowSnapshot
+from .feature import Feature, FeatureCreate, FeatureUpdate, FeatureWithCounts, FeatureWithChildren
 from .node_position import NodePosition, NodePositionCreate, NodePositionUpdate, NodePositionBulkCreate, NodePositionBulkUpdate 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from datetime import datetime
 
 class TestStatusCount(BaseModel):
     tested: int
@@ -18,6 +19,10 @@ class FeatureTestCount(BaseModel):
     test_count: int
     tested_count: int
     untested_count: int
+    # Totals including tests of descendant features
+    subtree_test_count: int
+    subtree_tested_count: int
+    subtree_untested_count: int
 
 class ProjectActivityData(BaseModel):
     dates: List[str]
@@ -27,4 +32,24 @@ class ProjectActivityData(BaseModel):
 class TestProgressData(BaseModel):
     months: List[str]
     completed: List[int]
-    added: List[int] 
\ No newline at end of file
+    added: List[int]
+
+class TimeSeriesData(BaseModel):
+    bucket: str
+    timezone: str
+    buckets: List[datetime]
+    series: Dict[str, List[int]]
+
+class StatusPriorityCount(BaseModel):
+    priority: Optional[str] = None
+    tested: int
+    untested: int
+    total: int
+
+class AnalyticsSummary(BaseModel):
+    test_status: TestStatusCount
+    test_priority: TestPriorityCount
+    status_by_priority: List[StatusPriorityCount]
+    top_features: List[FeatureTestCount]
+    activity: ProjectActivityData
+    progress: TestProgressData
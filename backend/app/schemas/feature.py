@@ -37,8 +37,14 @@ class Feature(FeatureInDBBase):
     pass
 
 
+# Feature with the sizes needed to render a collapsed branch
+class FeatureWithCounts(Feature):
+    children_count: int = 0
+    test_count: int = 0
+
+
 # Recursive Feature model for nested representation
-class FeatureWithChildren(Feature):
+class FeatureWithChildren(FeatureWithCounts):
     children: List['FeatureWithChildren'] = []
 
 
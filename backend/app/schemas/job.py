@@ -0,0 +1,22 @@
+from typing import Any, Optional, Dict
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    target_id: Optional[int] = None
+    status: str  # pending, running, completed or failed
+    progress: Dict[str, int] = {}
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    # Finished jobs (and their results) are forgotten after this
+    expires_at: Optional[datetime] = None
+
+
+# Returned with 202 when work is handed to a background job
+class JobAccepted(Job):
+    status_url: str
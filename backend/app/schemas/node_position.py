@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -22,6 +22,11 @@ class NodePositionUpdate(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
 
+class NodePositionDataPatch(BaseModel):
+    data: Dict[str, Any] = {}
+    remove_keys: List[str] = []
+
+
 class NodePosition(NodePositionBase):
     id: int
     created_at: datetime
@@ -37,5 +42,42 @@ class NodePositionBulkCreate(BaseModel):
     positions: list[NodePositionCreate]
 
 
+class NodePositionBulkResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+class NodePositionDelta(BaseModel):
+    node_id: str
+    node_type: str
+    position_x: float
+    position_y: float
+    data: Optional[Dict[str, Any]] = None
+
+
+class NodePositionDeltaBatch(BaseModel):
+    positions: list[NodePositionDelta]
+
+
+class NodePositionDeltaAccepted(BaseModel):
+    buffered: int
+    generation: int
+
+
+class LayoutNode(BaseModel):
+    node_id: str
+    node_type: str
+    position_x: float
+    position_y: float
+
+
+class LayoutResult(BaseModel):
+    inserted: int
+    updated: int
+    cached: bool
+
+
 class NodePositionBulkUpdate(BaseModel):
     positions: list[NodePosition] 
\ No newline at end of file
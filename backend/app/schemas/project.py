@@ -1,7 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel
 from datetime import datetime
 from app.schemas.user import UserBase
+from app.schemas.feature import FeatureWithChildren
+from app.schemas.test import Test
+from app.schemas.node_position import NodePosition
 
 # Shared properties
 class ProjectBase(BaseModel):
@@ -20,6 +23,9 @@ class ProjectUpdate(ProjectBase):
 class ProjectInDBBase(ProjectBase):
     id: int
     owner_id: int
+    test_count: int = 0
+    tested_count: int = 0
+    untested_count: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -36,4 +42,12 @@ class ProjectWithMembers(Project):
     
 # Project with full details
 class ProjectDetail(ProjectWithMembers):
-    pass 
\ No newline at end of file
+    pass
+
+# Everything the flow editor needs to render a project
+class ProjectFlowSnapshot(BaseModel):
+    project: Project
+    features: List[FeatureWithChildren] = []
+    # Tests keyed by the id of the feature they belong to
+    tests: Dict[int, List[Test]] = {}
+    node_positions: List[NodePosition] = []
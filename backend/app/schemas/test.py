@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional, Literal, Any
+from typing import Optional, Literal, Any, List
 from datetime import datetime
 from app.models.test import PriorityEnum
 
@@ -36,4 +36,47 @@ class Test(TestBase):
     def convert_enum_to_str(cls, v: Any) -> str:
         if isinstance(v, PriorityEnum):
             return v.value
-        return v 
\ No newline at end of file
+        return v
+
+
+# For bulk operations
+class TestBulkUpdateItem(TestUpdate):
+    id: int
+
+
+class TestBulkRequest(BaseModel):
+    create: List[TestCreate] = []
+    update: List[TestBulkUpdateItem] = []
+    delete: List[int] = []
+
+
+class TestBulkError(BaseModel):
+    operation: Literal["create", "update", "delete"]
+    index: int  # Position of the item in its request array
+    detail: str
+
+
+class TestBulkResult(BaseModel):
+    created: List[Test] = []
+    updated: List[Test] = []
+    deleted: List[int] = []
+    errors: List[TestBulkError] = []
+
+
+# Selects the tests a bulk status change applies to
+class TestFilter(BaseModel):
+    feature_id: Optional[int] = None
+    include_descendants: bool = True
+    project_id: Optional[int] = None
+    tested: Optional[bool] = None
+    priority: Optional[Literal["high", "normal", "low"]] = None
+
+
+class TestBulkStatusUpdate(BaseModel):
+    filter: TestFilter
+    tested: Optional[bool] = None
+    priority: Optional[Literal["high", "normal", "low"]] = None
+
+
+class TestBulkStatusResult(BaseModel):
+    updated: int
@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.repositories.test_status_event_repository import TestStatusEventRepository
+
+def maintain_status_events():
+    print("Maintaining test status event partitions...")
+
+    db = SessionLocal()
+    try:
+        created = TestStatusEventRepository.ensure_partitions(db, settings.TEST_STATUS_EVENT_PARTITIONS_AHEAD)
+        dropped = TestStatusEventRepository.drop_expired_partitions(db, settings.TEST_STATUS_EVENT_RETENTION_MONTHS)
+    finally:
+        db.close()
+
+    for name, moved in created:
+        if moved:
+            print(f"Created partition {name} and moved {moved} rows into it from the default partition")
+        else:
+            print(f"Created partition {name}")
+    for name in dropped:
+        print(f"Dropped partition {name}")
+    print("Test status event partitions are up to date!")
+
+if __name__ == "__main__":
+    maintain_status_events()
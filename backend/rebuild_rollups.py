@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.database import SessionLocal
+from app.repositories.analytics_repository import AnalyticsRepository
+
+def rebuild_rollups(project_id=None):
+    target = f"project {project_id}" if project_id else "all projects"
+    print(f"Rebuilding daily analytics rollups for {target}...")
+
+    db = SessionLocal()
+    try:
+        AnalyticsRepository.rebuild_daily_stats(db, project_id)
+    finally:
+        db.close()
+
+    print("Daily analytics rollups rebuilt successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute project_daily_stats from tests and features")
+    parser.add_argument("--project-id", type=int, default=None, help="Only rebuild this project")
+    rebuild_rollups(parser.parse_args().project_id)
@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.database import SessionLocal
+from app.repositories.feature_repository import FeatureRepository
+
+def rebuild_test_counts(project_id=None, verify=False):
+    target = f"project {project_id}" if project_id else "all projects"
+    print(f"{'Verifying' if verify else 'Rebuilding'} test counters for {target}...")
+
+    db = SessionLocal()
+    try:
+        if verify:
+            result = FeatureRepository.verify_test_counts(db, project_id)
+        else:
+            result = FeatureRepository.rebuild_test_counts(db, project_id)
+    finally:
+        db.close()
+
+    for table, ids in result.items():
+        if ids:
+            print(f"Warning: {len(ids)} {table} had drifted counters: {ids[:20]}{' ...' if len(ids) > 20 else ''}")
+
+    drifted = any(result.values())
+    if verify:
+        print("Test counters have drifted!" if drifted else "Test counters are consistent!")
+        return 1 if drifted else 0
+    print("Test counters rebuilt successfully!")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or recompute the denormalized test counters on features and projects")
+    parser.add_argument("--project-id", type=int, default=None, help="Only this project")
+    parser.add_argument("--verify", action="store_true", help="Report drift without fixing it")
+    args = parser.parse_args()
+    sys.exit(rebuild_test_counts(args.project_id, args.verify))
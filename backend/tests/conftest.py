@@ -0,0 +1,108 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.database import Base
+
+# Postgres-only tables (partitioned) that SQLite cannot create
+POSTGRES_ONLY_TABLES = {"test_status_events"}
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite database with the application's tables"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in POSTGRES_ONLY_TABLES]
+    Base.metadata.create_all(engine, tables=tables)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def project(db):
+    """A user and a project they own"""
+    owner = models.User(email="owner@example.com", username="owner", hashed_password="x")
+    db.add(owner)
+    db.flush()
+    project = models.Project(name="Project", owner_id=owner.id)
+    db.add(project)
+    db.commit()
+    return project
+
+
+@pytest.fixture
+def postgres_engine():
+    """Engine for the Postgres database in TEST_DATABASE_URL; tests using it are skipped without one"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    """TestClient whose requests use the SQLite database"""
+    from fastapi.testclient import TestClient
+
+    from app.db.database import get_db
+    from app.main import app
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr("app.core.streaming.SessionLocal", session_factory)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def postgres_db(postgres_engine):
+    """Session on a freshly created schema in the Postgres test database"""
+    Base.metadata.create_all(postgres_engine)
+    session = sessionmaker(bind=postgres_engine)()
+    yield session
+    session.close()
+    Base.metadata.drop_all(postgres_engine)
+
+
+@pytest.fixture
+def postgres_project(postgres_db):
+    """A user and a project they own, in the Postgres test database"""
+    owner = models.User(email="owner@example.com", username="owner", hashed_password="x")
+    postgres_db.add(owner)
+    postgres_db.flush()
+    project = models.Project(name="Project", owner_id=owner.id)
+    postgres_db.add(project)
+    postgres_db.commit()
+    return project
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from app.core import analytics_cache as cache_module
+from app.core.analytics_cache import MISSING, AnalyticsCache, LocalBackend, RedisBackend, mark_dirty
+
+
+class Counter:
+    """compute() stand-in that records how often it ran"""
+
+    def __init__(self, value="result"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def cache():
+    return AnalyticsCache(LocalBackend(max_entries=100), ttl=60)
+
+
+def test_local_backend_evicts_least_recently_used():
+    backend = LocalBackend(max_entries=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+
+    assert backend.get("b") is MISSING
+    assert (backend.get("a"), backend.get("c")) == (1, 3)
+    assert len(backend) == 2
+
+
+def test_local_backend_expires_entries():
+    backend = LocalBackend(max_entries=10)
+    backend.set("gone", 1, 0)
+    backend.set("kept", 2, 60)
+
+    assert backend.get("gone") is MISSING
+    assert backend.get("kept") == 2
+    assert len(backend) == 1
+
+
+def test_hit_skips_compute(cache):
+    compute = Counter()
+    assert cache.get_or_compute("summary", {"days": 30}, 1, compute) == "result"
+    assert cache.get_or_compute("summary", {"days": 30}, 1, compute) == "result"
+    assert cache.get_or_compute("summary", {"days": 7}, 1, compute) == "result"
+    assert compute.calls == 2
+
+
+def test_concurrent_misses_compute_once(cache):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 1}
+
+    results = []
+
+    def request():
+        results.append(cache.get_or_compute("summary", {}, 1, compute))
+
+    threads = [threading.Thread(target=request)]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 5
+
+
+def test_failed_compute_is_not_cached(cache):
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("summary", {}, 1, fail)
+    assert cache.get_or_compute("summary", {}, 1, Counter()) == "result"
+
+
+def test_invalidation_by_generation(cache):
+    project, other, everything = Counter("project"), Counter("other"), Counter("everything")
+
+    def read_all():
+        cache.get_or_compute("summary", {}, 1, project)
+        cache.get_or_compute("summary", {}, 2, other)
+        cache.get_or_compute("summary", {}, None, everything)
+        return project.calls, other.calls, everything.calls
+
+    assert read_all() == (1, 1, 1)
+    cache.invalidate([1])
+    # Project 2's entry survives; cross-project entries depend on every project
+    assert read_all() == (2, 1, 2)
+    cache.invalidate()
+    assert read_all() == (3, 2, 3)
+
+
+def test_commit_invalidates_marked_projects(db, monkeypatch, cache):
+    monkeypatch.setattr(cache_module, "analytics_cache", cache)
+    compute = Counter()
+    cache.get_or_compute("summary", {}, 1, compute)
+
+    mark_dirty(db, [1])
+    db.rollback()
+    cache.get_or_compute("summary", {}, 1, compute)
+    assert compute.calls == 1
+
+    mark_dirty(db, [1])
+    db.commit()
+    cache.get_or_compute("summary", {}, 1, compute)
+    assert compute.calls == 2
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.expiries = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, px=None):
+        self.values[key] = value
+        self.expiries[key] = px
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1).encode()
+
+
+def test_redis_backend_round_trips_json_and_generations():
+    client = FakeRedis()
+    backend = RedisBackend(client=client, prefix="t:")
+
+    assert backend.get("k") is MISSING
+    backend.set("k", {"a": [1, 2]}, 1.5)
+    assert backend.get("k") == {"a": [1, 2]}
+    assert client.expiries["t:k"] == 1500
+
+    backend.bump("all")
+    backend.bump("all")
+    assert backend.generations(["all", "any"]) == [2, 0]
@@ -0,0 +1,107 @@
+"""Regression checks that the analytics queries stay on the covering indexes.
+
+Sequential scans are disabled for the session, so the planner only picks
+one when no index can serve the query; on tiny test tables it would
+otherwise always prefer them. The tables are vacuumed first so the
+visibility map lets the planner choose index-only scans.
+"""
+import re
+
+import pytest
+from sqlalchemy import event, text
+
+from app import models
+from app.controllers import analytics_controller
+from app.core.auth_cache import CurrentUser
+from app.repositories.analytics_repository import METRICS, AnalyticsRepository
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.test_repository import TestRepository
+from app.schemas.feature import FeatureCreate
+from app.schemas import test as test_schema
+
+pytestmark = pytest.mark.postgres
+
+
+STATUS_PRIORITY_SCAN = "Index Only Scan using ix_tests_feature_id_tested_priority"
+FEATURES_ADDED_SCAN = re.compile(
+    r"(Index Scan|Index Only Scan) using ix_features_project_id_created_at"
+    r"|Bitmap Index Scan on ix_features_project_id_created_at"
+)
+
+
+@pytest.fixture
+def owner_and_project(postgres_db, postgres_project):
+    project = postgres_project
+    owner = postgres_db.get(models.User, project.owner_id)
+    root = FeatureRepository.create_feature(postgres_db, FeatureCreate(name="Root", project_id=project.id))
+    child = FeatureRepository.create_feature(
+        postgres_db, FeatureCreate(name="Child", project_id=project.id, parent_id=root.id)
+    )
+    for priority in ("high", "normal", "low"):
+        TestRepository.create_test(postgres_db, test_schema.TestCreate(name=priority, feature_id=child.id, priority=priority))
+    return CurrentUser(id=owner.id, username=owner.username, is_active=True), project.id
+
+
+@pytest.fixture
+def plans(postgres_db, postgres_engine, owner_and_project):
+    """EXPLAIN output of every SELECT the session runs"""
+    with postgres_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE tests, features"))
+    postgres_db.execute(text("SET enable_seqscan = off"))
+    collected = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            cursor.execute("EXPLAIN " + statement, parameters)
+            collected.append("\n".join(row[0] for row in cursor.fetchall()))
+
+    event.listen(postgres_engine, "before_cursor_execute", explain)
+    yield collected
+    event.remove(postgres_engine, "before_cursor_execute", explain)
+
+
+def _seq_scans(plans):
+    return [plan for plan in plans if "Seq Scan on tests" in plan or "Seq Scan on features" in plan]
+
+
+def test_summary_uses_indexes(postgres_db, owner_and_project, plans, monkeypatch):
+    current_user, project_id = owner_and_project
+    monkeypatch.setattr(analytics_controller, "_cached", lambda endpoint, params, project_ids, compute: compute())
+
+    analytics_controller.get_analytics_summary(
+        project_id=project_id, days=30, top_features=5, db=postgres_db, current_user=current_user
+    )
+
+    assert plans
+    assert _seq_scans(plans) == []
+    assert any(STATUS_PRIORITY_SCAN in plan for plan in plans)
+
+
+def test_status_and_priority_counts_are_index_only(postgres_db, owner_and_project, plans):
+    _, project_id = owner_and_project
+
+    TestRepository.get_status_priority_counts(postgres_db, [project_id])
+
+    [plan] = plans
+    assert STATUS_PRIORITY_SCAN in plan
+    assert "Seq Scan" not in plan
+
+
+def test_features_added_scans_the_created_at_index(postgres_db, owner_and_project, plans):
+    _, project_id = owner_and_project
+
+    # A non-UTC zone reads the features table instead of the rollups
+    AnalyticsRepository.get_time_series(postgres_db, ["features_added"], tz="Europe/Berlin", project_ids=[project_id])
+
+    assert any(FEATURES_ADDED_SCAN.search(plan) for plan in plans)
+    assert _seq_scans(plans) == []
+
+
+@pytest.mark.parametrize("tz", ["UTC", "Europe/Berlin"])
+def test_time_series_uses_indexes(postgres_db, owner_and_project, plans, tz):
+    _, project_id = owner_and_project
+
+    AnalyticsRepository.get_time_series(postgres_db, list(METRICS), tz=tz, project_ids=[project_id])
+
+    assert plans
+    assert _seq_scans(plans) == []
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from app.api import deps
+from app.core.auth_cache import CurrentUser, UserCache
+from app.core.security import create_access_token
+
+ALICE = CurrentUser(id=1, username="alice", is_active=True)
+BOB = CurrentUser(id=2, username="bob", is_active=True)
+
+
+def test_invalidate_user_forgets_every_token_of_that_user():
+    cache = UserCache(max_entries=10, ttl=60)
+    cache.put("a1", ALICE)
+    cache.put("a2", ALICE)
+    cache.put("b1", BOB)
+
+    cache.invalidate_user(ALICE.id)
+
+    assert cache.get("a1") is None
+    assert cache.get("a2") is None
+    assert cache.get("b1") == BOB
+
+
+def test_entries_never_outlive_the_token():
+    cache = UserCache(max_entries=10, ttl=60)
+    cache.put("expired", ALICE, token_expires_at=time.time() - 1)
+    cache.put("short", ALICE, token_expires_at=time.time() + 60)
+    cache.put("stale", BOB)
+    cache.ttl = 0
+    cache.put("no-ttl", BOB)
+
+    assert cache.get("expired") is None
+    assert cache.get("short") == ALICE
+    assert cache.get("stale") == BOB
+    assert cache.get("no-ttl") is None
+
+
+def test_evicts_least_recently_used():
+    cache = UserCache(max_entries=2, ttl=60)
+    cache.put("a1", ALICE)
+    cache.put("b1", BOB)
+    cache.get("a1")
+    cache.put("a2", ALICE)
+
+    assert cache.get("b1") is None
+    assert cache.get("a1") == ALICE
+    # The evicted token no longer counts as one of Bob's
+    cache.invalidate_user(BOB.id)
+    assert cache.get("a2") == ALICE
+
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    cache = UserCache(max_entries=10, ttl=60)
+    monkeypatch.setattr(deps, "user_cache", cache)
+    monkeypatch.setattr("app.api.endpoints.users.user_cache", cache)
+    return cache
+
+
+def test_deactivated_user_is_rejected_despite_cached_token(client, project, user_cache):
+    headers = {"Authorization": f"Bearer {create_access_token(project.owner_id)}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert user_cache.get(headers["Authorization"].split()[1]) is not None
+
+    response = client.put(f"/api/v1/users/{project.owner_id}", headers=headers, json={"is_active": False})
+    assert response.status_code == 200
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 400
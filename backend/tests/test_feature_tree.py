@@ -0,0 +1,53 @@
+from sqlalchemy import event
+
+from app import models
+from app.repositories.feature_repository import FeatureRepository
+from app.schemas.feature import FeatureCreate
+
+
+def _build_chain(db, project_id, depth, siblings):
+    """`depth` levels of features, each level with `siblings` children under the previous level's first"""
+    parent_id = None
+    for level in range(depth):
+        features = [
+            FeatureRepository.create_feature(
+                db, FeatureCreate(name=f"{level}-{i}", project_id=project_id, parent_id=parent_id)
+            )
+            for i in range(siblings)
+        ]
+        parent_id = features[0].id
+
+
+def _count_statements(engine, db, project_id):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        tree = FeatureRepository.get_project_feature_tree(db, project_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return len(statements), tree
+
+
+def test_feature_tree_query_count_does_not_grow_with_depth(engine, db, project):
+    deep_project = models.Project(name="Deep", owner_id=project.owner_id)
+    db.add(deep_project)
+    db.commit()
+    small, deep = project.id, deep_project.id
+    _build_chain(db, small, depth=1, siblings=1)
+    _build_chain(db, deep, depth=8, siblings=3)
+    db.expire_all()
+
+    small_count, small_tree = _count_statements(engine, db, small)
+    deep_count, deep_tree = _count_statements(engine, db, deep)
+
+    assert small_count == deep_count
+    assert len(small_tree) == 1
+    node = deep_tree[0]
+    for _ in range(6):
+        node = node.children[0]
+    assert len(node.children) == 3
+
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from app import models
+from app.api.endpoints import jobs as jobs_endpoint
+from app.core.jobs import JobRegistry
+from app.core.security import create_access_token
+
+
+@pytest.fixture
+def registry():
+    registry = JobRegistry(result_ttl=600, max_workers=2)
+    yield registry
+    registry.shutdown()
+
+
+def test_identical_active_jobs_are_shared(registry):
+    first, created = registry.create("delete_project", 1, user_id=10)
+    assert created
+    duplicate, created = registry.create("delete_project", 1, user_id=10)
+    assert (duplicate["id"], created) == (first["id"], False)
+    assert registry.create("delete_project", 2, user_id=10)[0]["id"] != first["id"]
+    assert registry.create("delete_project", 1, user_id=10, key="other")[0]["id"] != first["id"]
+
+    registry.update(first["id"], status="completed")
+    assert registry.create("delete_project", 1, user_id=10)[0]["id"] != first["id"]
+
+
+def test_start_runs_compute_once_for_duplicates(registry):
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"total": 3}
+
+    first = registry.start("analytics_summary", 1, 10, "key", compute)
+    second = registry.start("analytics_summary", 1, 11, "key", compute)
+    release.set()
+    registry.shutdown()
+
+    assert second["id"] == first["id"]
+    assert calls == [1]
+    assert registry.get(first["id"], 10)["result"] == {"total": 3}
+
+
+def test_jobs_are_only_visible_to_their_requesters(registry):
+    job, _ = registry.create("delete_project", 1, user_id=10)
+    assert registry.get(job["id"], 10) is not None
+    assert registry.get(job["id"], 99) is None
+
+    # A user whose request was deduplicated onto the job can follow it too
+    registry.create("delete_project", 1, user_id=11)
+    assert registry.get(job["id"], 11) is not None
+
+
+def test_finished_jobs_are_purged_after_the_ttl():
+    registry = JobRegistry(result_ttl=0, max_workers=1)
+    job, _ = registry.create("delete_project", 1, user_id=10)
+    registry.update(job["id"], status="running")
+    assert registry.get(job["id"], 10)["status"] == "running"
+
+    registry.update(job["id"], status="completed")
+    assert registry.get(job["id"], 10) is None
+
+
+@pytest.fixture
+def api(client, db, project, registry, monkeypatch):
+    """Client, the job registry it serves, and auth headers for the project owner and a stranger"""
+    monkeypatch.setattr(jobs_endpoint, "jobs", registry)
+    monkeypatch.setattr(jobs_endpoint, "LONG_POLL_INTERVAL", 0.01)
+    stranger = models.User(email="stranger@example.com", username="stranger", hashed_password="x")
+    db.add(stranger)
+    db.commit()
+    owner_headers = {"Authorization": f"Bearer {create_access_token(project.owner_id)}"}
+    stranger_headers = {"Authorization": f"Bearer {create_access_token(stranger.id)}"}
+    return client, registry, project.owner_id, owner_headers, stranger_headers
+
+
+def test_read_job_hides_other_users_jobs(api):
+    client, registry, owner_id, owner_headers, stranger_headers = api
+    job, _ = registry.create("analytics_summary", 1, user_id=owner_id)
+
+    assert client.get(f"/api/v1/jobs/{job['id']}", headers=owner_headers).status_code == 200
+    assert client.get(f"/api/v1/jobs/{job['id']}", headers=stranger_headers).status_code == 404
+
+
+def test_read_job_long_polls_until_finished(api):
+    client, registry, owner_id, owner_headers, _ = api
+    release = threading.Event()
+    job = registry.start("analytics_summary", 1, owner_id, "key", lambda: release.wait(5) and {"total": 1})
+
+    response = client.get(f"/api/v1/jobs/{job['id']}?wait=0", headers=owner_headers)
+    assert response.json()["status"] in ("pending", "running")
+
+    threading.Timer(0.1, release.set).start()
+    response = client.get(f"/api/v1/jobs/{job['id']}?wait=5", headers=owner_headers)
+    assert response.json()["status"] == "completed"
+    assert response.json()["result"] == {"total": 1}
+
+
+def test_repeated_delete_schedules_one_job(client, project, registry, monkeypatch):
+    from app.api.endpoints import projects as projects_endpoint
+
+    scheduled = []
+    monkeypatch.setattr(projects_endpoint, "jobs", registry)
+    monkeypatch.setattr(projects_endpoint.settings, "BULK_DELETE_THRESHOLD", -1)
+    # Leaves the job pending, as when the first task has not started yet
+    monkeypatch.setattr(projects_endpoint, "_delete_project_job", lambda job_id, project_id: scheduled.append(job_id))
+    headers = {"Authorization": f"Bearer {create_access_token(project.owner_id)}"}
+
+    first = client.delete(f"/api/v1/projects/{project.id}", headers=headers)
+    second = client.delete(f"/api/v1/projects/{project.id}", headers=headers)
+
+    assert first.status_code == second.status_code == 202
+    assert first.json()["id"] == second.json()["id"]
+    assert scheduled == [first.json()["id"]]
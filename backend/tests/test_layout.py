@@ -0,0 +1,47 @@
+from app.controllers import node_position_controller
+from app.core.layout import LayoutCache, hierarchy_token
+
+FEATURES = [(1, None, "/1/", 0), (2, 1, "/1/2/", 1)]
+ROWS = [{"node_id": "1"}]
+
+
+def test_cache_survives_version_bump_with_same_hierarchy():
+    cache = LayoutCache()
+    token = hierarchy_token(FEATURES, {2: {"high"}})
+    cache.put(7, 1, token, ROWS)
+
+    assert cache.get(7, 1) is ROWS
+    assert cache.get(7, 2) is None
+    assert cache.get(7, 2, hierarchy_token(list(reversed(FEATURES)), {2: {"high"}})) is ROWS
+    # Revalidated for the new version, so the token is no longer needed
+    assert cache.get(7, 2) is ROWS
+
+
+def test_cache_misses_when_hierarchy_or_priorities_change():
+    cache = LayoutCache()
+    cache.put(7, 1, hierarchy_token(FEATURES, {2: {"high"}}), ROWS)
+
+    assert cache.get(7, 2, hierarchy_token(FEATURES, {2: {"high", "low"}})) is None
+    assert cache.get(7, 2, hierarchy_token([(1, None, "/1/", 0), (2, None, "/2/", 0)], {2: {"high"}})) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LayoutCache(max_projects=2)
+    for project_id in (1, 2):
+        cache.put(project_id, 1, "token", ROWS)
+    cache.get(1, 1)
+    cache.put(3, 1, "token", ROWS)
+
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 1) is ROWS
+
+
+def test_layout_not_modified_skips_computing(client, project, monkeypatch):
+    url = f"/api/v1/node-positions/project/{project.id}/layout"
+    etag = client.get(url).headers["ETag"]
+
+    def fail(*args):
+        raise AssertionError("layout computed for a matching If-None-Match")
+
+    monkeypatch.setattr(node_position_controller, "_project_layout", fail)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,60 @@
+import pytest
+
+from app.controllers import node_position_controller
+from app.core.position_buffer import PositionBuffer
+from app.core.streaming import NDJSON_MEDIA_TYPE, POSITIONS_MEDIA_TYPE
+from app.models.node_position import NodePosition
+from app.repositories.node_position_repository import NodePositionRepository
+from tests.test_streaming import decode_positions
+
+API = "/api/v1/node-positions"
+
+
+@pytest.fixture
+def buffer(session_factory, monkeypatch):
+    """A position buffer that writes through the ORM, since upserts are Postgres-only"""
+    buffer = PositionBuffer(flush_interval=60, max_pending=1000)
+
+    def write(project_id, rows):
+        db = session_factory()
+        try:
+            for row in rows:
+                position = db.query(NodePosition).filter_by(project_id=project_id, node_id=row["node_id"]).one()
+                position.position_x, position.position_y = row["position_x"], row["position_y"]
+            db.commit()
+        finally:
+            db.close()
+
+    monkeypatch.setattr(buffer, "_write", write)
+    monkeypatch.setattr(node_position_controller, "position_buffer", buffer)
+    return buffer
+
+
+@pytest.fixture
+def moved_into_box(db, project, buffer):
+    """Two stored nodes outside the box 0..100, one of them buffered into it"""
+    db.add(NodePosition(project_id=project.id, node_id="moved", node_type="featureNode", position_x=500, position_y=500))
+    db.add(NodePosition(project_id=project.id, node_id="away", node_type="featureNode", position_x=900, position_y=900))
+    db.commit()
+    buffer.add(project.id, [{"node_id": "moved", "node_type": "featureNode", "position_x": 10, "position_y": 20}])
+    return f"{API}/project/{project.id}/viewport?min_x=0&min_y=0&max_x=100&max_y=100"
+
+
+def test_viewport_includes_node_buffered_into_box(client, moved_into_box):
+    response = client.get(moved_into_box)
+    assert response.status_code == 200
+    assert [(p["node_id"], p["position_x"], p["position_y"]) for p in response.json()] == [("moved", 10, 20)]
+
+
+def test_viewport_stream_includes_node_buffered_into_box(client, moved_into_box):
+    response = client.get(moved_into_box, headers={"Accept": NDJSON_MEDIA_TYPE})
+    assert [line for line in response.text.splitlines() if '"moved"' in line]
+    assert '"away"' not in response.text
+
+    response = client.get(moved_into_box, headers={"Accept": POSITIONS_MEDIA_TYPE})
+    assert decode_positions(response.content) == [("moved", "featureNode", 10.0, 20.0)]
+
+
+def test_patching_a_missing_node_rolls_back(db, project):
+    assert NodePositionRepository.patch_node_position_data(db, "missing", project.id, {"label": "A"}, []) is None
+    assert not db.in_transaction()
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app import models
+from app.core.pagination import MAX_PAGE_SIZE, encode_cursor, keyset_paginate
+from app.models import test as test_model
+
+
+@pytest.fixture
+def query(db):
+    return db.query(test_model.Test)
+
+
+@pytest.mark.parametrize("limit", [0, MAX_PAGE_SIZE + 1])
+def test_rejects_limit_out_of_range(query, limit):
+    with pytest.raises(HTTPException) as exc:
+        keyset_paginate(query, "", limit, test_model.Test.id)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("value", ["1", 1.5, True, None, [1]])
+def test_rejects_cursor_values_of_the_wrong_type(query, value):
+    with pytest.raises(HTTPException) as exc:
+        keyset_paginate(query, encode_cursor(value), 10, test_model.Test.id)
+    assert exc.value.status_code == 400
+
+
+def test_accepts_cursor_matching_the_key_columns(query):
+    assert keyset_paginate(query, encode_cursor(1), 10, test_model.Test.id) == ([], None)
+
+
+def _add_tests(db, project, count):
+    feature = models.Feature(name="Feature", project_id=project.id)
+    db.add(feature)
+    db.commit()
+    db.execute(insert(test_model.Test), [{"name": f"test {i}", "feature_id": feature.id} for i in range(count)])
+    db.commit()
+
+
+@pytest.mark.parametrize("limit", [0, 100000])
+def test_endpoint_rejects_out_of_range_limit_with_a_cursor(client, limit):
+    assert client.get(f"/api/v1/tests/?cursor=&limit={limit}").status_code == 400
+
+
+def test_skip_limit_listing_is_not_bound_by_the_page_size(client, db, project):
+    _add_tests(db, project, MAX_PAGE_SIZE + 5)
+    response = client.get(f"/api/v1/tests/?limit={MAX_PAGE_SIZE + 10}")
+    assert response.status_code == 200
+    assert len(response.json()) == MAX_PAGE_SIZE + 5
+
+
+def test_following_next_cursor_visits_every_row_once(client, db, project):
+    _add_tests(db, project, 25)
+    ids, pages, cursor = [], 0, ""
+    while cursor is not None:
+        page = client.get(f"/api/v1/tests/?cursor={cursor}&limit=10").json()
+        ids += [test["id"] for test in page["items"]]
+        pages, cursor = pages + 1, page["next_cursor"]
+    assert pages == 3
+    assert ids == sorted(ids) and len(set(ids)) == 25
+
+
+def _best_of(runs, fetch):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fetch()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_page_10000_costs_about_the_same_as_page_1(db, project):
+    """Keyset pages seek straight to the cursor; OFFSET reads and discards every earlier row"""
+    page_size, page = 10, 10_000
+    _add_tests(db, project, page_size * page)
+    query = db.query(test_model.Test)
+    deep_cursor = encode_cursor(page_size * (page - 1))
+
+    first = _best_of(5, lambda: keyset_paginate(query, "", page_size, test_model.Test.id))
+    deep = _best_of(5, lambda: keyset_paginate(query, deep_cursor, page_size, test_model.Test.id))
+    deep_offset = _best_of(5, lambda: query.order_by(test_model.Test.id).offset(page_size * (page - 1)).limit(page_size).all())
+
+    rows, next_cursor = keyset_paginate(query, deep_cursor, page_size, test_model.Test.id)
+    assert [row.id for row in rows] == list(range(page_size * (page - 1) + 1, page_size * page + 1))
+    assert next_cursor is None
+    # Generous bounds keep this stable on slow machines while still catching an O(offset) page
+    assert deep < first * 5 + 0.005
+    assert deep < deep_offset
@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.position_buffer import PositionBuffer
+
+
+def _move(node_id, x, y, **extra):
+    return {"node_id": node_id, "node_type": "featureNode", "position_x": x, "position_y": y, **extra}
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = PositionBuffer(flush_interval=60, max_pending=3)
+    buffer.written = []
+    monkeypatch.setattr(buffer, "_write", lambda project_id, rows: buffer.written.append((project_id, rows)))
+    return buffer
+
+
+def test_keeps_latest_value_per_node(buffer):
+    buffer.add(1, [_move("a", 1, 1, data={"label": "A"})])
+    buffer.add(1, [_move("a", 2, 2), _move("b", 5, 5)])
+    buffer.add(2, [_move("a", 9, 9)])
+
+    # Later deltas win, but keep the data the later one did not send
+    assert buffer.pending(1) == {"a": _move("a", 2, 2, data={"label": "A"}), "b": _move("b", 5, 5)}
+    assert buffer.pending(2) == {"a": _move("a", 9, 9)}
+    assert buffer._size == 3
+
+
+def test_generation_counts_adds_while_pending(buffer):
+    assert buffer.generation(1) is None
+    assert buffer.add(1, [_move("a", 1, 1)]) == 1
+    assert buffer.add(1, [_move("a", 2, 2)]) == 2
+    assert buffer.generation(1) == 2
+    buffer.flush(1)
+    assert buffer.generation(1) is None
+
+
+def test_flush_writes_one_batch_per_project(buffer):
+    buffer.add(1, [_move("a", 1, 1), _move("b", 2, 2)])
+    buffer.add(1, [_move("a", 3, 3)])
+    buffer.add(2, [_move("c", 4, 4)])
+
+    buffer.flush(1)
+    assert buffer.written == [(1, [_move("a", 3, 3), _move("b", 2, 2)])]
+    assert buffer.pending(1) == {}
+    assert list(buffer.pending(2)) == ["c"]
+
+    buffer.flush()
+    assert buffer.written[1] == (2, [_move("c", 4, 4)])
+    assert buffer._size == 0
+
+
+def test_reaching_max_pending_wakes_the_flusher(buffer):
+    buffer.add(1, [_move("a", 1, 1), _move("b", 1, 1)])
+    assert not buffer._wake.is_set()
+    buffer.add(1, [_move("a", 2, 2)])
+    assert not buffer._wake.is_set()
+    buffer.add(2, [_move("a", 1, 1)])
+    assert buffer._wake.is_set()
+
+
+def test_failed_write_is_requeued_under_newer_values(buffer, monkeypatch):
+    buffer.add(1, [_move("a", 1, 1), _move("b", 1, 1)])
+
+    def fail(project_id, rows):
+        # A move that arrives while the batch is being written
+        buffer.add(1, [_move("a", 7, 7)])
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(buffer, "_write", fail)
+    buffer.flush()
+
+    assert buffer.pending(1) == {"a": _move("a", 7, 7), "b": _move("b", 1, 1)}
+    assert buffer._size == 2
+
+
+def test_write_for_deleted_project_is_dropped(buffer, monkeypatch, caplog):
+    buffer.add(1, [_move("a", 1, 1)])
+
+    def fail(project_id, rows):
+        raise IntegrityError("INSERT", {}, Exception("project is gone"))
+
+    monkeypatch.setattr(buffer, "_write", fail)
+    buffer.flush()
+
+    assert buffer.pending(1) == {}
+    assert buffer._size == 0
+    assert "Dropping buffered position of node a in project 1" in caplog.text
+
+
+def test_integrity_error_drops_only_the_offending_node(buffer, monkeypatch):
+    buffer.add(1, [_move("a", 1, 1), _move("bad", 2, 2), _move("c", 3, 3)])
+    written = []
+
+    def write(project_id, rows):
+        if any(row["node_id"] == "bad" for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("violates a constraint"))
+        written.extend(row["node_id"] for row in rows)
+
+    monkeypatch.setattr(buffer, "_write", write)
+    buffer.flush()
+
+    assert written == ["a", "c"]
+    assert buffer.pending(1) == {}
+    assert buffer._size == 0
+
+
+def test_in_flight_values_stay_visible(buffer, monkeypatch):
+    buffer.add(1, [_move("a", 1, 1)])
+    seen = []
+    monkeypatch.setattr(buffer, "_write", lambda project_id, rows: seen.append(buffer.pending(project_id)))
+    buffer.flush()
+    assert seen == [{"a": _move("a", 1, 1)}]
+
+
+def test_stop_flushes_what_is_left(buffer):
+    buffer.start()
+    buffer.add(1, [_move("a", 1, 1)])
+    buffer.stop()
+    assert buffer.written == [(1, [_move("a", 1, 1)])]
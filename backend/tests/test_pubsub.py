@@ -0,0 +1,94 @@
+import asyncio
+
+from app.core.pubsub import Hub, LocalBackend
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.messages = []
+        self.fail = fail
+
+    async def send_json(self, message):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.messages.append(message)
+
+
+def _move(node_id, x, **extra):
+    return {"node_id": node_id, "position_x": x, "position_y": 0, **extra}
+
+
+def test_room_coalesces_and_rate_limits_broadcasts():
+    async def scenario():
+        hub = Hub(LocalBackend(), min_interval=0.2)
+        connection = FakeConnection()
+        await hub.join("project:1", connection)
+
+        await hub.publish("project:1", [_move("a", 1, data={"label": "A"})])
+        await hub.publish("project:1", [_move("a", 2), _move("b", 5)])
+        await asyncio.sleep(0)
+        # Both publishes went out as one message, latest value per node
+        assert connection.messages == [
+            {"type": "positions", "positions": [_move("a", 2, data={"label": "A"}), _move("b", 5)]}
+        ]
+
+        for x in (3, 4, 5):
+            await hub.publish("project:1", [_move("a", x)])
+        await asyncio.sleep(0.05)
+        assert len(connection.messages) == 1
+
+        await asyncio.sleep(0.3)
+        assert connection.messages[1] == {"type": "positions", "positions": [_move("a", 5)]}
+        assert len(connection.messages) == 2
+
+    asyncio.run(scenario())
+
+
+def test_messages_stay_in_their_room():
+    async def scenario():
+        hub = Hub(LocalBackend(), min_interval=0)
+        first, second = FakeConnection(), FakeConnection()
+        await hub.join("project:1", first)
+        await hub.join("project:2", second)
+
+        await hub.publish("project:2", [_move("a", 1)])
+        await asyncio.sleep(0)
+
+        assert first.messages == []
+        assert len(second.messages) == 1
+
+    asyncio.run(scenario())
+
+
+def test_failing_connection_does_not_block_the_room():
+    async def scenario():
+        hub = Hub(LocalBackend(), min_interval=0)
+        broken, healthy = FakeConnection(fail=True), FakeConnection()
+        await hub.join("project:1", broken)
+        await hub.join("project:1", healthy)
+
+        await hub.publish("project:1", [_move("a", 1)])
+        await asyncio.sleep(0)
+
+        assert len(healthy.messages) == 1
+
+    asyncio.run(scenario())
+
+
+def test_last_leave_closes_the_room():
+    async def scenario():
+        backend = LocalBackend()
+        hub = Hub(backend, min_interval=0)
+        first, second = FakeConnection(), FakeConnection()
+        await hub.join("project:1", first)
+        room = await hub.join("project:1", second)
+        assert len(backend._handlers["project:1"]) == 1
+
+        await hub.leave("project:1", first)
+        assert room.connections == {second}
+        await hub.leave("project:1", second)
+
+        assert "project:1" not in backend._handlers
+        assert "project:1" not in hub._rooms
+
+    asyncio.run(scenario())
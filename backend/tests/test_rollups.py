@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.models import test as test_model
+from app.repositories.analytics_repository import METRICS, AnalyticsRepository
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.test_repository import TestRepository
+from app.schemas import test as test_schema
+from app.schemas.feature import FeatureCreate
+
+pytestmark = pytest.mark.postgres
+
+
+def _rollups(db):
+    """Non-zero project_daily_stats rows"""
+    return db.execute(text(
+        "SELECT project_id, day, tests_added, tests_tested, features_added FROM project_daily_stats "
+        "WHERE (tests_added, tests_tested, features_added) <> (0, 0, 0) ORDER BY project_id, day"
+    )).all()
+
+
+def _feature(db, project_id, name, parent_id=None):
+    return FeatureRepository.create_feature(db, FeatureCreate(name=name, project_id=project_id, parent_id=parent_id))
+
+
+def _test(db, feature_id, name, tested=False):
+    return TestRepository.create_test(db, test_schema.TestCreate(name=name, feature_id=feature_id, tested=tested))
+
+
+@pytest.fixture
+def history(postgres_db, postgres_project):
+    """Tests and features written through every path the rollup triggers follow"""
+    db, project_id = postgres_db, postgres_project.id
+    root = _feature(db, project_id, "Root")
+    kept = _feature(db, project_id, "Kept", root.id)
+    doomed = _feature(db, project_id, "Doomed", root.id)
+    doomed_child = _feature(db, project_id, "Doomed child", doomed.id)
+    chunked = _feature(db, project_id, "Chunked", root.id)
+
+    flipped = _test(db, kept.id, "flipped")
+    _test(db, kept.id, "born tested", tested=True)
+    deleted = _test(db, kept.id, "deleted", tested=True)
+    _test(db, doomed.id, "cascaded", tested=True)
+    _test(db, doomed_child.id, "cascaded child")
+    _test(db, chunked.id, "chunked", tested=True)
+
+    TestRepository.toggle_test(db, flipped.id)
+    TestRepository.toggle_test(db, flipped.id)
+    TestRepository.toggle_test(db, flipped.id)
+    db.execute(text("UPDATE tests SET tested = true WHERE name = 'cascaded child'"))
+    db.commit()
+    TestRepository.delete_test(db, deleted.id)
+    FeatureRepository.delete_feature_subtree(db, doomed)
+    FeatureRepository.delete_feature_subtree_chunked(db, chunked.id, chunk_size=1)
+    return project_id
+
+
+def test_triggers_match_a_rebuild(postgres_db, history):
+    maintained = _rollups(postgres_db)
+    AnalyticsRepository.rebuild_daily_stats(postgres_db)
+    assert maintained == _rollups(postgres_db)
+
+
+def test_triggers_count_live_rows_and_tested_transitions(postgres_db, history):
+    [(_, _, tests_added, tests_tested, features_added)] = _rollups(postgres_db)
+    assert postgres_db.query(test_model.Test).count() == tests_added == 2
+    # born tested, flipped twice to tested, deleted, both cascaded and the chunked one
+    assert tests_tested == 7
+    assert features_added == 2
+
+
+def test_utc_rollups_agree_with_raw_counts(postgres_db, history):
+    end = datetime.now(timezone.utc) + timedelta(days=1)
+    start = end - timedelta(days=3)
+    rollups = AnalyticsRepository.get_time_series(
+        postgres_db, list(METRICS), start=start, end=end, tz="UTC", project_ids=[history]
+    )
+    # GMT is UTC but is not served from the rollups
+    raw = AnalyticsRepository.get_time_series(
+        postgres_db, list(METRICS), start=start, end=end, tz="GMT", project_ids=[history]
+    )
+    assert rollups == raw
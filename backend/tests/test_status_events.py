@@ -0,0 +1,53 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.db.status_events import DEFAULT_PARTITION, month_bounds, partition_name
+from app.repositories.test_status_event_repository import TestStatusEventRepository
+
+
+def test_month_bounds_wrap_the_year():
+    assert month_bounds(2025, 12) == ("2025-12-01 00:00:00+00", "2026-01-01 00:00:00+00")
+
+
+def _log_event(db, occurred_at):
+    db.execute(
+        text(
+            "INSERT INTO test_status_events (test_id, feature_id, project_id, new_tested, occurred_at) "
+            "VALUES (1, 1, 1, true, :occurred_at)"
+        ),
+        {"occurred_at": occurred_at},
+    )
+    db.commit()
+
+
+def _count(db, table):
+    return db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+@pytest.mark.postgres
+def test_create_all_creates_current_and_next_month(postgres_db):
+    today = datetime.now(timezone.utc).date()
+    partitions = [(year, month) for _, year, month in TestStatusEventRepository.list_partitions(postgres_db)]
+    assert (today.year, today.month) in partitions
+    assert len(partitions) == 2
+
+
+@pytest.mark.postgres
+def test_ensure_partitions_moves_rows_out_of_the_default(postgres_db):
+    _log_event(postgres_db, datetime(2020, 3, 15, tzinfo=timezone.utc))
+    assert _count(postgres_db, DEFAULT_PARTITION) == 1
+
+    created = TestStatusEventRepository.ensure_partitions(postgres_db, 0, today=date(2020, 3, 1))
+
+    assert created == [(partition_name(2020, 3), 1)]
+    assert _count(postgres_db, DEFAULT_PARTITION) == 0
+    assert _count(postgres_db, partition_name(2020, 3)) == 1
+
+
+@pytest.mark.postgres
+def test_retention_prunes_the_default_partition(postgres_db):
+    _log_event(postgres_db, datetime(2019, 1, 15, tzinfo=timezone.utc))
+    TestStatusEventRepository.drop_expired_partitions(postgres_db, 24)
+    assert _count(postgres_db, DEFAULT_PARTITION) == 0
@@ -0,0 +1,59 @@
+import asyncio
+import struct
+
+from app.core import streaming
+from app.models.node_position import NodePosition
+from app.repositories.node_position_repository import NodePositionRepository
+
+
+def _read_string(body: bytes, offset: int):
+    (length,) = struct.unpack_from("<H", body, offset)
+    offset += 2
+    return body[offset:offset + length].decode(), offset + length
+
+
+def decode_positions(body: bytes):
+    """Decode a TFNP v1 stream into (node_id, node_type, x, y) tuples"""
+    assert body[:5] == b"TFNP\x01"
+    offset = 5
+    node_types, rows = [], []
+    while True:
+        n, k = struct.unpack_from("<IH", body, offset) if len(body) - offset >= 6 else (0, 0)
+        if n == 0:
+            assert body[offset:] == struct.pack("<I", 0)
+            return rows
+        offset += 6
+        for _ in range(k):
+            node_type, offset = _read_string(body, offset)
+            node_types.append(node_type)
+        xs = struct.unpack_from(f"<{n}f", body, offset)
+        offset += 4 * n
+        ys = struct.unpack_from(f"<{n}f", body, offset)
+        offset += 4 * n
+        types = struct.unpack_from(f"<{n}H", body, offset)
+        offset += 2 * n
+        for i in range(n):
+            node_id, offset = _read_string(body, offset)
+            rows.append((node_id, node_types[types[i]], xs[i], ys[i]))
+
+
+def _body(response) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+
+def test_positions_stream_skips_fully_filtered_partitions(db, session_factory, project, monkeypatch):
+    monkeypatch.setattr(streaming, "SessionLocal", session_factory)
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 2)
+    # Three partitions of two rows; the middle one lies entirely outside the kept area
+    for i, x in enumerate([1, 2, 500, 600, 3, 4]):
+        db.add(NodePosition(project_id=project.id, node_id=f"n{i}", node_type="featureNode", position_x=x, position_y=0))
+    db.commit()
+
+    statement = NodePositionRepository.get_project_node_positions_statement(project.id)
+    response = streaming.positions_response(statement, keep=lambda row: row["position_x"] < 100)
+
+    rows = decode_positions(_body(response))
+    assert [row[0] for row in rows] == ["n0", "n1", "n4", "n5"]
+    assert rows[2] == ("n4", "featureNode", 3.0, 0.0)
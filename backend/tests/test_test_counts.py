@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import text
+
+from app.models.feature import Feature
+from app.repositories.feature_repository import FeatureRepository
+from app.repositories.test_repository import TestRepository
+from app.schemas import test as test_schema
+from app.schemas.feature import FeatureCreate
+
+pytestmark = pytest.mark.postgres
+
+NO_DRIFT = {"features": [], "projects": []}
+
+
+def _feature(db, project_id, name, parent_id=None):
+    return FeatureRepository.create_feature(db, FeatureCreate(name=name, project_id=project_id, parent_id=parent_id))
+
+
+def _test(db, feature_id, name, tested=False):
+    return TestRepository.create_test(db, test_schema.TestCreate(name=name, feature_id=feature_id, tested=tested))
+
+
+def _counts(db, feature_id):
+    feature = db.get(Feature, feature_id)
+    db.refresh(feature)
+    return feature.test_count, feature.tested_count, feature.subtree_test_count, feature.subtree_tested_count
+
+
+@pytest.fixture
+def tree(postgres_db, postgres_project):
+    """root -> child -> leaf, plus a second root; two tests in child and one tested test in leaf"""
+    db, project_id = postgres_db, postgres_project.id
+    root = _feature(db, project_id, "Root")
+    child = _feature(db, project_id, "Child", root.id)
+    leaf = _feature(db, project_id, "Leaf", child.id)
+    other = _feature(db, project_id, "Other")
+    tests = [_test(db, child.id, "a"), _test(db, child.id, "b"), _test(db, leaf.id, "c", tested=True)]
+    return {"root": root.id, "child": child.id, "leaf": leaf.id, "other": other.id, "tests": [t.id for t in tests]}
+
+
+def test_insert(postgres_db, tree):
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 3, 1)
+    assert _counts(postgres_db, tree["child"]) == (2, 0, 3, 1)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_delete(postgres_db, tree):
+    TestRepository.delete_test(postgres_db, tree["tests"][2])
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 2, 0)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_flip(postgres_db, tree):
+    TestRepository.toggle_test(postgres_db, tree["tests"][0])
+    TestRepository.update_test(postgres_db, tree["tests"][2], test_schema.TestUpdate(tested=False))
+    TestRepository.bulk_set_status(
+        postgres_db, test_schema.TestBulkStatusUpdate(filter=test_schema.TestFilter(feature_id=tree["root"]), tested=True)
+    )
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 3, 3)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_move_test(postgres_db, tree):
+    postgres_db.execute(text("UPDATE tests SET feature_id = :other WHERE id = :id"), {"other": tree["other"], "id": tree["tests"][2]})
+    postgres_db.commit()
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 2, 0)
+    assert _counts(postgres_db, tree["other"]) == (1, 1, 1, 1)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_move_feature(postgres_db, tree):
+    child = postgres_db.get(Feature, tree["child"])
+    FeatureRepository.move_feature(postgres_db, child, postgres_db.get(Feature, tree["other"]))
+    postgres_db.commit()
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 0, 0)
+    assert _counts(postgres_db, tree["other"]) == (0, 0, 3, 1)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_cascaded_feature_delete(postgres_db, tree):
+    FeatureRepository.delete_feature(postgres_db, tree["leaf"])
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 2, 0)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_chunked_subtree_delete(postgres_db, tree):
+    FeatureRepository.delete_feature_subtree_chunked(postgres_db, tree["child"], chunk_size=1)
+    assert _counts(postgres_db, tree["root"]) == (0, 0, 0, 0)
+    assert FeatureRepository.verify_test_counts(postgres_db) == NO_DRIFT
+
+
+def test_top_features_merge_each_projects_top(postgres_db, tree, postgres_project):
+    top = FeatureRepository.get_features_with_test_counts(postgres_db, [postgres_project.id], limit=2)
+    assert [row["feature_id"] for row in top] == [tree["child"], tree["leaf"]]
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+from app import models
+from app.models import test as test_model
+from app.repositories.test_repository import TestRepository
+from app.schemas import test as test_schema
+
+
+def test_toggle_test_returns_loaded_values_without_refetching(db, engine, project):
+    feature = models.Feature(name="Feature", project_id=project.id)
+    db.add(feature)
+    db.flush()
+    test = test_model.Test(name="Test", feature_id=feature.id, tested=False)
+    db.add(test)
+    db.commit()
+    test_id, feature_id = test.id, feature.id
+    db.expunge_all()
+
+    toggled = TestRepository.toggle_test(db, test_id)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert (toggled.id, toggled.tested, toggled.feature_id) == (test_id, True, feature_id)
+    assert statements == []
+
+    assert TestRepository.toggle_test(db, test_id).tested is False
+    assert TestRepository.toggle_test(db, -1) is None
+
+
+def test_bulk_set_status_for_a_missing_feature_rolls_back(db, project):
+    db.add(models.Feature(name="Pending", project_id=project.id))
+    change = test_schema.TestBulkStatusUpdate(filter=test_schema.TestFilter(feature_id=-1), tested=True)
+
+    assert TestRepository.bulk_set_status(db, change) is None
+    assert not db.in_transaction()
+    assert db.query(models.Feature).count() == 0
+
+
+def test_bulk_status_endpoint_returns_404_for_a_missing_feature(client):
+    response = client.patch("/api/v1/tests/bulk-status", json={"filter": {"feature_id": -1}, "tested": True})
+    assert response.status_code == 404
@@ -16,7 +16,7 @@ import ReactFlow, {
 } from "reactflow";
 import "reactflow/dist/style.css";
 import "./flow.css";
-import { Project } from "../../services/project.service";
+import { Project, projectService } from "../../services/project.service";
 import { RootNode } from "./nodes/RootNode";
 import { TestCaseNode } from "./nodes/TestCaseNode";
 import { FeatureNode } from "./nodes/FeatureNode";
@@ -586,20 +586,14 @@ export const ProjectFlow: React.FC<ProjectFlowProps> = ({
       try {
         console.log("Fetching data for project:", project.id);
 
-        // First, load everything in parallel for better performance
-        const [
-          positionsData,
-          testCasesData,
-          featuresData,
-          featureTreeData,
-          testsData,
-        ] = await Promise.all([
-          nodePositionService.getProjectNodePositions(project.id),
+        // Load the flow snapshot (tree, tests, positions) alongside the test cases
+        const [flowData, testCasesData] = await Promise.all([
+          projectService.getProjectFlow(project.id),
           testCaseService.getProjectTestCases(project.id),
-          featureService.getProjectFeatures(project.id),
-          featureService.getProjectFeatureTree(project.id),
-          testService.getAllTests(),
         ]);
+        const positionsData = flowData.nodePositions;
+        const featureTreeData = flowData.featureTree;
+        const testsData = flowData.tests;
 
         // Process the positions and set them in state
         const positionMap: { [key: string]: { x: number; y: number } } = {};
@@ -62,18 +62,14 @@ export function Dashboard() {
     const fetchAnalyticsData = async () => {
       setAnalyticsLoading(true);
       try {
-        const [statusData, priorityData, activityData, progressData] =
-          await Promise.all([
-            analyticsService.getTestStatusCounts(),
-            analyticsService.getTestPriorityCounts(),
-            analyticsService.getProjectActivity(),
-            analyticsService.getTestProgress(),
-          ]);
-
-        setTestStatusData(statusData);
-        setTestPriorityData(priorityData);
-        setProjectActivity(activityData);
-        setTestProgress(progressData);
+        // One request returns every widget's data
+        const summary = await analyticsService.getSummary();
+        if (summary) {
+          setTestStatusData(summary.test_status);
+          setTestPriorityData(summary.test_priority);
+          setProjectActivity(summary.activity);
+          setTestProgress(summary.progress);
+        }
       } catch (error) {
         console.error("Error fetching analytics data:", error);
       } finally {
@@ -34,7 +34,40 @@ export interface TestProgressData {
   added: number[];
 }
 
+export interface StatusPriorityCount {
+  priority: string | null;
+  tested: number;
+  untested: number;
+  total: number;
+}
+
+export interface AnalyticsSummary {
+  test_status: TestStatusCount;
+  test_priority: TestPriorityCount;
+  status_by_priority: StatusPriorityCount[];
+  top_features: FeatureTestCount[];
+  activity: ProjectActivityData;
+  progress: TestProgressData;
+}
+
 class AnalyticsService {
+  async getSummary(
+    projectId?: number,
+    days: number = 30
+  ): Promise<AnalyticsSummary | null> {
+    try {
+      let url = `${API_URL}/analytics/summary?days=${days}`;
+      if (projectId) {
+        url += `&project_id=${projectId}`;
+      }
+      const response = await axios.get<AnalyticsSummary>(url);
+      return response.data;
+    } catch (error) {
+      console.error("Error fetching analytics summary:", error);
+      return null;
+    }
+  }
+
   async getTestStatusCounts(): Promise<TestStatusCount> {
     try {
       const response = await axios.get<TestStatusCount>(
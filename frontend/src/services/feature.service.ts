@@ -13,6 +13,8 @@ export interface Feature {
 
 export interface FeatureWithChildren extends Feature {
   children: FeatureWithChildren[];
+  children_count?: number;
+  test_count?: number;
 }
 
 export interface CreateFeatureDto {
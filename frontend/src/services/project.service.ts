@@ -1,5 +1,8 @@
 import axios from "axios";
 import { API_URL } from "../config/constants";
+import { FeatureWithChildren } from "./feature.service";
+import { NodePosition } from "./node-position.service";
+import { Test } from "../components/flow/nodes/TestNode";
 
 export interface User {
   id: number;
@@ -17,6 +20,12 @@ export interface Project {
   members?: User[];
 }
 
+export interface ProjectFlowSnapshot {
+  featureTree: FeatureWithChildren[];
+  tests: Test[];
+  nodePositions: NodePosition[];
+}
+
 export interface CreateProjectDto {
   name: string;
   description?: string;
@@ -81,6 +90,40 @@ class ProjectService {
     }
   }
 
+  // Load the feature tree, tests and node positions for the flow editor in one request
+  async getProjectFlow(id: number): Promise<ProjectFlowSnapshot> {
+    const response = await axios.get<{
+      features: FeatureWithChildren[];
+      tests: { [featureId: string]: any[] };
+      node_positions: NodePosition[];
+    }>(`${API_URL}/projects/${id}/flow`);
+
+    // Convert numeric IDs to strings recursively
+    const processFeature = (
+      feature: FeatureWithChildren
+    ): FeatureWithChildren => ({
+      ...feature,
+      id: String(feature.id),
+      children: feature.children.map(processFeature),
+    });
+
+    const tests: Test[] = Object.values(response.data.tests)
+      .flat()
+      .map((test: any) => ({
+        id: test.id.toString(),
+        name: test.name,
+        featureId: test.feature_id.toString(),
+        tested: test.tested,
+        priority: test.priority || "normal",
+      }));
+
+    return {
+      featureTree: response.data.features.map(processFeature),
+      tests,
+      nodePositions: response.data.node_positions,
+    };
+  }
+
   async createProject(projectData: CreateProjectDto): Promise<Project | null> {
     try {
       const response = await axios.post<Project>(